@@ -0,0 +1,366 @@
+"""
+
+benchmarks.fake_server
+=================================
+
+Local stand-in for OmniSci Core. The server speaks the MapD Thrift protocol shipped with pymapd and
+simulates the cost of each call instead of storing data: every call waits ``latency`` seconds and loads
+additionally wait for the time the server would need to ingest the data at the configured rates.
+
+Ex:
+
+python -m benchmarks.fake_server --port 6274 --latency 0.002 --ingest-rate 200000000
+
+conn = pymapd.connect(user='mapd', password='HyperInteractive', dbname='mapd', host='localhost', port=6274, protocol='binary')
+"""
+import os
+import re
+import bz2
+import glob
+import gzip
+import time
+import uuid
+import logging
+import argparse
+import threading
+import multiprocessing
+
+from mapd import MapD
+from mapd.ttypes import (
+    TColumn, TColumnData, TColumnType, TDatumType, TEncodingType, TMapDException, TQueryResult, TRowSet,
+    TServerStatus, TTableDetails, TTypeInfo,
+)
+from thrift.protocol import TBinaryProtocol
+from thrift.server import TServer
+from thrift.transport import TSocket, TTransport
+
+logger = logging.getLogger('odlt.benchmarks')
+
+SERVER_VERSION = '4.5.0-fake'
+
+DEFAULT_LATENCY = 0.001
+DEFAULT_INGEST_RATE = 256 * 1024 * 1024
+DEFAULT_ROW_RATE = 2000000
+
+TYPE_NAMES = {
+    'TINYINT': 'TINYINT',
+    'SMALLINT': 'SMALLINT',
+    'INT': 'INT',
+    'INTEGER': 'INT',
+    'BIGINT': 'BIGINT',
+    'FLOAT': 'FLOAT',
+    'REAL': 'FLOAT',
+    'DOUBLE': 'DOUBLE',
+    'DECIMAL': 'DECIMAL',
+    'NUMERIC': 'DECIMAL',
+    'BOOLEAN': 'BOOL',
+    'BOOL': 'BOOL',
+    'TEXT': 'STR',
+    'VARCHAR': 'STR',
+    'STR': 'STR',
+    'DATE': 'DATE',
+    'TIME': 'TIME',
+    'TIMESTAMP': 'TIMESTAMP',
+}
+
+CREATE_TABLE_RE = re.compile(r'^\s*create\s+table\s+(?:if\s+not\s+exists\s+)?(\w+)\s*\((.*)\)', re.IGNORECASE | re.DOTALL)
+CREATE_VIEW_RE = re.compile(r'^\s*create\s+view\s+(?:if\s+not\s+exists\s+)?(\w+)', re.IGNORECASE)
+COPY_RE = re.compile(r"^\s*copy\s+(\w+)\s+from\s+'([^']*)'", re.IGNORECASE)
+DROP_RE = re.compile(r'^\s*drop\s+(table|view)\s+(?:if\s+exists\s+)?(\w+)', re.IGNORECASE)
+
+OPENERS = {
+    '.gz': gzip.open,
+    '.gzip': gzip.open,
+    '.bz2': bz2.open,
+}
+
+
+def split_column_definitions(body):
+    """
+    Split the body of a CREATE TABLE statement on the commas outside of parentheses
+    """
+    parts, depth, current = [], 0, []
+    for char in body:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    if ''.join(current).strip():
+        parts.append(''.join(current).strip())
+    return parts
+
+
+def parse_create_table(sql):
+    """
+    Table name and column types of a CREATE TABLE statement
+    :return tuple: (table name, list of TColumnType)
+    """
+    match = CREATE_TABLE_RE.match(sql)
+    if not match:
+        raise ValueError('Not a CREATE TABLE statement')
+    columns = []
+    for definition in split_column_definitions(match.group(2)):
+        tokens = definition.replace('(', ' (').split()
+        if len(tokens) < 2 or tokens[0].upper() in ('SHARD', 'SHARED', 'PRIMARY', 'UNIQUE'):
+            continue
+        type_name = TYPE_NAMES.get(tokens[1].upper())
+        if type_name is None:
+            raise ValueError('Unsupported column type {}'.format(tokens[1]))
+        precision, scale = 0, 0
+        params = re.search(r'\((\d+)(?:\s*,\s*(\d+))?\)', definition.split('ENCODING')[0])
+        if params and type_name in ('DECIMAL', 'TIMESTAMP'):
+            precision, scale = int(params.group(1)), int(params.group(2) or 0)
+        dictionary = type_name == 'STR' and 'ENCODING NONE' not in definition.upper()
+        columns.append(TColumnType(
+            col_name=tokens[0].strip('"'),
+            col_type=TTypeInfo(
+                type=TDatumType._NAMES_TO_VALUES[type_name],
+                encoding=TEncodingType.DICT if dictionary else TEncodingType.NONE,
+                nullable='NOT NULL' not in definition.upper(),
+                is_array='[]' in tokens[1],
+                precision=precision,
+                scale=scale,
+                comp_param=32 if dictionary else 0,
+            ),
+        ))
+    return match.group(1), columns
+
+
+def count_lines(path):
+    """
+    Number of lines of a local, optionally compressed, data file
+    """
+    opener = OPENERS.get(os.path.splitext(path)[1].lower(), open)
+    lines = 0
+    with opener(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            lines += chunk.count(b'\n')
+    return lines
+
+
+class FakeMapDHandler(object):
+    """
+    Implements the MapD Thrift service calls used by odlt. Tables, views and dashboards are kept in memory,
+    data is never stored, only the number of loaded rows and bytes per table.
+    """
+    def __init__(self, latency=DEFAULT_LATENCY, ingest_rate=DEFAULT_INGEST_RATE, row_rate=DEFAULT_ROW_RATE):
+        """
+        :param float latency: seconds every call takes
+        :param float ingest_rate: bytes per second ingested by import_table, COPY and the arrow load
+        :param float row_rate: rows per second ingested by load_table
+        """
+        self.latency = latency
+        self.ingest_rate = ingest_rate
+        self.row_rate = row_rate
+        self._lock = threading.Lock()
+        self._sessions = set()
+        self.tables = {}
+        self.views = {}
+        self.dashboards = {}
+        self.loaded = {}
+        self.calls = {}
+
+    def _begin(self, call, session=None):
+        with self._lock:
+            self.calls[call] = self.calls.get(call, 0) + 1
+        if session is not None and session not in self._sessions:
+            raise TMapDException(error_msg='Session not valid.')
+        return time.time()
+
+    def _finish(self, started, cost=0.0):
+        """
+        Wait until the call took ``latency`` plus ``cost`` seconds, work done while handling the call counts
+        """
+        remaining = self.latency + cost - (time.time() - started)
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def _get_table(self, table_name):
+        if table_name not in self.tables:
+            raise TMapDException(error_msg='Table {} does not exist.'.format(table_name))
+        return self.tables[table_name]
+
+    def _record_load(self, table_name, rows, size):
+        with self._lock:
+            loaded = self.loaded.setdefault(table_name, {'rows': 0, 'bytes': 0})
+            loaded['rows'] += rows
+            loaded['bytes'] += size
+
+    def _ingest_files(self, table_name, pattern):
+        self._get_table(table_name)
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*')
+        paths = sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+        if not paths:
+            raise TMapDException(error_msg='File or directory "{}" does not exist.'.format(pattern))
+        size = sum(os.path.getsize(p) for p in paths)
+        # data files of the synthetic libraries have a header line
+        rows = sum(max(count_lines(p) - 1, 0) for p in paths)
+        self._record_load(table_name, rows, size)
+        return rows, size
+
+    def _result(self, message=None):
+        row_desc, columns = [], []
+        if message is not None:
+            row_desc = [TColumnType(col_name='result', col_type=TTypeInfo(
+                type=TDatumType.STR, encoding=TEncodingType.NONE, nullable=True, is_array=False))]
+            columns = [TColumn(data=TColumnData(str_col=[message]), nulls=[False])]
+        return TQueryResult(
+            row_set=TRowSet(row_desc=row_desc, rows=[], columns=columns, is_columnar=True),
+            execution_time_ms=0,
+            total_time_ms=0,
+            nonce='',
+        )
+
+    def connect(self, user, passwd, dbname):
+        started = self._begin('connect')
+        session = uuid.uuid4().hex
+        with self._lock:
+            self._sessions.add(session)
+        self._finish(started)
+        return session
+
+    def disconnect(self, session):
+        started = self._begin('disconnect')
+        with self._lock:
+            self._sessions.discard(session)
+        self._finish(started)
+
+    def get_version(self):
+        return SERVER_VERSION
+
+    def get_server_status(self, session):
+        started = self._begin('get_server_status', session)
+        self._finish(started)
+        return TServerStatus(read_only=False, version=SERVER_VERSION, rendering_enabled=False, start_time=0)
+
+    def sql_execute(self, session, query, column_format, nonce, first_n, at_most_n):
+        started = self._begin('sql_execute', session)
+        message = None
+        if CREATE_TABLE_RE.match(query):
+            try:
+                name, columns = parse_create_table(query)
+            except ValueError as e:
+                raise TMapDException(error_msg=str(e))
+            with self._lock:
+                self.tables[name] = columns
+            self._finish(started)
+        elif CREATE_VIEW_RE.match(query):
+            with self._lock:
+                self.views[CREATE_VIEW_RE.match(query).group(1)] = query
+            self._finish(started)
+        elif COPY_RE.match(query):
+            table_name, pattern = COPY_RE.match(query).groups()
+            rows, size = self._ingest_files(table_name, pattern)
+            message = 'Loaded: {} recs, Rejected: 0 recs in {:.6f} secs'.format(rows, size / self.ingest_rate)
+            self._finish(started, size / self.ingest_rate)
+        elif DROP_RE.match(query):
+            kind, name = DROP_RE.match(query).groups()
+            with self._lock:
+                (self.tables if kind.lower() == 'table' else self.views).pop(name, None)
+            self._finish(started)
+        else:
+            self._finish(started)
+        return self._result(message)
+
+    def get_table_details(self, session, table_name):
+        started = self._begin('get_table_details', session)
+        columns = self._get_table(table_name)
+        self._finish(started)
+        return TTableDetails(row_desc=columns)
+
+    def create_dashboard(self, session, dashboard_name, dashboard_state, image_hash, dashboard_metadata):
+        started = self._begin('create_dashboard', session)
+        with self._lock:
+            dashboard_id = len(self.dashboards) + 1
+            self.dashboards[dashboard_id] = dashboard_name
+        self._finish(started, len(dashboard_state) / self.ingest_rate)
+        return dashboard_id
+
+    def import_table(self, session, table_name, file_name, cp_params):
+        started = self._begin('import_table', session)
+        rows, size = self._ingest_files(table_name, file_name)
+        self._finish(started, size / self.ingest_rate)
+
+    def load_table(self, session, table_name, rows):
+        started = self._begin('load_table', session)
+        self._get_table(table_name)
+        size = sum(len(value.str_val or '') for row in rows for value in row.cols)
+        self._record_load(table_name, len(rows), size)
+        self._finish(started, len(rows) / self.row_rate)
+
+    def load_table_binary_arrow(self, session, table_name, arrow_stream):
+        started = self._begin('load_table_binary_arrow', session)
+        self._get_table(table_name)
+        rows = 0
+        try:
+            import pyarrow as pa
+            rows = pa.ipc.open_stream(arrow_stream).read_all().num_rows
+        except ImportError:
+            pass
+        self._record_load(table_name, rows, len(arrow_stream))
+        self._finish(started, len(arrow_stream) / self.ingest_rate)
+
+
+def create_server(host='localhost', port=6274, **kwargs):
+    """
+    Threaded binary protocol server, each client connection gets its own thread like on OmniSci Core
+    :**kwargs: cost model passed to FakeMapDHandler
+    :return tuple: (TServer, FakeMapDHandler)
+    """
+    handler = FakeMapDHandler(**kwargs)
+    server = TServer.TThreadedServer(
+        MapD.Processor(handler),
+        TSocket.TServerSocket(host=host, port=port),
+        TTransport.TBufferedTransportFactory(),
+        TBinaryProtocol.TBinaryProtocolAcceleratedFactory(),
+        daemon=True,
+    )
+    return server, handler
+
+
+def serve(host='localhost', port=6274, **kwargs):
+    server, _ = create_server(host=host, port=port, **kwargs)
+    logger.info('Fake OmniSci server listening on %s:%s', host, port)
+    server.serve()
+
+
+def start_server_process(host='localhost', port=6274, startup_timeout=10, **kwargs):
+    """
+    Run the server in a child process, so it does not compete with the benchmarked client for the GIL
+    :return multiprocessing.Process: call terminate() when done
+    """
+    import socket
+    process = multiprocessing.Process(target=serve, kwargs=dict(host=host, port=port, **kwargs), daemon=True)
+    process.start()
+    deadline = time.time() + startup_timeout
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return process
+        except OSError:
+            if not process.is_alive() or time.time() > deadline:
+                process.terminate()
+                raise RuntimeError('Fake OmniSci server did not start on {}:{}'.format(host, port))
+            time.sleep(0.05)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local fake OmniSci Core server for benchmarks')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=6274)
+    parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY, help='seconds every call takes')
+    parser.add_argument('--ingest-rate', type=float, default=DEFAULT_INGEST_RATE, help='bytes per second ingested by file and arrow loads')
+    parser.add_argument('--row-rate', type=float, default=DEFAULT_ROW_RATE, help='rows per second ingested by load_table')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    serve(host=args.host, port=args.port, latency=args.latency, ingest_rate=args.ingest_rate, row_rate=args.row_rate)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+
+benchmarks.run
+=================================
+
+Times each LibraryImport phase against the local fake OmniSci server and compares the results with a
+stored baseline. Exits with status 1 if a phase got slower than the baseline by more than the tolerance.
+
+Ex:
+
+python -m benchmarks.run --tables 8 --files-per-table 16 --modes api,copy,arrow --save-baseline
+python -m benchmarks.run --tables 8 --files-per-table 16 --modes api,copy,arrow
+"""
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+
+from benchmarks.fake_server import DEFAULT_INGEST_RATE, DEFAULT_LATENCY, DEFAULT_ROW_RATE, start_server_process
+from benchmarks.synthetic import generate_library
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_TOLERANCE = 0.2
+
+LOAD_MODES = {
+    'api': {},
+    'copy': {'use_copy_from_qry': True},
+    'arrow': {'use_arrow': True},
+}
+
+
+class PhaseTimer(object):
+    """
+    Collects duration and volume of the benchmarked phases
+    """
+    def __init__(self):
+        self.phases = {}
+
+    def run(self, phase, func, files=0, size=0, rows=0):
+        started = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - started
+        self.phases[phase] = {
+            'seconds': seconds,
+            'files': files,
+            'bytes': size,
+            'rows': rows,
+            'files_per_s': files / seconds if seconds else 0.0,
+            'mb_per_s': size / seconds / 1024 / 1024 if seconds else 0.0,
+            'rows_per_s': rows / seconds if seconds else 0.0,
+        }
+        return self.phases[phase]
+
+
+def _library_volume(libpath, pattern):
+    paths = [path for path in glob.glob(os.path.join(libpath, pattern)) if os.path.isfile(path)]
+    return len(paths), sum(os.path.getsize(path) for path in paths)
+
+
+def run_benchmark(libpath, stats, modes=('api', 'copy', 'arrow'), workers=4, plan=True, port=6274):
+    """
+    Run every import phase once against a fake server listening on ``port``
+    :param dict stats: library counts as returned by generate_library
+    :return dict: phase name -> timings
+    """
+    from odlt import LibraryImport
+
+    timer = PhaseTimer()
+    imp = LibraryImport()
+    imp.connect(host='localhost', port=port, protocol='binary', pool_max_size=workers + 1)
+    try:
+        schema_files, schema_size = _library_volume(libpath, os.path.join('tables', '*', 'schema.sql'))
+        view_files, view_size = _library_volume(libpath, os.path.join('views', '*.sql'))
+        dashboard_files, dashboard_size = _library_volume(libpath, os.path.join('dashboards', '*.json'))
+
+        timer.run('discovery', lambda: imp.refresh() and imp.plan_load(libpath, max_workers=workers),
+                  files=stats['files'] + schema_files + view_files + dashboard_files)
+        timer.run('create_tables', lambda: imp.create_tables(libpath), files=schema_files, size=schema_size)
+        timer.run('create_views', lambda: imp.create_views(libpath), files=view_files, size=view_size)
+        timer.run('import_dashboards', lambda: imp.import_dashboards(libpath), files=dashboard_files, size=dashboard_size)
+        for mode in modes:
+            options = dict(LOAD_MODES[mode], parallel=True, max_workers=workers, plan=plan)
+            timer.run(
+                'load_data_{}'.format(mode),
+                lambda: imp.load_data(libpath, corepath=libpath, **options),
+                files=stats['files'], size=stats['bytes'], rows=stats['rows'],
+            )
+        if imp.errors:
+            raise RuntimeError('Benchmark run had errors: {}'.format(imp.errors))
+    finally:
+        imp.close()
+    return timer.phases
+
+
+def compare_with_baseline(phases, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    :return list: (phase, seconds, baseline seconds, regressed) of the phases present in both runs
+    """
+    comparison = []
+    for phase, timings in phases.items():
+        if phase not in baseline:
+            continue
+        previous = baseline[phase]['seconds']
+        comparison.append((phase, timings['seconds'], previous, timings['seconds'] > previous * (1 + tolerance)))
+    return comparison
+
+
+def format_report(phases, comparison=None):
+    lines = ['{:<22} {:>9} {:>10} {:>10} {:>12} {:>10}'.format('phase', 'seconds', 'files/s', 'MB/s', 'rows/s', 'baseline')]
+    baseline = {phase: (previous, regressed) for phase, _, previous, regressed in comparison or []}
+    for phase, timings in phases.items():
+        reference = ''
+        if phase in baseline:
+            previous, regressed = baseline[phase]
+            reference = '{:+.0%}{}'.format(timings['seconds'] / previous - 1 if previous else 0.0, ' !' if regressed else '')
+        lines.append('{:<22} {:>9.3f} {:>10.1f} {:>10.2f} {:>12.0f} {:>10}'.format(
+            phase, timings['seconds'], timings['files_per_s'], timings['mb_per_s'], timings['rows_per_s'], reference))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark odlt import phases against a local fake OmniSci server')
+    parser.add_argument('--library', help='existing local library to import, a synthetic library is generated otherwise')
+    parser.add_argument('--tables', type=int, default=4)
+    parser.add_argument('--files-per-table', type=int, default=8)
+    parser.add_argument('--rows-per-file', type=int, default=20000)
+    parser.add_argument('--compression', choices=('none', 'gzip', 'bzip2'), default='gzip')
+    parser.add_argument('--size-skew', type=float, default=0.0)
+    parser.add_argument('--views', type=int, default=4)
+    parser.add_argument('--dashboards', type=int, default=4)
+    parser.add_argument('--modes', default='api,copy,arrow', help='comma separated load modes: api, copy, arrow')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--no-plan', action='store_true', help='load table by table instead of using the load planner')
+    parser.add_argument('--port', type=int, default=6274)
+    parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY)
+    parser.add_argument('--ingest-rate', type=float, default=DEFAULT_INGEST_RATE)
+    parser.add_argument('--row-rate', type=float, default=DEFAULT_ROW_RATE)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='allowed slowdown per phase (default 0.2)')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    for mode in modes:
+        if mode not in LOAD_MODES:
+            parser.error('Unknown load mode {}'.format(mode))
+    config = {
+        'tables': args.tables, 'files_per_table': args.files_per_table, 'rows_per_file': args.rows_per_file,
+        'compression': args.compression, 'size_skew': args.size_skew, 'workers': args.workers, 'plan': not args.no_plan,
+        'latency': args.latency, 'ingest_rate': args.ingest_rate, 'row_rate': args.row_rate, 'library': args.library,
+    }
+
+    tmpdir = None
+    if args.library:
+        libpath = os.path.abspath(args.library)
+        files, size = _library_volume(libpath, os.path.join('tables', '*', 'data', '*'))
+        # rows of an existing library are not counted, rows/s is reported as 0
+        stats = {'files': files, 'bytes': size, 'rows': 0}
+    else:
+        tmpdir = tempfile.mkdtemp(prefix='odlt-benchmark-')
+        libpath = os.path.join(tmpdir, 'library')
+        stats = generate_library(
+            libpath, tables=args.tables, files_per_table=args.files_per_table, rows_per_file=args.rows_per_file,
+            compression=None if args.compression == 'none' else args.compression, views=args.views,
+            dashboards=args.dashboards, size_skew=args.size_skew,
+        )
+
+    server = start_server_process(port=args.port, latency=args.latency, ingest_rate=args.ingest_rate, row_rate=args.row_rate)
+    try:
+        phases = run_benchmark(libpath, stats, modes=modes, workers=args.workers, plan=not args.no_plan, port=args.port)
+    finally:
+        server.terminate()
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    comparison = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != config:
+            print('Baseline was recorded with a different configuration: {}'.format(baseline.get('config')))
+        comparison = compare_with_baseline(phases, baseline['phases'], tolerance=args.tolerance)
+    print(format_report(phases, comparison))
+
+    result = {'config': config, 'phases': phases}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print('Baseline saved to {}'.format(args.baseline))
+    if comparison and any(regressed for *_, regressed in comparison):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+
+benchmarks.synthetic
+=================================
+
+Generator of synthetic data libraries in the layout described in the README.
+
+Ex:
+
+generate_library('/tmp/synthetic', tables=8, files_per_table=16, rows_per_file=50000, compression='gzip')
+"""
+import os
+import bz2
+import gzip
+import json
+import random
+
+OPENERS = {
+    None: open,
+    'gzip': gzip.open,
+    'bzip2': bz2.open,
+}
+
+EXTENSIONS = {
+    None: '.csv',
+    'gzip': '.csv.gz',
+    'bzip2': '.csv.bz2',
+}
+
+SCHEMA = '''CREATE TABLE {name} (
+  id BIGINT,
+  value DOUBLE,
+  category TEXT ENCODING DICT(32),
+  label TEXT ENCODING DICT(32)
+);
+'''
+
+
+def _write_data_file(path, compression, rows, start_id, rnd):
+    with OPENERS[compression](path, 'wt') as f:
+        f.write('id,value,category,label\n')
+        for row_id in range(start_id, start_id + rows):
+            f.write('{},{:.6f},cat{},"label {}"\n'.format(row_id, rnd.random(), rnd.randint(0, 99), rnd.randint(0, 9999)))
+
+
+def generate_library(path, tables=4, files_per_table=4, rows_per_file=10000, compression='gzip', views=2,
+                     dashboards=2, size_skew=0.0, seed=0):
+    """
+    Write a synthetic data library
+    :param str path: library root, created if missing
+    :param int tables: number of tables
+    :param int files_per_table: data files per table
+    :param int rows_per_file: rows of an average data file
+    :param str compression: gzip, bzip2 or None
+    :param int views: number of views, each selecting from one table
+    :param int dashboards: number of dashboards, each reading from one table or view
+    :param float size_skew: 0 gives equally sized files, larger values make the first file of each table bigger
+        by a factor of ``1 + size_skew * files_per_table``
+    :param int seed: random seed, the same arguments always produce the same library
+    :return dict: counts of the generated tables, files, rows and bytes
+    """
+    rnd = random.Random(seed)
+    stats = {'tables': tables, 'files': 0, 'rows': 0, 'bytes': 0, 'views': views, 'dashboards': dashboards}
+    table_names = ['table_{}'.format(i) for i in range(tables)]
+    for name in table_names:
+        datadir = os.path.join(path, 'tables', name, 'data')
+        os.makedirs(datadir, exist_ok=True)
+        with open(os.path.join(path, 'tables', name, 'schema.sql'), 'w') as f:
+            f.write(SCHEMA.format(name=name))
+        row_id = 0
+        for part in range(files_per_table):
+            rows = rows_per_file
+            if part == 0 and size_skew:
+                rows = int(rows_per_file * (1 + size_skew * files_per_table))
+            filepath = os.path.join(datadir, 'part-{:05d}{}'.format(part, EXTENSIONS[compression]))
+            _write_data_file(filepath, compression, rows, row_id, rnd)
+            row_id += rows
+            stats['files'] += 1
+            stats['rows'] += rows
+            stats['bytes'] += os.path.getsize(filepath)
+
+    view_names = []
+    if views:
+        os.makedirs(os.path.join(path, 'views'), exist_ok=True)
+    for i in range(views):
+        view_name = 'view_{}'.format(i)
+        view_names.append(view_name)
+        with open(os.path.join(path, 'views', '{}.sql'.format(view_name)), 'w') as f:
+            f.write('CREATE VIEW {} AS SELECT * FROM {} WHERE value > 0.5;\n'.format(view_name, table_names[i % tables]))
+
+    if dashboards:
+        os.makedirs(os.path.join(path, 'dashboards'), exist_ok=True)
+    sources = view_names + table_names
+    for i in range(dashboards):
+        source = sources[i % len(sources)]
+        definition = {
+            'dashboard': {'title': 'dashboard_{}'.format(i), 'table': source, 'dataSources': {source: {'name': source}}},
+            'charts': [{'type': 'bar', 'dataSource': source, 'dimension': 'category', 'measure': 'COUNT(*)'}],
+        }
+        with open(os.path.join(path, 'dashboards', 'dashboard_{}.json'.format(i)), 'w') as f:
+            f.write('dashboard_{}\n'.format(i))
+            f.write(json.dumps({'table': source, 'version': 'v2'}) + '\n')
+            f.write(json.dumps(definition) + '\n')
+
+    return stats
@@ -1,3 +1,20 @@
-from odlt.importer import *
+# the importer and exporter are loaded on first access, so the command line and modules which don't need them start fast
+_LAZY_ATTRIBUTES = {
+    'LibraryImport': 'odlt.importer',
+    'LibraryExport': 'odlt.exporter',
+}
 
-__all__ = ['LibraryImport']
+__all__ = ['LibraryImport', 'LibraryExport']
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
@@ -0,0 +1,144 @@
+"""
+
+odlt.adaptive
+=================================
+
+Adaptive concurrency of data loads. Instead of a fixed number of parallel loads and a fixed ``threads`` copy
+param, the controller measures the latency of every load, normalized by its size, and adjusts both AIMD style:
+after a window of loads as fast as the fastest seen so far, one more load may run at the same time and every
+load gets one more thread; a failed load or one much slower than that halves both.
+
+Ex:
+
+controller = AdaptiveController(max_limit=8, max_threads=16)
+with controller.slot(size=os.path.getsize(path)) as threads:
+    conn._client.import_table(session=conn._session, table_name='flights', file_name=path, copy_params=TCopyParams(threads=threads))
+"""
+import math
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger('odlt')
+
+# loads smaller than this count as this many bytes, so per call overhead does not dominate the normalized latency
+MIN_NORMALIZED_SIZE = 1024 * 1024
+
+
+class AdaptiveController(object):
+    """
+    Thread safe AIMD controller of the loads in flight and the ``threads`` copy param of every load.
+
+    public attributes:
+      - limit   : int  :  loads allowed to run at the same time
+      - threads : int  :  threads copy param of the next load, None if threads are not controlled
+    """
+    def __init__(self, initial_limit=2, min_limit=1, max_limit=8, threads=None, min_threads=1, max_threads=None,
+                 latency_tolerance=2.0, decrease_factor=0.5):
+        """
+        :param int initial_limit: loads allowed in flight at the start
+        :param int min_limit: loads in flight never go below this
+        :param int max_limit: loads in flight never go above this
+        :param int threads: (optional) threads per load at the start, defaults to ``max_threads``
+        :param int min_threads: threads per load never go below this
+        :param int max_threads: (optional) threads per load never go above this, the threads copy param is left
+            to the server if neither this nor ``threads`` is passed
+        :param float latency_tolerance: a load is congested if its normalized latency exceeds the best seen by this factor
+        :param float decrease_factor: multiplicative decrease applied on congestion
+        """
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError('Expected 1 <= min_limit <= max_limit')
+        if latency_tolerance <= 1 or not 0 < decrease_factor < 1:
+            raise ValueError('Expected latency_tolerance > 1 and 0 < decrease_factor < 1')
+        max_threads = max_threads or threads
+        if max_threads is not None and not 1 <= min_threads <= max_threads:
+            raise ValueError('Expected 1 <= min_threads <= max_threads')
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.min_threads = min_threads
+        self.max_threads = max_threads
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+        self.limit = min(max(initial_limit, min_limit), max_limit)
+        self.threads = None if max_threads is None else min(max(threads or max_threads, min_threads), max_threads)
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._best = None
+        self._epoch = 0
+        self._successes = 0
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def acquire(self, timeout=None):
+        """
+        Wait until one more load may run
+        :param float timeout: (optional) seconds to wait, waits forever if not passed
+        :return tuple: (epoch, threads) to pass to ``release``
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._in_flight < self.limit, timeout=timeout):
+                raise ValueError('Timed out waiting for a load slot')
+            self._in_flight += 1
+            return self._epoch, self.threads
+
+    def release(self, epoch, latency, size=0, error=False):
+        """
+        Record the outcome of a load started with ``acquire``
+        :param int epoch: epoch returned by ``acquire``, loads started before the last change don't trigger another one
+        :param float latency: seconds the load took
+        :param int size: bytes loaded
+        :param bool error: whether the load failed
+        """
+        with self._cond:
+            self._in_flight -= 1
+            cost = latency / (max(size, MIN_NORMALIZED_SIZE) / MIN_NORMALIZED_SIZE)
+            if not error:
+                self._best = cost if self._best is None else min(self._best, cost)
+            if epoch == self._epoch:
+                if error or cost > self._best * self.latency_tolerance:
+                    self._decrease('failed load' if error else 'slow load')
+                else:
+                    self._successes += 1
+                    if self._successes >= self.limit:
+                        self._increase()
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, size=0):
+        """
+        Run the enclosed load as one of the loads in flight, an exception counts as a failed load
+        :param int size: bytes loaded
+        :return int: threads copy param to use, None if threads are not controlled
+        """
+        epoch, threads = self.acquire()
+        started = time.perf_counter()
+        error = False
+        try:
+            yield threads
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.release(epoch, time.perf_counter() - started, size=size, error=error)
+
+    def _increase(self):
+        limit, threads = min(self.limit + 1, self.max_limit), self.threads
+        if threads is not None:
+            threads = min(threads + 1, self.max_threads)
+        self._change(limit, threads, 'window completed')
+
+    def _decrease(self, reason):
+        limit, threads = max(int(math.floor(self.limit * self.decrease_factor)), self.min_limit), self.threads
+        if threads is not None:
+            threads = max(int(math.floor(threads * self.decrease_factor)), self.min_threads)
+        self._change(limit, threads, reason)
+
+    def _change(self, limit, threads, reason):
+        self._epoch += 1
+        self._successes = 0
+        if (limit, threads) != (self.limit, self.threads):
+            logger.info('Adaptive load concurrency %s -> %s, threads %s -> %s (%s)', self.limit, limit, self.threads, threads, reason)
+        self.limit, self.threads = limit, threads
@@ -0,0 +1,281 @@
+"""
+
+odlt.aio
+=================================
+
+asyncio API of the importer. pymapd and boto3 are blocking, so every S3 read and every server call runs in a
+thread pool, bounded by one semaphore for source reads and one for server calls. Discovery, naming of the
+library objects and the dependency graph are the ones of ``LibraryImport``, so both APIs import a library
+the same way. Several imports can share one event loop and one executor.
+
+Ex:
+
+async def provision(paths):
+    executor = ThreadPoolExecutor(max_workers=32)
+    imports = [AsyncLibraryImport(executor=executor) for path in paths]
+    for imp in imports:
+        await imp.connect(host='omnisci.internal')
+    await asyncio.gather(*(imp.import_all(path) for imp, path in zip(imports, paths)))
+"""
+import asyncio
+import logging
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from odlt.importer import LibraryImport
+from odlt.streaming import DEFAULT_BATCH_SIZE
+from odlt.columnar import DEFAULT_BLOCK_SIZE
+from odlt.validate import DEFAULT_SAMPLE_SIZE
+
+logger = logging.getLogger('odlt')
+
+# source reads (listings, schema, view and dashboard files) running at the same time
+DEFAULT_IO_CONCURRENCY = 16
+# server calls (DDL, dashboard uploads, table loads) running at the same time, each on its own pooled connection
+DEFAULT_SERVER_CONCURRENCY = 4
+
+
+class AsyncLibraryImport(object):
+    """
+    Awaitable counterpart of ``LibraryImport``, see ``library`` for the wrapped importer.
+
+    public attributes:
+      - io_concurrency     : int : source reads running at the same time
+      - server_concurrency : int : server calls running at the same time
+    """
+    def __init__(self, conn=None, io_concurrency=DEFAULT_IO_CONCURRENCY, server_concurrency=DEFAULT_SERVER_CONCURRENCY,
+                 executor=None, **kwargs):
+        """
+        :param pymapd.connection.Connection object conn: (optional) core instance connection. A single connection is not
+            shared between threads, server calls then run one at a time
+        :param int io_concurrency: maximum number of source reads running at the same time
+        :param int server_concurrency: maximum number of server calls running at the same time, should not exceed the
+            connection pool size
+        :param concurrent.futures.Executor executor: (optional) thread pool shared with other imports, by default every
+            import has its own one which is shut down by ``close``
+        :**kwargs: passed to ``LibraryImport``
+        """
+        if io_concurrency < 1 or server_concurrency < 1:
+            raise ValueError('Concurrency limits must be at least 1')
+        self._imp = LibraryImport(conn=conn, **kwargs)
+        self.io_concurrency = io_concurrency
+        self.server_concurrency = server_concurrency
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=io_concurrency + server_concurrency)
+        self._io_semaphore = asyncio.Semaphore(io_concurrency)
+        self._server_semaphore = asyncio.Semaphore(server_concurrency)
+        self._conn_semaphore = asyncio.Semaphore(1)
+
+    @property
+    def library(self):
+        return self._imp
+    @property
+    def source(self):
+        return self._imp.source
+    @property
+    def errors(self):
+        return self._imp.errors
+    @property
+    def metrics(self):
+        return self._imp.metrics
+    @property
+    def datalibrary(self):
+        """
+        Discovered datalibrary, None until ``discover`` ran
+        """
+        return self._imp._datalibrary
+
+    async def _run(self, func, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def _run_io(self, func, *args, **kwargs):
+        async with self._io_semaphore:
+            return await self._run(func, *args, **kwargs)
+
+    async def _run_server(self, func, *args, **kwargs):
+        # without a pool every call shares the connection passed on initialization
+        semaphore = self._server_semaphore if self._imp.pool is not None else self._conn_semaphore
+        async with semaphore:
+            return await self._run(func, *args, **kwargs)
+
+    async def connect(self, **kwargs):
+        """
+        Open the connection pool, see ``LibraryImport.connect``
+        """
+        return await self._run(self._imp.connect, **kwargs)
+
+    async def close(self):
+        """
+        Close all pooled connections and the executor owned by this import
+        """
+        await self._run(self._imp.close)
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
+        return True
+
+    def _discover(self, localpath):
+        self._imp._initialize_localpath(localpath)
+        return self._imp.datalibrary
+
+    async def discover(self, localpath):
+        """
+        Resolve the datalibrary, as ``LibraryImport.datalibrary`` does
+        :return dict
+        """
+        return await self._run_io(self._discover, localpath)
+
+    async def _fetch(self, path_or_obj):
+        return await self._run_io(self._imp._get_file_or_obj_content, path_or_obj)
+
+    async def _fetch_and_run(self, create, path_or_obj):
+        content = await self._fetch(path_or_obj)
+        return await self._run_server(create, path_or_obj, content=content)
+
+    async def create_tables(self, localpath):
+        """
+        Create tables from schema queries, every table is created as soon as its schema file is read
+        """
+        datalibrary = await self.discover(localpath)
+        schemafiles = [tbldetails.get('schema') for tbldetails in datalibrary['tables'].values()]
+        await asyncio.gather(*(self._fetch_and_run(self._imp._create_table, schemafile) for schemafile in schemafiles))
+        return True
+
+    async def create_views(self, localpath):
+        """
+        Create views in library order, a view can select from the views before it. The files are read concurrently.
+        """
+        datalibrary = await self.discover(localpath)
+        contents = await asyncio.gather(*(self._fetch(viewfile) for viewfile in datalibrary['views']))
+        for viewfile, content in zip(datalibrary['views'], contents):
+            await self._run_server(self._imp._create_view, viewfile, content=content)
+        return True
+
+    async def import_dashboards(self, localpath):
+        datalibrary = await self.discover(localpath)
+        await asyncio.gather(*(self._fetch_and_run(self._imp._import_dashboard, dashfile) for dashfile in datalibrary['dashboards']))
+        return True
+
+    async def _load_table(self, tblname, datapath, **kwargs):
+        try:
+            await self._run_server(self._imp._load_table_data, tblname, datapath, **kwargs)
+        except Exception as e:
+            self._imp._record_error('load_data', tblname, e)
+
+    async def load_data(self, localpath, corepath=None, use_copy_from_qry=False, use_arrow=False, resume=False, manifest_path=None,
+                        incremental=False, watermarks=None, batch_size=DEFAULT_BATCH_SIZE, block_size=DEFAULT_BLOCK_SIZE,
+                        validate=None, adaptive=None, **kwargs):
+        """
+        Load data into the created tables, up to ``server_concurrency`` tables at the same time.
+        Failed tables are collected into ``errors``.
+        :param validate: (optional) True or 'full', data files are checked and quarantined first, see ``LibraryImport.load_data``
+        :param adaptive: not supported, the loads in flight are bounded by ``server_concurrency``, raises a ValueError
+        :**kwargs: copy params, see ``LibraryImport.load_data``. ``parallel``, ``max_workers`` and ``plan`` are ignored
+        """
+        if adaptive:
+            raise ValueError('Adaptive loads are not supported by AsyncLibraryImport, use server_concurrency to bound the loads')
+        for name in ('parallel', 'max_workers', 'plan'):
+            kwargs.pop(name, None)
+        self._imp._check_copy_params(kwargs)
+        datalibrary = await self.discover(localpath)
+        if validate:
+            await self._run_io(self._imp.validate, localpath, sample_size=None if validate == 'full' else DEFAULT_SAMPLE_SIZE,
+                               quarantine=True, **kwargs)
+        await self._run_io(self._imp._open_manifest, resume=resume or incremental, manifest_path=manifest_path)
+        await self._run_server(self._imp._prepare_watermarks, watermarks, use_arrow=use_arrow, batch_size=batch_size,
+                               block_size=block_size, **kwargs)
+        try:
+            await asyncio.gather(*(
+                self._load_table(tblname, tbldetails['data'], corepath=corepath, use_copy_from_qry=use_copy_from_qry, use_arrow=use_arrow,
+                                 batch_size=batch_size, block_size=block_size, **kwargs)
+                for tblname, tbldetails in datalibrary['tables'].items() if tbldetails['data']
+            ))
+            await self._run_server(self._imp._record_watermarks)
+        finally:
+            self._imp._watermarks = {}
+            await self._run_io(self._imp._flush_manifest)
+        self.metrics.flush()
+        return True
+
+    async def _read_library_objects(self):
+        """
+        Fetch every schema, view and dashboard file concurrently, see ``LibraryImport._read_library_objects``
+        """
+        files = self._imp._get_library_object_files()
+        contents = await asyncio.gather(*(self._fetch(path_or_obj) for _, _, path_or_obj in files))
+        return self._imp._get_library_objects(files, contents)
+
+    async def _run_graph(self, dag):
+        """
+        Run the nodes of an import graph as tasks, every node waits for its dependencies and is skipped if one failed
+        :return dict: node names grouped into completed, failed (name -> exception) and skipped
+        """
+        result = {'completed': [], 'failed': {}, 'skipped': []}
+        tasks = {}
+
+        async def run_node(name):
+            if not all(await asyncio.gather(*(tasks[dependency] for dependency in dag.dependencies(name)))):
+                logger.warning('Skipping %s, a dependency failed', name)
+                result['skipped'].append(name)
+                return False
+            try:
+                await self._run_server(dag.func(name))
+            except Exception as e:
+                result['failed'][name] = e
+                self._imp._record_error('import_all', name, e)
+                return False
+            result['completed'].append(name)
+            return True
+
+        # in topological order every dependency has its task before its dependents
+        for name in dag.order():
+            tasks[name] = asyncio.ensure_future(run_node(name))
+        await asyncio.gather(*tasks.values())
+        return result
+
+    async def import_all(self, localpath, corepath=None, resume=False, manifest_path=None, sync=False, sync_state_path=None,
+                         replace_tables=False, use_copy_from_qry=False, use_arrow=False, batch_size=DEFAULT_BATCH_SIZE,
+                         block_size=DEFAULT_BLOCK_SIZE, incremental=False, watermarks=None, validate=None, adaptive=None, **kwargs):
+        """
+        Create tables, views and dashboards and load the table data. Every step runs as soon as the objects it
+        depends on exist, see ``LibraryImport.import_all``.
+        Failed steps are collected into ``errors`` and the steps depending on them are skipped.
+        :param validate: (optional) True or 'full', data files are checked and quarantined before anything is created
+        :param adaptive: not supported, the loads in flight are bounded by ``server_concurrency``, raises a ValueError
+        ``use_copy_from_qry``, ``use_arrow``, ``batch_size``, ``block_size``, ``incremental`` and ``watermarks`` are
+        the ones of ``LibraryImport.load_data``, watermarks are read once their table exists
+        :**kwargs: copy params, see ``LibraryImport.load_data``. ``parallel``, ``max_workers`` and ``plan`` are ignored,
+            every table is loaded by its own step
+        """
+        if adaptive:
+            raise ValueError('Adaptive loads are not supported by AsyncLibraryImport, use server_concurrency to bound the loads')
+        for name in ('parallel', 'max_workers', 'plan'):
+            kwargs.pop(name, None)
+        self._imp._check_copy_params(kwargs)
+        await self.discover(localpath)
+        if validate:
+            await self._run_io(self._imp.validate, localpath, sample_size=None if validate == 'full' else DEFAULT_SAMPLE_SIZE,
+                               quarantine=True, **kwargs)
+        await self._run_io(self._imp._open_manifest, resume=resume or incremental, manifest_path=manifest_path)
+        await self._run_server(self._imp._prepare_watermarks, None, use_arrow=use_arrow, batch_size=batch_size,
+                               block_size=block_size, **kwargs)
+        objects = await self._read_library_objects()
+        sync_plan = None
+        if sync:
+            sync_plan = await self._run_server(
+                self._imp.plan_sync, localpath, state_path=sync_state_path, replace_tables=replace_tables, objects=objects
+            )
+            logger.info('Sync plan:\n%s', sync_plan.describe())
+        dag = self._imp._build_import_graph(corepath=corepath, sync_plan=sync_plan, objects=objects, watermarks=watermarks,
+                                            use_copy_from_qry=use_copy_from_qry, use_arrow=use_arrow, batch_size=batch_size,
+                                            block_size=block_size, **kwargs)
+        try:
+            result = await self._run_graph(dag)
+            await self._run_server(self._imp._record_watermarks)
+        finally:
+            self._imp._watermarks = {}
+            await self._run_io(self._imp._flush_manifest)
+            if sync_plan is not None:
+                await self._run_io(self._imp._sync_state.save)
+        for node in result['skipped']:
+            self._imp._record_error('import_all', node, ValueError('Skipped because a dependency failed'))
+        self.metrics.flush()
+        return True
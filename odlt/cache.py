@@ -0,0 +1,214 @@
+"""
+
+odlt.cache
+=================================
+
+Local content cache of S3 library objects, shared by importer processes on the same machine. Objects are keyed by
+bucket, key and ETag, so a changed object is fetched again and never served stale. Objects whose ETag is not
+known, like the schema, view and dashboard files of an indexed library, bypass the cache. Entries are written to a
+temporary file and renamed into place once complete, readers never see a partial object. The cache is capped in
+size, the least recently used entries are evicted under an exclusive lock on the cache directory.
+
+Ex:
+
+cache = ContentCache('/var/cache/odlt', max_size=20 * 1024 ** 3)
+imp = LibraryImport(cache=cache)
+"""
+import os
+import time
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from odlt.streaming import DEFAULT_CHUNK_SIZE, iter_file_chunks, iter_s3_object_chunks
+from odlt.utils import atomic_write
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+logger = logging.getLogger('odlt')
+
+DEFAULT_MAX_SIZE = 10 * 1024 * 1024 * 1024
+# hits refresh the recency of an entry at most this often, in seconds
+TOUCH_INTERVAL = 60
+
+
+def get_default_cache_path():
+    return os.path.join(os.path.expanduser('~'), '.odlt', 'cache')
+
+
+class ContentCache(object):
+    """
+    public attributes:
+      - path     : str : cache directory
+      - max_size : int : bytes kept on disk, least recently used entries beyond it are evicted
+      - hits     : int : objects served from disk by this instance
+      - misses   : int : objects fetched from S3 by this instance
+    """
+    def __init__(self, path=None, max_size=DEFAULT_MAX_SIZE):
+        """
+        :param str path: (optional) cache directory, defaults to ~/.odlt/cache
+        :param int max_size: size cap in bytes
+        """
+        if max_size <= 0:
+            raise ValueError('The cache size must be positive')
+        self.path = path or get_default_cache_path()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._objects = os.path.join(self.path, 'objects')
+        self._lock = threading.Lock()
+        os.makedirs(self._objects, exist_ok=True)
+
+    def _get_entry_path(self, bucket, key, etag):
+        digest = hashlib.sha1('\n'.join((bucket, key, etag)).encode()).hexdigest()
+        return os.path.join(self._objects, digest[:2], digest)
+
+    @staticmethod
+    def _get_object_id(obj):
+        """
+        :return tuple: (bucket, key, etag), None if the ETag of the object is not known
+        """
+        if not obj.e_tag:
+            return None
+        return obj.bucket_name, obj.key, obj.e_tag
+
+    @contextmanager
+    def _exclusive(self):
+        """
+        Exclusive lock on the cache directory, across threads and processes
+        """
+        with self._lock:
+            with open(os.path.join(self.path, '.lock'), 'a') as f:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _open_entry(self, entry_path):
+        """
+        :return file object of a cached entry, None on a miss
+        """
+        try:
+            f = open(entry_path, 'rb')
+        except FileNotFoundError:
+            return None
+        # the mtime orders entries for eviction
+        try:
+            if time.time() - os.fstat(f.fileno()).st_mtime > TOUCH_INTERVAL:
+                os.utime(entry_path)
+        except OSError:
+            pass
+        return f
+
+    def iter_chunks(self, obj, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Chunks of an s3 object, read from disk when cached. Otherwise the object is fetched with ranged GETs and
+        written to the cache as it is consumed, an entry is only added once the object was read completely.
+        :param s3.ObjectSummary obj: s3 object
+        """
+        object_id = self._get_object_id(obj)
+        if object_id is None:
+            yield from iter_s3_object_chunks(obj, chunk_size=chunk_size)
+            return
+        entry_path = self._get_entry_path(*object_id)
+        f = self._open_entry(entry_path)
+        if f is not None:
+            self._record(True)
+            with f:
+                yield from iter_file_chunks(f, chunk_size=chunk_size)
+            return
+        self._record(False)
+        if obj.size > self.max_size:
+            yield from iter_s3_object_chunks(obj, chunk_size=chunk_size)
+            return
+        yield from self._fetch(obj, entry_path, iter_s3_object_chunks(obj, chunk_size=chunk_size))
+
+    def read(self, obj):
+        """
+        Content of an s3 object, read from disk when cached
+        :param s3.ObjectSummary obj: s3 object
+        :return bytes
+        """
+        object_id = self._get_object_id(obj)
+        if object_id is None:
+            return obj.get()['Body'].read()
+        entry_path = self._get_entry_path(*object_id)
+        f = self._open_entry(entry_path)
+        if f is not None:
+            self._record(True)
+            with f:
+                return f.read()
+        self._record(False)
+        content = obj.get()['Body'].read()
+        if len(content) <= self.max_size:
+            for _ in self._fetch(obj, entry_path, [content]):
+                pass
+        return content
+
+    def _fetch(self, obj, entry_path, chunks):
+        """
+        Pass the chunks through while writing them to a temporary file, which becomes the entry when complete
+        """
+        size = 0
+
+        def replace(tmppath, entry_path):
+            with self._exclusive():
+                self._evict(self.max_size - size)
+                os.replace(tmppath, entry_path)
+
+        with atomic_write(entry_path, mode='wb', replace=replace) as f:
+            for chunk in chunks:
+                f.write(chunk)
+                size += len(chunk)
+                yield chunk
+
+    def _iter_entries(self):
+        for root, _, filenames in os.walk(self._objects):
+            for filename in filenames:
+                if filename.startswith('.tmp-'):
+                    continue
+                entry_path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(entry_path)
+                except FileNotFoundError:
+                    continue
+                yield entry_path, stat.st_size, stat.st_mtime
+
+    def size(self):
+        """
+        Bytes of all entries on disk
+        """
+        return sum(size for _, size, _ in self._iter_entries())
+
+    def _evict(self, max_size):
+        """
+        Remove the least recently used entries until at most ``max_size`` bytes are left. Holds the exclusive lock.
+        """
+        entries = sorted(self._iter_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for entry_path, size, _ in entries:
+            if total <= max_size:
+                break
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            logger.debug('Evicted %s from the content cache', entry_path)
+
+    def clear(self):
+        with self._exclusive():
+            self._evict(0)
@@ -0,0 +1,198 @@
+"""
+
+odlt.cli
+=================================
+
+Command line entry point, installed as ``odlt``. The importer and its dependencies (boto3, pymapd) are only imported
+once a command runs, so ``--help`` and argument errors return immediately.
+
+Ex:
+
+odlt import s3://some-s3-bucket/meaningfulname --host omnisci --arrow --parallel --workers 8
+odlt load /home/myuser/meaningfulname --corepath /opt/mapd/meaningfulname --copy --resume
+odlt plan /home/myuser/meaningfulname --workers 8
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+
+logger = logging.getLogger('odlt')
+
+
+def _key_value(text):
+    key, sep, value = text.partition('=')
+    if not sep or not key:
+        raise argparse.ArgumentTypeError('expected KEY=VALUE, got {}'.format(text))
+    return key, value
+
+
+def _add_library_arguments(parser):
+    parser.add_argument('library', help='local path or s3://bucket/prefix of the datalibrary')
+    parser.add_argument('--s3-access-key', default=os.environ.get('AWS_ACCESS_KEY_ID'))
+    parser.add_argument('--s3-secret-key', default=os.environ.get('AWS_SECRET_ACCESS_KEY'))
+    parser.add_argument('--s3-region', default=os.environ.get('AWS_DEFAULT_REGION'))
+    parser.add_argument('--no-index', action='store_true', help='scan the library even if it has an index file')
+    parser.add_argument('--cache-dir', help='keep s3 objects in a local content cache in this directory')
+    parser.add_argument('--cache-size', type=int, help='size cap of the content cache in bytes')
+    parser.add_argument('--split-size', type=int,
+                        help='load uncompressed data files larger than this in byte ranges, with --copy-param quoted=false '
+                             'or --split-quoted')
+    parser.add_argument('--split-quoted', action='store_true', help='also split files with quoted values, none may span lines')
+    parser.add_argument('--delimiter', help='field delimiter of the data files (default ,)')
+    parser.add_argument('--no-header', action='store_true', help='the data files have no header line')
+    parser.add_argument('--copy-param', type=_key_value, action='append', default=[], metavar='KEY=VALUE',
+                        help='additional copy param, e.g. null_str=NA, may be repeated')
+    parser.add_argument('--copy', action='store_true', help='load with COPY FROM queries')
+    parser.add_argument('--arrow', action='store_true', help='parse the data client side and load Arrow record batches')
+    parser.add_argument('--parallel', action='store_true', help='load several tables at the same time')
+    parser.add_argument('--workers', type=int, default=4, help='concurrent steps or loads (default 4)')
+    parser.add_argument('--verbose', '-v', action='store_true')
+
+
+def _add_connection_arguments(parser):
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=9090)
+    parser.add_argument('--protocol', default='http')
+    parser.add_argument('--dbname', default='mapd')
+    parser.add_argument('--user', default='mapd')
+    parser.add_argument('--password', default=os.environ.get('ODLT_PASSWORD', 'HyperInteractive'),
+                        help='defaults to $ODLT_PASSWORD')
+
+
+def _add_load_arguments(parser):
+    parser.add_argument('--corepath', help='path of the library as seen by the server, for server side loads of local libraries')
+    parser.add_argument('--batch-size', type=int, help='rows per load_table call when the client streams rows')
+    parser.add_argument('--threads', type=int, help='threads copy param, the upper bound with --adaptive')
+    parser.add_argument('--resume', action='store_true', help='skip data files already loaded by a previous run')
+    parser.add_argument('--manifest', help='location of the load manifest')
+    parser.add_argument('--validate', choices=('sample', 'full'), help='check the data files first and quarantine bad ones')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='odlt', description='Import OmniSci datalibraries')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    imp = commands.add_parser('import', help='create tables, views and dashboards and load the table data')
+    _add_library_arguments(imp)
+    _add_connection_arguments(imp)
+    _add_load_arguments(imp)
+    imp.add_argument('--sync', action='store_true', help='only create missing and replace changed objects')
+    imp.add_argument('--replace-tables', action='store_true', help='with --sync, recreate tables whose schema changed')
+
+    load = commands.add_parser('load', help='load the table data into existing tables')
+    _add_library_arguments(load)
+    _add_connection_arguments(load)
+    _add_load_arguments(load)
+    load.add_argument('--plan', action='store_true', help='schedule the load by file size')
+    load.add_argument('--adaptive', action='store_true', help='adapt concurrency and threads to the server')
+    load.add_argument('--incremental', action='store_true', help='load the data files added since the last load only')
+    load.add_argument('--watermark', type=_key_value, action='append', default=[], metavar='TABLE=COLUMN',
+                      help='load rows above the largest value of the column on the server only, may be repeated')
+
+    plan = commands.add_parser('plan', help='dry run: files, estimated rows, load schedule and duration, no connection needed')
+    _add_library_arguments(plan)
+    plan.add_argument('--json', action='store_true', help='print the explanation as JSON')
+    return parser
+
+
+def _get_copy_params(args):
+    params = dict(args.copy_param)
+    if args.delimiter is not None:
+        params['delimiter'] = args.delimiter
+    if args.no_header:
+        params['has_header'] = 'false'
+    if getattr(args, 'threads', None) is not None:
+        params['threads'] = args.threads
+    return params
+
+
+def _get_importer(args):
+    from odlt.importer import LibraryImport
+    options = {}
+    if args.cache_dir or args.cache_size:
+        from odlt.cache import ContentCache
+        options['cache'] = ContentCache(args.cache_dir, **({'max_size': args.cache_size} if args.cache_size else {}))
+    return LibraryImport(s3_access_key=args.s3_access_key, s3_secret_key=args.s3_secret_key, s3_region=args.s3_region,
+                         use_index=not args.no_index, split_size=args.split_size, split_quoted=args.split_quoted, **options)
+
+
+def _connect(imp, args):
+    imp.connect(omnisciuser=args.user, omniscipass=args.password, dbname=args.dbname, port=args.port,
+                protocol=args.protocol, host=args.host, pool_max_size=max(args.workers + 1, 2))
+
+
+def _get_load_options(args):
+    options = {
+        'corepath': args.corepath, 'use_copy_from_qry': args.copy, 'use_arrow': args.arrow, 'max_workers': args.workers,
+        'resume': args.resume, 'manifest_path': args.manifest,
+    }
+    if args.batch_size:
+        options['batch_size'] = args.batch_size
+    if args.validate:
+        options['validate'] = True if args.validate == 'sample' else 'full'
+    return options
+
+
+def _report_errors(imp):
+    for error in imp.errors:
+        print('{phase} failed for {name}: {error}'.format(**error), file=sys.stderr)
+    return 1 if imp.errors else 0
+
+
+def run_import(args):
+    imp = _get_importer(args)
+    _connect(imp, args)
+    try:
+        imp.import_all(args.library, sync=args.sync, replace_tables=args.replace_tables, parallel=args.parallel,
+                       **dict(_get_load_options(args), **_get_copy_params(args)))
+    finally:
+        imp.close()
+    return _report_errors(imp)
+
+
+def run_load(args):
+    imp = _get_importer(args)
+    _connect(imp, args)
+    try:
+        imp.load_data(args.library, parallel=args.parallel, plan=args.plan, adaptive=args.adaptive or None,
+                      incremental=args.incremental, watermarks=dict(args.watermark) or None,
+                      **dict(_get_load_options(args), **_get_copy_params(args)))
+    finally:
+        imp.close()
+    return _report_errors(imp)
+
+
+def run_plan(args):
+    imp = _get_importer(args)
+    explanation = imp.explain(args.library, use_copy_from_qry=args.copy, use_arrow=args.arrow, parallel=args.parallel,
+                              max_workers=args.workers, **_get_copy_params(args))
+    if args.json:
+        print(json.dumps(explanation.to_dict(), indent=2, sort_keys=True))
+    else:
+        print(explanation.describe())
+        print(explanation.plan.describe())
+    return 0
+
+
+COMMANDS = {
+    'import': run_import,
+    'load': run_load,
+    'plan': run_plan,
+}
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(asctime)s %(levelname)s %(message)s')
+    try:
+        return COMMANDS[args.command](args)
+    except ValueError as e:
+        logger.error('%s', e)
+        return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+
+odlt.columnar
+=================================
+
+Client side columnar loader. CSV and compressed CSV files are parsed in chunks into Arrow record batches
+which are shipped to OmniSci Core with the binary Arrow load endpoint, so the server never needs to read
+the data files itself.
+
+Ex:
+
+schema = get_arrow_schema(conn.get_table_details('flights'))
+for batch in iter_arrow_batches(open_arrow_input('/data/flights/part-1.csv.gz'), schema):
+    load_arrow_batch(conn, 'flights', batch)
+"""
+from odlt.streaming import get_compression
+
+DEFAULT_BLOCK_SIZE = 16 * 1024 * 1024
+
+ARROW_COMPRESSION = {
+    'gzip': 'gzip',
+    'bzip2': 'bz2',
+    'zstd': 'zstd',
+}
+
+
+def _arrow_type(column):
+    import pyarrow as pa
+    simple_types = {
+        'TINYINT': pa.int8(),
+        'SMALLINT': pa.int16(),
+        'INT': pa.int32(),
+        'BIGINT': pa.int64(),
+        'FLOAT': pa.float32(),
+        'DOUBLE': pa.float64(),
+        'BOOL': pa.bool_(),
+        'STR': pa.string(),
+        'DATE': pa.date32(),
+        'TIME': pa.time32('s'),
+    }
+    if getattr(column, 'is_array', False):
+        return None
+    if column.type in simple_types:
+        return simple_types[column.type]
+    if column.type == 'DECIMAL':
+        return pa.decimal128(column.precision, column.scale)
+    if column.type == 'TIMESTAMP':
+        units = {0: 's', 3: 'ms', 6: 'us', 9: 'ns'}
+        return pa.timestamp(units.get(column.precision, 's'))
+    return None
+
+
+def get_arrow_schema(columns):
+    """
+    Arrow schema matching an OmniSci table
+    :param list columns: column details as returned by pymapd's Connection.get_table_details
+    :return pyarrow.Schema
+    """
+    import pyarrow as pa
+    fields = []
+    for column in columns:
+        arrow_type = _arrow_type(column)
+        if arrow_type is None:
+            raise ValueError('Column {} of type {} is not supported by the arrow loader'.format(column.name, column.type))
+        fields.append(pa.field(column.name, arrow_type, nullable=getattr(column, 'nullable', True)))
+    return pa.schema(fields)
+
+
+def open_arrow_input(path):
+    """
+    Open a local data file for the arrow csv reader, uncompressed files are memory mapped
+    """
+    import pyarrow as pa
+    compression = get_compression(path)
+    if not compression:
+        return pa.memory_map(path, 'r')
+    return pa.CompressedInputStream(pa.OSFile(path, 'r'), ARROW_COMPRESSION[compression])
+
+
+def iter_arrow_batches(source, schema, block_size=DEFAULT_BLOCK_SIZE, delimiter=',', quote='"', escape='"',
+                       quoted=True, has_header=True, null_str='\\N', **kwargs):
+    """
+    Parse csv input into record batches of roughly ``block_size`` bytes, using the copy params passed to ``load_data``
+    :param source: pyarrow input stream or binary file object
+    :param pyarrow.Schema schema: target table schema
+    :**kwargs: remaining copy params, ignored
+    """
+    from pyarrow import csv as pacsv
+    quoted = quoted is not False and quoted != 'false'
+    read_options = pacsv.ReadOptions(
+        block_size=block_size,
+        column_names=schema.names,
+        skip_rows=1 if has_header is True or has_header == 'true' else 0,
+    )
+    parse_options = pacsv.ParseOptions(
+        delimiter=delimiter,
+        quote_char=quote if quoted else False,
+        double_quote=quoted and escape == quote,
+        escape_char=escape if quoted and escape and escape != quote else False,
+        newlines_in_values=True,
+    )
+    convert_options = pacsv.ConvertOptions(
+        column_types={field.name: field.type for field in schema},
+        null_values=[null_str, ''],
+        strings_can_be_null=True,
+    )
+    reader = pacsv.open_csv(source, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+    for batch in reader:
+        if batch.num_rows:
+            yield batch
+
+
+def serialize_arrow_batches(batches):
+    """
+    Serialize record batches into the Arrow IPC stream format expected by load_table_binary_arrow
+    """
+    import pyarrow as pa
+    sink = pa.BufferOutputStream()
+    writer = None
+    for batch in batches:
+        if writer is None:
+            writer = pa.RecordBatchStreamWriter(sink, batch.schema)
+        writer.write_batch(batch)
+    if writer is not None:
+        writer.close()
+    return sink.getvalue().to_pybytes()
+
+
+def serialize_arrow_batch(batch):
+    return serialize_arrow_batches([batch])
+
+
+def iter_coalesced_batches(batches, min_size=DEFAULT_BLOCK_SIZE):
+    """
+    Group consecutive record batches into lists of at least ``min_size`` bytes, so many small files can be
+    shipped with few load calls
+    """
+    group, size = [], 0
+    for batch in batches:
+        group.append(batch)
+        size += batch.nbytes
+        if size >= min_size:
+            yield group
+            group, size = [], 0
+    if group:
+        yield group
+
+
+def load_arrow_batches(conn, tblname, batches):
+    """
+    Ship record batches to OmniSci Core with a single load call
+    :param pymapd.connection.Connection conn: connection the data gets loaded on
+    :return int: number of loaded rows
+    """
+    conn._client.load_table_binary_arrow(
+        session=conn._session,
+        table_name=tblname,
+        arrow_stream=serialize_arrow_batches(batches),
+    )
+    return sum(batch.num_rows for batch in batches)
+
+
+def load_arrow_batch(conn, tblname, batch):
+    """
+    Ship a record batch to OmniSci Core
+    :param pymapd.connection.Connection conn: connection the data gets loaded on
+    :return int: number of loaded rows
+    """
+    return load_arrow_batches(conn, tblname, [batch])
@@ -0,0 +1,116 @@
+"""
+
+odlt.decompress
+=================================
+
+Decompression stage of the client side loaders. Data files are decompressed by a pool of workers ahead of
+the load stage, every file feeds its consumer through a bounded queue, so several cores inflate while the
+loader parses and sends, and memory stays bounded by ``workers * queue_size`` pieces.
+
+zlib, bz2 and zstandard release the GIL while they decompress, so the workers are threads: a process pool
+would have to copy every compressed and decompressed byte between processes.
+
+Ex:
+
+for path, pieces in DecompressionPipeline(open_chunks, paths, workers=4):
+    for row in iter_csv_rows(pieces):
+        ...
+"""
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from odlt.streaming import iter_decompressed
+
+DEFAULT_DECOMPRESS_WORKERS = min(4, os.cpu_count() or 1)
+# decompressed pieces buffered per file, each piece is at most MAX_DECOMPRESSED_PIECE bytes for gzip input
+DEFAULT_QUEUE_SIZE = 16
+# seconds a worker waits on a full queue before checking whether its consumer went away
+PUT_TIMEOUT = 0.5
+
+_END = object()
+
+
+class _Failure(object):
+    def __init__(self, error):
+        self.error = error
+
+
+class DecompressionPipeline(object):
+    """
+    Iterates over ``(item, pieces)`` pairs in the order of ``items``. While the consumer reads the pieces of one
+    file, up to ``workers`` files are decompressed. A decompression error is raised from the pieces iterator of
+    the failed file.
+    """
+    def __init__(self, open_chunks, items, workers=DEFAULT_DECOMPRESS_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        :param callable open_chunks: called as open_chunks(item), returns (iterable of compressed chunks, compression)
+        :param iterable items: local file paths or s3 objects
+        :param int workers: number of files decompressed at the same time
+        :param int queue_size: decompressed pieces buffered per file
+        """
+        if workers < 1 or queue_size < 1:
+            raise ValueError('Decompression workers and queue size must be at least 1')
+        self._open_chunks = open_chunks
+        self._items = items
+        self.workers = workers
+        self.queue_size = queue_size
+
+    @staticmethod
+    def _put(pieces, value, stopped):
+        """
+        :return bool: False if the consumer went away before the value could be queued
+        """
+        while not stopped.is_set():
+            try:
+                pieces.put(value, timeout=PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _decompress(self, item, pieces, stopped):
+        try:
+            chunks, compression = self._open_chunks(item)
+            for piece in iter_decompressed(chunks, compression):
+                if not self._put(pieces, piece, stopped):
+                    return
+            self._put(pieces, _END, stopped)
+        except BaseException as e:
+            self._put(pieces, _Failure(e), stopped)
+
+    @staticmethod
+    def _iter_pieces(pieces):
+        while True:
+            piece = pieces.get()
+            if piece is _END:
+                return
+            if isinstance(piece, _Failure):
+                raise piece.error
+            yield piece
+
+    def __iter__(self):
+        items = iter(self._items)
+        pending = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            def submit_next():
+                for item in items:
+                    pieces, stopped = queue.Queue(maxsize=self.queue_size), threading.Event()
+                    pending.append((item, pieces, stopped))
+                    executor.submit(self._decompress, item, pieces, stopped)
+                    return
+
+            for _ in range(self.workers):
+                submit_next()
+            try:
+                while pending:
+                    item, pieces, stopped = pending.pop(0)
+                    try:
+                        yield item, self._iter_pieces(pieces)
+                    finally:
+                        # the consumer is done with this file, a worker still producing it stops
+                        stopped.set()
+                    submit_next()
+            finally:
+                for _, _, stopped in pending:
+                    stopped.set()
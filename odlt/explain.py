@@ -0,0 +1,197 @@
+"""
+
+odlt.explain
+=================================
+
+Dry run of a data load. Reports the data files, stored bytes and estimated rows of every table, the load path
+``load_data`` would take, and the predicted duration. Rows are estimated from a sample at the start of a file of
+each table. The duration comes from the load throughput measured by previous loads with the same load path and
+target, which ``load_data`` records.
+
+Ex:
+
+explanation = imp.explain('s3://some-s3-bucket/meaningfulname', use_arrow=True, parallel=True, max_workers=8)
+print(explanation.describe())
+"""
+from odlt.store import JSONStore, get_default_store_path
+from odlt.planner import format_size
+from odlt.streaming import iter_decompressed
+
+DEFAULT_SAMPLE_SIZE = 1024 * 1024
+# weight of the latest load in the throughput average
+DEFAULT_HISTORY_WEIGHT = 0.3
+
+LOAD_PATH_ARROW = 'arrow'
+LOAD_PATH_COPY = 'copy'
+LOAD_PATH_COPY_S3 = 'copy_s3'
+LOAD_PATH_IMPORT_TABLE = 'import_table'
+LOAD_PATH_LOAD_TABLE = 'load_table'
+
+LOAD_PATH_DESCRIPTIONS = {
+    LOAD_PATH_ARROW: 'client side csv parsing, Arrow record batches sent to the server',
+    LOAD_PATH_COPY: 'COPY FROM, the server reads the files from corepath',
+    LOAD_PATH_COPY_S3: 'COPY FROM s3, the server fetches the objects itself',
+    LOAD_PATH_IMPORT_TABLE: 'import_table, the server reads the files from corepath',
+    LOAD_PATH_LOAD_TABLE: 'client side streaming, row batches sent with load_table',
+}
+
+
+def get_load_path(source, use_copy_from_qry=False, use_arrow=False):
+    """
+    Load path ``load_data`` takes for a library source and load options
+    :param str source: local or s3
+    :return str: one of the LOAD_PATH_* names
+    """
+    if use_arrow:
+        return LOAD_PATH_ARROW
+    if use_copy_from_qry:
+        return LOAD_PATH_COPY_S3 if source == 's3' else LOAD_PATH_COPY
+    return LOAD_PATH_LOAD_TABLE if source == 's3' else LOAD_PATH_IMPORT_TABLE
+
+
+def get_default_throughput_path(*identifiers):
+    """
+    Throughput history location in the user's home directory derived from the target database
+    """
+    return get_default_store_path('throughput', *identifiers)
+
+
+def sample_rows_per_byte(chunks, compression=None, sample_size=DEFAULT_SAMPLE_SIZE, has_header=True, line_delim='\n', **kwargs):
+    """
+    Rows per stored byte at the start of a data file, counted as line delimiters in up to ``sample_size``
+    decompressed bytes. Exact for files smaller than the sample.
+    :param iterable chunks: stored, possibly compressed, chunks of the file
+    :return float or None if the file is empty
+    """
+    stored = [0]
+
+    def count_stored():
+        for chunk in chunks:
+            stored[0] += len(chunk)
+            yield chunk
+
+    size = rows = 0
+    pieces = iter_decompressed(count_stored(), compression)
+    try:
+        for piece in pieces:
+            size += len(piece)
+            rows += piece.count(line_delim.encode())
+            if size >= sample_size:
+                break
+    finally:
+        pieces.close()
+    if not stored[0]:
+        return None
+    if has_header is True or has_header == 'true':
+        rows = max(rows - 1, 0)
+    return rows / float(stored[0])
+
+
+class ThroughputHistory(JSONStore):
+    """
+    Load throughput per load path, as a moving average of the bytes per second of the busiest load worker
+    """
+    def rate(self, load_path):
+        """
+        :return float: bytes per second, None if no load with this path was recorded
+        """
+        with self._lock:
+            entry = self._data.get(load_path)
+            return entry['rate'] if entry else None
+
+    def record(self, load_path, size, seconds, weight=DEFAULT_HISTORY_WEIGHT):
+        """
+        Add a load to the average, written to disk on ``save``
+        :param int size: bytes loaded by the busiest worker
+        :param float seconds: wall clock seconds of the load
+        """
+        if size <= 0 or seconds <= 0:
+            return
+        with self._lock:
+            entry = self._data.get(load_path)
+            rate = size / seconds
+            if entry:
+                rate = weight * rate + (1 - weight) * entry['rate']
+            self._data[load_path] = {'rate': rate, 'loads': (entry or {}).get('loads', 0) + 1}
+
+
+class TableEstimate(object):
+    """
+    Data files, stored bytes and estimated rows of a table
+    """
+    def __init__(self, table, files, size, rows=None):
+        self.table = table
+        self.files = files
+        self.size = size
+        self.rows = rows
+
+
+class LoadExplanation(object):
+    """
+    Result of a dry run, see ``LibraryImport.explain``
+    """
+    def __init__(self, tables, load_path, plan, rate=None):
+        """
+        :param list tables: TableEstimate of every table with data
+        :param str load_path: one of the LOAD_PATH_* names
+        :param odlt.planner.LoadPlan plan: planned schedule of the data files
+        :param float rate: (optional) recorded bytes per second of the busiest worker
+        """
+        self.tables = tables
+        self.load_path = load_path
+        self.plan = plan
+        self.rate = rate
+
+    @property
+    def files(self):
+        return sum(table.files for table in self.tables)
+
+    @property
+    def size(self):
+        return sum(table.size for table in self.tables)
+
+    @property
+    def rows(self):
+        """
+        Estimated rows of all tables, None if a table could not be sampled
+        """
+        rows = [table.rows for table in self.tables]
+        return None if None in rows else sum(rows)
+
+    @property
+    def seconds(self):
+        """
+        Predicted duration of the load, None without a recorded throughput
+        """
+        if not self.rate:
+            return None
+        return self.plan.makespan / self.rate
+
+    def to_dict(self):
+        return {
+            'load_path': self.load_path,
+            'files': self.files,
+            'bytes': self.size,
+            'rows': self.rows,
+            'workers': self.plan.workers,
+            'seconds': self.seconds,
+            'tables': [{'table': t.table, 'files': t.files, 'bytes': t.size, 'rows': t.rows} for t in self.tables],
+        }
+
+    def describe(self):
+        """
+        Human readable report
+        """
+        lines = [
+            'Load path: {} ({})'.format(self.load_path, LOAD_PATH_DESCRIPTIONS[self.load_path]),
+            '{} table(s), {} file(s), {}, ~{} rows, {} worker(s)'.format(
+                len(self.tables), self.files, format_size(self.size), self.rows if self.rows is not None else '?', self.plan.workers),
+        ]
+        if self.seconds is None:
+            lines.append('Estimated duration: unknown, no load with this path was recorded yet')
+        else:
+            lines.append('Estimated duration: {:.0f}s at {}/s'.format(self.seconds, format_size(int(self.rate))))
+        for table in self.tables:
+            lines.append('  {:<30} {:>5} file(s) {:>10} ~{} rows'.format(
+                table.table, table.files, format_size(table.size), table.rows if table.rows is not None else '?'))
+        return '\n'.join(lines)
@@ -0,0 +1,363 @@
+"""
+
+odlt.exporter
+=================================
+
+This module contains the export class for the OmniSci Data Library Transfer module. It writes a database
+into the data library layout read by LibraryImport.
+
+Ex:
+
+Local Export
+============
+
+from odlt.exporter import LibraryExport
+exp = LibraryExport()
+exp.connect()
+exp.export_all('/home/inspiron/Downloads/snapshot')
+
+S3 Export
+=========
+
+exp = LibraryExport(s3_access_key='xxxxxx', s3_secret_key='yyyyyyy')
+exp.connect()
+exp.export_all('s3://some-s3-bucket/some-dataset-path', max_workers=8)
+"""
+import io
+import os
+import re
+import bz2
+import csv
+import gzip
+import time
+import base64
+import logging
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from odlt.utils import validate_connection, atomic_write
+from odlt.pool import PooledConnectionMixin
+from odlt.metrics import (
+    Metrics, PHASE_EXPORT_SCHEMA, PHASE_EXPORT_VIEW, PHASE_EXPORT_DASHBOARD, PHASE_EXPORT_PART, PHASE_EXPORT_TABLE,
+)
+
+logger = logging.getLogger('odlt')
+
+DEFAULT_PART_SIZE = 256 * 1024 * 1024
+DEFAULT_PAGE_SIZE = 100000
+
+PART_EXTENSIONS = {
+    'gzip': '.csv.gz',
+    'bzip2': '.csv.bz2',
+    None: '.csv',
+}
+
+
+def format_csv_value(value, null_str='\\N'):
+    """
+    Text representation of a result value as accepted by COPY FROM and the import endpoints
+    """
+    if value is None:
+        return null_str
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (list, tuple)):
+        return '{' + ','.join(format_csv_value(v, null_str) for v in value) + '}'
+    return str(value)
+
+
+def get_safe_filename(name):
+    return re.sub(r'[^\w.-]+', '_', name).strip('_') or 'unnamed'
+
+
+class LocalTarget(object):
+    """
+    Local library root, files are written to a temporary file and renamed into place when complete
+    """
+    def __init__(self, root):
+        self.root = root
+
+    @contextmanager
+    def open(self, relpath):
+        with atomic_write(os.path.join(self.root, *relpath.split('/')), mode='wb') as f:
+            yield f
+
+    def write(self, relpath, content):
+        with self.open(relpath) as f:
+            f.write(content.encode())
+
+
+class S3Target(object):
+    """
+    S3 library prefix, parts are spooled to a temporary file and uploaded with a managed multipart transfer
+    """
+    def __init__(self, bucket, prefix):
+        self._bucket = bucket
+        self.prefix = prefix.strip('/')
+
+    def _get_key(self, relpath):
+        return '{}/{}'.format(self.prefix, relpath) if self.prefix else relpath
+
+    @contextmanager
+    def open(self, relpath):
+        with tempfile.TemporaryFile() as f:
+            yield f
+            f.seek(0)
+            self._bucket.upload_fileobj(f, self._get_key(relpath))
+
+    def write(self, relpath, content):
+        self._bucket.put_object(Key=self._get_key(relpath), Body=content.encode())
+
+
+class CSVPartWriter(object):
+    """
+    Writes rows into compressed csv parts of at most about ``part_size`` compressed bytes. Only the part being
+    written is open, so memory use does not depend on the table size.
+    """
+    def __init__(self, target, datadir, columns, part_size=DEFAULT_PART_SIZE, compression='gzip', null_str='\\N',
+                 delimiter=',', metrics=None, table=None):
+        """
+        :param target: LocalTarget or S3Target
+        :param str datadir: data folder relative to the library root
+        :param list columns: column names, written as header of every part
+        """
+        if compression not in PART_EXTENSIONS:
+            raise ValueError('Unsupported compression {}'.format(compression))
+        self.target = target
+        self.datadir = datadir
+        self.columns = columns
+        self.part_size = part_size
+        self.compression = compression
+        self.null_str = null_str
+        self.delimiter = delimiter
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.table = table
+        self.parts = []
+        self.rows = 0
+        self._context = None
+
+    def _open_part(self):
+        relpath = '{}/part-{:05d}{}'.format(self.datadir, len(self.parts), PART_EXTENSIONS[self.compression])
+        self._context = self.target.open(relpath)
+        self._raw = self._context.__enter__()
+        if self.compression == 'gzip':
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode='wb')
+        elif self.compression == 'bzip2':
+            self._stream = bz2.BZ2File(self._raw, mode='wb')
+        else:
+            self._stream = self._raw
+        self._text = io.TextIOWrapper(self._stream, encoding='utf-8', newline='', write_through=True)
+        self._writer = csv.writer(self._text, delimiter=self.delimiter, lineterminator='\n')
+        self._writer.writerow(self.columns)
+        self._part_rows = 0
+        self.parts.append(relpath)
+
+    def _close_part(self):
+        self._text.detach()
+        if self._stream is not self._raw:
+            # closes the compressor only, the raw file is finalized by the target
+            self._stream.close()
+        size = self._raw.tell()
+        with self.metrics.span(PHASE_EXPORT_PART, name=self.parts[-1], table=self.table, size=size) as span:
+            span.rows = self._part_rows
+            self._context.__exit__(None, None, None)
+        self._context = None
+
+    def write_rows(self, rows):
+        for row in rows:
+            if self._context is None:
+                self._open_part()
+            self._writer.writerow([format_csv_value(value, self.null_str) for value in row])
+            self._part_rows += 1
+            self.rows += 1
+            if self._raw.tell() >= self.part_size:
+                self._close_part()
+
+    def close(self):
+        if self._context is not None:
+            self._close_part()
+        return self.parts
+
+    def abort(self, error):
+        """
+        Discard the part being written
+        """
+        if self._context is not None:
+            self._context.__exit__(type(error), error, error.__traceback__)
+            self._context = None
+
+
+class LibraryExport(PooledConnectionMixin):
+    """
+    public attributes:
+      - errors : list : errors of single tables, views and dashboards which failed to export
+    """
+    def __init__(self, conn=None, s3_access_key=None, s3_secret_key=None, part_size=DEFAULT_PART_SIZE,
+                 page_size=DEFAULT_PAGE_SIZE, compression='gzip', null_str='\\N', metrics=None):
+        """
+        :param pymapd.connection.Connection object conn: core instance connection
+        :param int part_size: approximate compressed bytes of a data part (default 256MB)
+        :param int page_size: rows fetched per query, table data is paged by rowid (default `100000`)
+        :param str compression: compression of the data parts, gzip, bzip2 or None (default gzip)
+        :param str null_str: text written for NULL values (default `\\N`)
+        :param odlt.metrics.Metrics metrics: (optional) records timings, bytes and rows of every export phase
+        """
+        PooledConnectionMixin.__init__(self, conn)
+        self._path = None
+        self._target = None
+        self._s3_access_key = s3_access_key
+        self._s3_secret_key = s3_secret_key
+        self.part_size = part_size
+        self.page_size = page_size
+        self.compression = compression
+        self.null_str = null_str
+        self.metrics = metrics if metrics is not None else Metrics()
+
+    def _initialize_target(self, path):
+        if path == self._path and self._target is not None:
+            return self._target
+        self._path = path
+        if path.startswith('s3://'):
+            import boto3
+            bucket_name, _, prefix = path[len('s3://'):].partition('/')
+            if self._s3_access_key and self._s3_secret_key:
+                session = boto3.Session(aws_access_key_id=self._s3_access_key, aws_secret_access_key=self._s3_secret_key)
+                s3 = session.resource('s3')
+            else:
+                s3 = boto3.resource('s3')
+            self._target = S3Target(s3.Bucket(bucket_name), prefix)
+        else:
+            self._target = LocalTarget(path)
+        return self._target
+
+    def _get_tables(self, conn):
+        return list(conn._client.get_physical_tables(conn._session))
+
+    def _get_views(self, conn):
+        return list(conn._client.get_views(conn._session))
+
+    def _export_schema(self, conn, tblname):
+        cursor = conn.cursor()
+        cursor.execute('SHOW CREATE TABLE {}'.format(tblname))
+        ddl = '\n'.join(str(row[0]) for row in cursor)
+        with self.metrics.span(PHASE_EXPORT_SCHEMA, name=tblname, table=tblname, size=len(ddl)):
+            self._target.write('tables/{}/schema.sql'.format(tblname), ddl.rstrip().rstrip(';') + ';\n')
+
+    def _iter_table_rows(self, conn, tblname):
+        """
+        Rows of a table fetched in pages of ``page_size`` rowids, so a single result never holds the whole table
+        """
+        cursor = conn.cursor()
+        cursor.execute('SELECT MIN(rowid), MAX(rowid) FROM {}'.format(tblname))
+        low, high = list(cursor)[0]
+        if low is None:
+            return
+        for start in range(low, high + 1, self.page_size):
+            cursor.execute('SELECT * FROM {} WHERE rowid >= {} AND rowid < {}'.format(tblname, start, start + self.page_size))
+            yield from cursor
+
+    def _export_table_data(self, conn, tblname):
+        """
+        Stream the rows of a table into compressed csv parts
+        :return int: number of exported rows
+        """
+        columns = [column.name for column in conn.get_table_details(tblname)]
+        writer = CSVPartWriter(
+            self._target, 'tables/{}/data'.format(tblname), columns, part_size=self.part_size,
+            compression=self.compression, null_str=self.null_str, metrics=self.metrics, table=tblname,
+        )
+        try:
+            writer.write_rows(self._iter_table_rows(conn, tblname))
+        except BaseException as e:
+            writer.abort(e)
+            raise
+        writer.close()
+        return writer.rows
+
+    def _export_table(self, conn, tblname, queued_at=None):
+        with self.metrics.span(PHASE_EXPORT_TABLE, name=tblname, table=tblname, queued_at=queued_at) as span:
+            self._export_schema(conn, tblname)
+            span.rows = self._export_table_data(conn, tblname)
+
+    def _export_table_in_worker(self, tblname, queued_at=None):
+        """
+        Worker entrypoint for parallel exports, every worker borrows its own connection
+        """
+        with self._pool.connection() as conn:
+            self._export_table(conn, tblname, queued_at=queued_at)
+
+    @validate_connection
+    def export_tables(self, path, tables=None, max_workers=4):
+        """
+        Export the schema and data of tables
+        :param str path: local or s3 library root
+        :param list tables: (optional) names of the tables to export, all tables if not passed
+        :param int max_workers: number of tables exported at the same time, each on its own pooled connection.
+            Failures of a single table are collected into ``errors``.
+        """
+        self._initialize_target(path)
+        tables = tables if tables is not None else self._get_tables(self._conn)
+        max_workers = self._get_worker_count(max_workers)
+        if not max_workers:
+            for tblname in tables:
+                self._export_table(self._conn, tblname)
+            return True
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self._export_table_in_worker, tblname, queued_at=time.perf_counter()): tblname for tblname in tables}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    self._record_error('export_tables', futures[future], e)
+        return True
+
+    @validate_connection
+    def export_views(self, path):
+        """
+        Write a CREATE VIEW statement per view to views/<name>.sql
+        """
+        self._initialize_target(path)
+        for viewname in self._get_views(self._conn):
+            try:
+                details = self._conn._client.get_table_details(self._conn._session, viewname)
+                qry = 'CREATE VIEW {} AS {};\n'.format(viewname, details.view_sql.strip().rstrip(';'))
+                with self.metrics.span(PHASE_EXPORT_VIEW, name=viewname, size=len(qry)):
+                    self._target.write('views/{}.sql'.format(viewname), qry)
+            except Exception as e:
+                self._record_error('export_views', viewname, e)
+        return True
+
+    @validate_connection
+    def export_dashboards(self, path):
+        """
+        Write every dashboard as a three line file, name, metadata and definition, to dashboards/<name>.json
+        """
+        self._initialize_target(path)
+        for dashboard in self._conn._client.get_dashboards(self._conn._session):
+            try:
+                dashboard = self._conn._client.get_dashboard(self._conn._session, dashboard.dashboard_id)
+                try:
+                    dashdef = base64.b64decode(dashboard.dashboard_state, validate=True).decode()
+                except ValueError:
+                    dashdef = dashboard.dashboard_state
+                content = '\n'.join([dashboard.dashboard_name, dashboard.dashboard_metadata or '{}', dashdef.replace('\n', ' ')]) + '\n'
+                with self.metrics.span(PHASE_EXPORT_DASHBOARD, name=dashboard.dashboard_name, size=len(content)):
+                    self._target.write('dashboards/{}.json'.format(get_safe_filename(dashboard.dashboard_name)), content)
+            except Exception as e:
+                self._record_error('export_dashboards', dashboard.dashboard_name, e)
+        return True
+
+    @validate_connection
+    def export_all(self, path, tables=None, max_workers=4):
+        """
+        Export tables with their data, views and dashboards into the data library layout
+        :param str path: local or s3 library root
+        :param list tables: (optional) names of the tables to export, all tables if not passed
+        :param int max_workers: number of tables exported at the same time (default `4`)
+        """
+        self.export_tables(path, tables=tables, max_workers=max_workers)
+        self.export_views(path)
+        self.export_dashboards(path)
+        self.metrics.flush()
+        return True
@@ -0,0 +1,283 @@
+"""
+
+odlt.fanout
+=================================
+
+Import of one datalibrary into several OmniSci Core servers. The library is discovered once, every schema, view
+and dashboard file is read once, and every data file is read, decompressed and parsed once. The parsed batches are
+handed to one sender per server, each with a bounded queue and its own pooled connection, so the source I/O does
+not grow with the number of servers. A failing server is marked failed and dropped, the others continue.
+
+Ex:
+
+imp = FanoutImport([{'host': 'omnisci-eu'}, {'host': 'omnisci-us'}], s3_access_key='xxxxxx', s3_secret_key='yyyyyyy')
+imp.connect()
+imp.import_all('s3://some-s3-bucket/meaningfulname', use_arrow=True)
+for target in imp.targets:
+    print(target.name, target.progress())
+"""
+import queue
+import logging
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from odlt.importer import LibraryImport
+from odlt.streaming import DEFAULT_BATCH_SIZE, iter_batches
+from odlt.columnar import DEFAULT_BLOCK_SIZE, get_arrow_schema, iter_arrow_batches, iter_coalesced_batches, load_arrow_batches
+from odlt.metrics import PHASE_LOAD_TABLE
+
+logger = logging.getLogger('odlt')
+
+# parsed batches buffered per server, a slow server holds back the source once its queue is full
+DEFAULT_QUEUE_SIZE = 4
+# seconds the source waits on a full queue before checking whether the server failed
+PUT_TIMEOUT = 0.5
+
+_END = object()
+
+
+class FanoutTarget(object):
+    """
+    A server the library is imported into, with its own importer, connection pool, progress and errors
+    """
+    def __init__(self, name, importer, connection_params):
+        self.name = name
+        self.importer = importer
+        self.connection_params = connection_params
+        self.rows = {}
+        self.failed_tables = set()
+        self._lock = threading.Lock()
+
+    @property
+    def errors(self):
+        return self.importer.errors
+
+    def add_rows(self, tblname, rows):
+        with self._lock:
+            self.rows[tblname] = self.rows.get(tblname, 0) + rows
+
+    def fail(self, phase, name, error, tblname=None):
+        """
+        Record an error of this server
+        :param str tblname: (optional) table which is not loaded any further on this server
+        """
+        if tblname is not None:
+            with self._lock:
+                self.failed_tables.add(tblname)
+        self.importer._record_error(phase, name, error)
+
+    def progress(self):
+        """
+        Rows loaded per table, failed tables and number of errors
+        :return dict
+        """
+        with self._lock:
+            return {'rows': dict(self.rows), 'failed_tables': sorted(self.failed_tables), 'errors': len(self.errors)}
+
+
+class _Sender(object):
+    """
+    Sends the batches of one table to one server from its own thread
+    """
+    def __init__(self, target, tblname, send, queue_size=DEFAULT_QUEUE_SIZE):
+        self.target = target
+        self.tblname = tblname
+        self._send = send
+        self._queue = queue.Queue(maxsize=queue_size)
+        self.failed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='odlt-fanout-{}'.format(target.name), daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            with self.target.importer.pool.connection() as conn:
+                while True:
+                    batch = self._queue.get()
+                    if batch is _END:
+                        return
+                    self.target.add_rows(self.tblname, self._send(conn, self.target, self.tblname, batch))
+        except Exception as e:
+            self.failed.set()
+            self.target.fail('load_data', self.tblname, e, tblname=self.tblname)
+
+    def put(self, batch):
+        """
+        :return bool: False if the server failed and takes no more batches
+        """
+        while not self.failed.is_set():
+            try:
+                self._queue.put(batch, timeout=PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def close(self):
+        self.put(_END)
+        self._thread.join()
+
+
+def _send_rows(conn, target, tblname, rows, null_str='\\N'):
+    target.importer._load_rows(conn, tblname, rows, null_str=null_str)
+    return len(rows)
+
+
+def _send_arrow_batches(conn, target, tblname, batches):
+    return load_arrow_batches(conn, tblname, batches)
+
+
+class FanoutImport(object):
+    """
+    public attributes:
+      - targets : list :  FanoutTarget of every server
+      - source  : LibraryImport : importer discovering and reading the library
+    """
+    def __init__(self, targets, queue_size=DEFAULT_QUEUE_SIZE, **kwargs):
+        """
+        :param list targets: connection params of every server, as passed to ``LibraryImport.connect``
+        :param int queue_size: parsed batches buffered per server
+        :**kwargs: passed to every ``LibraryImport``, e.g. s3 credentials
+        """
+        if not targets:
+            raise ValueError('At least one target server is required')
+        self.source = LibraryImport(**kwargs)
+        self.queue_size = queue_size
+        self.targets = []
+        for params in targets:
+            name = '{}:{}/{}'.format(params.get('host', 'localhost'), params.get('port', 9090), params.get('dbname', 'mapd'))
+            self.targets.append(FanoutTarget(name, LibraryImport(metrics=self.source.metrics, **kwargs), dict(params)))
+
+    @property
+    def errors(self):
+        """
+        Errors of all servers
+        :return list: dicts with target, phase, name and error
+        """
+        return [dict(error, target=target.name) for target in self.targets for error in target.errors]
+
+    def connect(self):
+        """
+        Open a connection pool to every server
+        """
+        for target in self.targets:
+            target.importer.connect(**target.connection_params)
+        return True
+
+    def close(self):
+        for target in self.targets:
+            target.importer.close()
+        self.source.metrics.flush()
+        return True
+
+    def _attach_library(self, target, localpath):
+        """
+        Let a target importer use the library discovered by the source, without data folders so its import graph
+        only contains the DDL and dashboard steps
+        """
+        target.importer._initialize_localpath(localpath)
+        datalibrary = self.source.datalibrary
+        target.importer._datalibrary = {
+            'tables': {tblname: dict(tbldetails, data='') for tblname, tbldetails in datalibrary['tables'].items()},
+            'views': datalibrary['views'],
+            'dashboards': datalibrary['dashboards'],
+        }
+
+    def _create_objects(self, target, objects, max_workers):
+        """
+        Create the tables, views and dashboards on one server, in dependency order
+        """
+        dag = target.importer._build_import_graph(objects=objects)
+
+        def on_error(node, error):
+            # import graph nodes are named kind:name, data is not loaded into tables which failed to be created
+            target.fail('import_all', node, error, tblname=node.split(':', 1)[1] if node.startswith('table:') else None)
+
+        result = dag.run(max_workers=target.importer._get_worker_count(max_workers), on_error=on_error)
+        for node in result['skipped']:
+            target.fail('import_all', node, ValueError('Skipped because a dependency failed'))
+
+    def _iter_table_batches(self, files, schema=None, batch_size=DEFAULT_BATCH_SIZE, block_size=DEFAULT_BLOCK_SIZE, **kwargs):
+        """
+        Read and parse the data files of a table once, as row batches or, if a schema is passed, groups of record batches
+        """
+        if schema is None:
+            yield from iter_batches(self.source._iter_data_file_rows(files, **kwargs), batch_size)
+            return
+
+        def iter_record_batches():
+            for _, source in self.source._iter_arrow_inputs(files):
+                yield from iter_arrow_batches(source, schema, block_size=block_size, **kwargs)
+
+        yield from iter_coalesced_batches(iter_record_batches(), min_size=block_size)
+
+    def _get_arrow_schema(self, tblname, targets):
+        with targets[0].importer.pool.connection() as conn:
+            return get_arrow_schema(conn.get_table_details(tblname))
+
+    def _load_table(self, tblname, datapath, targets, use_arrow=False, **kwargs):
+        """
+        Fan the data of a table out to the servers it was created on. A source error fails the table on every server.
+        """
+        files = self.source._list_data_files(datapath)
+        try:
+            schema = self._get_arrow_schema(tblname, targets) if use_arrow else None
+        except Exception as e:
+            for target in targets:
+                target.fail('load_data', tblname, e, tblname=tblname)
+            return
+        send = _send_arrow_batches if use_arrow else partial(_send_rows, null_str=kwargs.get('null_str', '\\N'))
+        senders = [_Sender(target, tblname, send, queue_size=self.queue_size) for target in targets]
+        size = sum(self.source._get_data_file_size(path_or_obj) for path_or_obj in files)
+        try:
+            with self.source.metrics.span(PHASE_LOAD_TABLE, table=tblname, size=size, files=len(files), targets=len(targets)):
+                for batch in self._iter_table_batches(files, schema=schema, **kwargs):
+                    if not [sender for sender in senders if sender.put(batch)]:
+                        logger.warning('Stopped reading %s, every target failed', tblname)
+                        break
+        except Exception as e:
+            for sender in senders:
+                if not sender.failed.is_set():
+                    sender.target.fail('load_data', tblname, e, tblname=tblname)
+        finally:
+            for sender in senders:
+                sender.close()
+
+    def load_data(self, localpath, use_arrow=False, max_workers=4, batch_size=DEFAULT_BATCH_SIZE, block_size=DEFAULT_BLOCK_SIZE, **kwargs):
+        """
+        Load the data of every table into every server it exists on. Data is streamed by the client with load_table,
+        or as Arrow record batches if ``use_arrow`` is set, so the servers need no access to the library.
+        Failed loads are collected into the errors of their target.
+        :param int max_workers: number of tables read at the same time, every server gets one connection per table
+        :**kwargs: copy params, see ``LibraryImport.load_data``
+        """
+        self.source._initialize_localpath(localpath)
+        tables = [(tblname, datapath) for tblname, datapath in self.source._get_each_table_data_path() if datapath]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for tblname, datapath in tables:
+                targets = [target for target in self.targets if tblname not in target.failed_tables]
+                if not targets:
+                    continue
+                futures[executor.submit(self._load_table, tblname, datapath, targets, use_arrow=use_arrow,
+                                        batch_size=batch_size, block_size=block_size, **kwargs)] = tblname
+            for future in as_completed(futures):
+                future.result()
+        self.source.metrics.flush()
+        return True
+
+    def import_all(self, localpath, max_workers=4, **kwargs):
+        """
+        Create tables, views and dashboards on every server and load the table data. Files are read once and
+        every server applies them concurrently. Failures of a server are collected into its ``errors``,
+        data is not loaded into tables which failed to be created there.
+        :param int max_workers: steps running at the same time per server, and tables read at the same time
+        :**kwargs: passed to ``load_data``
+        """
+        self.source._initialize_localpath(localpath)
+        objects = self.source._read_library_objects()
+        for target in self.targets:
+            self._attach_library(target, localpath)
+        with ThreadPoolExecutor(max_workers=len(self.targets)) as executor:
+            for future in [executor.submit(self._create_objects, target, objects, max_workers) for target in self.targets]:
+                future.result()
+        return self.load_data(localpath, max_workers=max_workers, **kwargs)
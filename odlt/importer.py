@@ -24,39 +24,107 @@ imp.import_all()
 """
 import re
 import os
-import boto3
-import pymapd
 import glob
 import base64
+import posixpath
+import time
 import logging
-from odlt.utils import is_json, validate_connection
-from mapd.ttypes import TCopyParams
-from botocore.handlers import disable_signing
+from functools import partial
+from itertools import islice
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from odlt.utils import is_json, validate_connection, get_view_name, get_referenced_relations, get_dashboard_sources
+from odlt.pool import PooledConnectionMixin
+from odlt.scheduler import DAGScheduler
+from odlt.prefetch import DEFAULT_PREFETCH_WINDOW, PrefetchReader
+from odlt.streaming import DEFAULT_BATCH_SIZE, DEFAULT_CHUNK_SIZE, ChunkReader, get_compression, iter_s3_object_chunks, iter_file_chunks, iter_csv_rows, iter_batches
+from odlt.decompress import DEFAULT_DECOMPRESS_WORKERS, DEFAULT_QUEUE_SIZE, DecompressionPipeline
+from odlt.index import INDEX_FILENAME, INDEX_VERSION, build_local_index, parse_index, dump_index, write_local_index
+from odlt.manifest import LoadManifest, get_default_manifest_path, STATUS_LOADING, STATUS_LOADED, STATUS_FAILED
+from odlt.columnar import DEFAULT_BLOCK_SIZE, get_arrow_schema, open_arrow_input, iter_arrow_batches, iter_coalesced_batches, load_arrow_batch, load_arrow_batches
+from odlt.planner import LoadPlanner
+from odlt.adaptive import AdaptiveController
+from odlt.explain import (
+    DEFAULT_SAMPLE_SIZE, ThroughputHistory, TableEstimate, LoadExplanation, get_load_path, get_default_throughput_path, sample_rows_per_byte,
+)
+from odlt.validate import DEFAULT_SAMPLE_SIZE as DEFAULT_VALIDATE_SAMPLE_SIZE, DEFAULT_MAX_ERRORS, parse_schema, validate_files
+from odlt.ranges import RETRY_BACKOFF, is_splittable, read_local_range, read_s3_range, get_record_ranges, iter_range_chunks
+from odlt.incremental import get_watermark, iter_rows_above_watermark, filter_arrow_batch
+from odlt.sync import (
+    ServerCatalog, SyncState, diff_objects, get_default_sync_state_path, OBJECT_TABLE, OBJECT_VIEW, OBJECT_DASHBOARD,
+    ACTION_REPLACE, ACTION_SKIP,
+)
+from odlt.metrics import (
+    Metrics, PHASE_DISCOVERY, PHASE_CATALOG, PHASE_LIST, PHASE_FETCH, PHASE_CREATE_TABLE, PHASE_CREATE_VIEW, PHASE_IMPORT_DASHBOARD,
+    PHASE_LOAD_FILE, PHASE_LOAD_FILES, PHASE_LOAD_TASK, PHASE_LOAD_TABLE, PHASE_LOAD_RANGE, PHASE_VALIDATE,
+)
 
 logging.basicConfig()
 logger = logging.getLogger('odlt')
 
+# number of s3 prefixes listed concurrently during library discovery
+S3_LISTING_WORKERS = 16
 
-class LibraryImport(object):
+
+class LibraryImport(PooledConnectionMixin):
     """
     public attributes:
       - source      : str  :  source where files get imported from. local or s3 
       - datalibrary : dict :  dictionary of caluclated file paths grouped by tables, dashboards, views, data
     """
-    def __init__(self, conn=None, s3_access_key=None, s3_secret_key=None, s3_region=None):
+    def __init__(self, conn=None, s3_access_key=None, s3_secret_key=None, s3_region=None, use_index=True,
+                 prefetch_window=DEFAULT_PREFETCH_WINDOW, metrics=None, decompress_workers=DEFAULT_DECOMPRESS_WORKERS,
+                 decompress_queue_size=DEFAULT_QUEUE_SIZE, throughput_history_path=None, cache=None,
+                 split_size=None, range_workers=4, range_retries=2, split_quoted=False):
         """
         :param str path: local or S3 datalibrary path
         :param pymapd.connection.Connection object conn: core instance connection
+        :param bool use_index: read the library index file instead of scanning the library when it exists
+        :param int prefetch_window: number of schema, view and dashboard files fetched ahead of the server calls
+        :param odlt.metrics.Metrics metrics: (optional) records timings, bytes and rows of every import phase, see ``metrics``
+        :param int decompress_workers: data files fetched and decompressed ahead of the client side loaders, per load worker
+        :param int decompress_queue_size: decompressed pieces of at most 1MB buffered per file
+        :param str throughput_history_path: (optional) location of the load throughput recorded by ``load_data`` and used
+            by ``explain``, defaults to a file under ~/.odlt/throughput derived from the target database
+        :param odlt.cache.ContentCache cache: (optional) local cache of S3 objects, keyed by bucket, key and ETag
+        :param int split_size: (optional) uncompressed data files larger than this are split into record aligned ranges
+            of about this size, which are parsed client side and loaded concurrently, see ``odlt.ranges``. A range boundary
+            would cut a quoted value containing a line delimiter, so only loads with the ``quoted`` copy param 'false'
+            are split, unless ``split_quoted`` is set
+        :param bool split_quoted: also split files loaded with quoted values, only safe if no quoted value spans lines
+        :param int range_workers: ranges of a file loaded at the same time, helpers borrow idle pooled connections
+        :param int range_retries: times a failed range is retried, from the first row not loaded yet
         """
+        PooledConnectionMixin.__init__(self, conn)
         self._path = None
-        self._conn = conn
         self._datalibrary = None
-        self._errors = []
         self._s3_access_key = s3_access_key
         self._s3_secret_key = s3_secret_key
         self._s3_region = s3_region
         self._source = None
         self._bucket = None
+        self._bucket_region = None
+        self._s3 = None
+        self._data_files = {}
+        self._quarantined = {}
+        self._use_index = use_index
+        self.prefetch_window = prefetch_window
+        self.load_planner = LoadPlanner()
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.decompress_workers = decompress_workers
+        self.decompress_queue_size = decompress_queue_size
+        self.throughput_history_path = throughput_history_path
+        self.cache = cache
+        self.split_size = split_size
+        self.range_workers = range_workers
+        self.range_retries = range_retries
+        self.split_quoted = split_quoted
+        self._manifest = None
+        self._resume = False
+        self._sync_state = None
+        self._watermarks = {}
+        self._watermark_loader = None
         self.copy_with_param_mapping = {
             'delimiter': 'delimiter',
             'null_str': 'nulls',
@@ -82,15 +150,17 @@ class LibraryImport(object):
     def source(self):
         return self._source
     @property
-    def errors(self):
-        return self._errors
+    def manifest(self):
+        return self._manifest
     @property
     def datalibrary(self):
         """
         Always access by obj.dataset both internally and externally
         """
         if self._source and self._datalibrary is None:
-            self._datalibrary = self._calculate_files_info()
+            with self.metrics.span(PHASE_DISCOVERY, name=self._path, source=self._source) as span:
+                self._datalibrary = self._calculate_files_info()
+                span.attrs['tables'] = len(self._datalibrary['tables'])
         return self._datalibrary
 
     def _detect_source(self):
@@ -108,6 +178,9 @@ class LibraryImport(object):
             self._source = 'local'
 
     def _initialize_s3_bucket(self):
+        # boto3 is only imported by libraries on s3
+        import boto3
+        from botocore.handlers import disable_signing
         if self._s3_access_key and self._s3_secret_key:
             session = boto3.Session(
                 aws_access_key_id=self._s3_access_key,
@@ -117,17 +190,151 @@ class LibraryImport(object):
         else:
             s3 = boto3.resource('s3')
             s3.meta.client.meta.events.register('choose-signer.s3.*', disable_signing)
+        self._s3 = s3
         self._bucket = s3.Bucket(self._bucket_name)
+
+    def _iter_s3_listing(self, prefix, delimiter=None):
+        """
+        Pages of a list_objects_v2 call, boto3 clients are thread safe so prefixes can be listed concurrently
+        """
+        kwargs = {'Bucket': self._bucket_name, 'Prefix': prefix}
+        if delimiter:
+            kwargs['Delimiter'] = delimiter
+        paginator = self._bucket.meta.client.get_paginator('list_objects_v2')
+        return paginator.paginate(**kwargs)
+
+    def _get_s3_object_summary(self, item):
+        """
+        Build an s3.ObjectSummary from a list_objects_v2 entry without another request
+        """
+        obj = self._s3.ObjectSummary(self._bucket_name, item['Key'])
+        obj.meta.data = item
+        return obj
+
+    def _list_s3_prefixes(self, prefix):
+        """
+        Sub folders directly below an s3 prefix
+        """
+        return [common['Prefix'] for page in self._iter_s3_listing(prefix, delimiter='/') for common in page.get('CommonPrefixes', [])]
+
+    def _list_s3_objects(self, prefix, recursive=False):
+        """
+        Objects directly below an s3 prefix, or all objects below it if ``recursive`` is set
+        """
+        return [
+            self._get_s3_object_summary(item)
+            for page in self._iter_s3_listing(prefix, delimiter=None if recursive else '/')
+            for item in page.get('Contents', [])
+            if not item['Key'].endswith('/')
+        ]
     
     def _initialize_localpath(self, localpath):
+        # the datalibrary stays cached across import phases of the same library
+        if localpath == self._path and self._source is not None:
+            return True
         self._path = localpath
         self._detect_source()
-        self._datalibrary = None
+        self.refresh()
+
+        return True
 
+    def refresh(self):
+        """
+        Forget the cached datalibrary, the library gets read again on the next access
+        """
+        self._datalibrary = None
+        self._data_files = {}
+        self._quarantined = {}
         return True
 
+    def _get_library_item(self, relpath, entry=None):
+        """
+        Local file path or s3 object of a path relative to the library root
+        :param dict entry: (optional) index entry with size and checksum of a data file
+        """
+        if self._source == 's3':
+            item = {'Key': self._datalibrary_path.rstrip('/') + '/' + relpath}
+            if entry:
+                item['Size'] = entry['size']
+                item['ETag'] = entry.get('etag') or '"{}"'.format(entry.get('md5', ''))
+            return self._get_s3_object_summary(item)
+        return os.path.join(self._path, *relpath.split('/'))
+
+    def _read_index(self):
+        """
+        Read the index file at the library root
+        :return dict or None if the library has no index
+        """
+        if self._source == 's3':
+            from botocore.exceptions import ClientError
+            key = self._datalibrary_path.rstrip('/') + '/' + INDEX_FILENAME
+            try:
+                content = self._bucket.Object(key).get()['Body'].read().decode()
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404', 'AccessDenied', '403'):
+                    return None
+                raise
+        else:
+            content = self.readfile(os.path.join(self._path, INDEX_FILENAME))
+            if content is None:
+                return None
+        return parse_index(content)
+
+    def _get_files_info_from_index(self, index):
+        """
+        Build the datalibrary from an index, the data files of every table are known up front
+        """
+        data = {'tables': {}, 'dashboards': [], 'views': []}
+        for tblname, tbldetails in index['tables'].items():
+            datapath = ''
+            if tbldetails['data']:
+                datadir = posixpath.join(posixpath.dirname(tbldetails['schema']), 'data')
+                if self._source == 's3':
+                    datapath = self._datalibrary_path.rstrip('/') + '/' + datadir
+                else:
+                    datapath = self._get_library_item(datadir)
+                self._data_files[datapath] = [self._get_library_item(entry['path'], entry) for entry in tbldetails['data']]
+            data['tables'][tblname] = {'schema': self._get_library_item(tbldetails['schema']), 'data': datapath}
+        data['views'] = [self._get_library_item(relpath) for relpath in index['views']]
+        data['dashboards'] = [self._get_library_item(relpath) for relpath in index['dashboards']]
+        return data
+
+    def write_index(self, localpath, checksums=True):
+        """
+        Write the index file to the root of a local or s3 library, later imports read it instead of scanning the library
+        :param bool checksums: compute the md5 of local data files, s3 objects are indexed with their ETag
+        :return dict: the written index
+        """
+        self._initialize_localpath(localpath)
+        self.refresh()
+        if self._source == 'local':
+            index = build_local_index(self._path, checksums=checksums)
+            write_local_index(self._path, index)
+            return index
+
+        prefix = self._datalibrary_path.rstrip('/') + '/'
+        files_info = self._scan_files_info()
+        index = {'version': INDEX_VERSION, 'tables': {}, 'views': [], 'dashboards': []}
+        for tblname, tbldetails in files_info['tables'].items():
+            data_files = self._list_data_files(tbldetails['data']) if tbldetails['data'] else []
+            index['tables'][tblname] = {
+                'schema': tbldetails['schema'].key[len(prefix):],
+                'data': [{'path': obj.key[len(prefix):], 'size': obj.size, 'etag': obj.e_tag} for obj in data_files],
+            }
+        index['views'] = [obj.key[len(prefix):] for obj in files_info['views']]
+        index['dashboards'] = [obj.key[len(prefix):] for obj in files_info['dashboards']]
+        self._bucket.put_object(Key=prefix + INDEX_FILENAME, Body=dump_index(index).encode())
+        return index
+
     def _calculate_files_info(self):
         # this should get called only after object initialization, at the very first access of obj.dataset property
+        if self._use_index:
+            index = self._read_index()
+            if index is not None:
+                return self._get_files_info_from_index(index)
+        return self._scan_files_info()
+
+    def _scan_files_info(self):
         # TODO: folder structure validation
         data = {'tables': {}, 'dashboards': [], 'views': []}
         if self._source == 'local':
@@ -141,38 +348,29 @@ class LibraryImport(object):
             data['dashboards'] = glob.glob('{}/dashboards/*.json'.format(self._path))
 
         elif self._source == 's3':
-            tblschema_rgx = re.compile(r'/tables/(?P<table_name>[^/]+)/schema.sql$')
-            view_rgx = re.compile(r'/views/.+$')
-            dashboard_rgx = re.compile(r'/dashboards/.+')
-            # TODO handle boto3 access denied exception
-            for obj in self._bucket.objects.filter(Prefix=self._datalibrary_path):
-                objname =  obj.key
-                if not '/tables/' in objname and not '/views/' in objname and not '/dashboards/' in objname:
-                    continue
-                match = view_rgx.search(objname)
-                if match:
-                    data['views'].append(obj)
-                    continue
-                match = dashboard_rgx.search(objname)
-                if match:
-                    data['dashboards'].append(obj)
-                    continue
-                match = tblschema_rgx.search(objname)
-                if match:
-                    tblname = match.group('table_name')
-                    if tblname in data['tables']:
-                        data['tables'][tblname]['schema'] = obj
-                    else:
-                        data['tables'][tblname] = {'schema': obj, 'data': objname.replace('/schema.sql', '/data')}
+            # list only the top level of each folder, data files are listed when a table's data gets loaded
+            prefix = self._datalibrary_path.rstrip('/') + '/'
+            table_prefixes = self._list_s3_prefixes(prefix + 'tables/')
+            with ThreadPoolExecutor(max_workers=S3_LISTING_WORKERS) as executor:
+                views = executor.submit(self._list_s3_objects, prefix + 'views/')
+                dashboards = executor.submit(self._list_s3_objects, prefix + 'dashboards/')
+                table_objects = executor.map(self._list_s3_objects, table_prefixes)
+                for tblprefix, objs in zip(table_prefixes, table_objects):
+                    schema = next((obj for obj in objs if obj.key == tblprefix + 'schema.sql'), None)
+                    if schema:
+                        tblname = tblprefix.rstrip('/').split('/')[-1]
+                        data['tables'][tblname] = {'schema': schema, 'data': tblprefix + 'data'}
+                data['views'] = views.result()
+                data['dashboards'] = dashboards.result()
 
         return data
 
-    def connect(self, omnisciuser='mapd', omniscipass='HyperInteractive', dbname='mapd', port=9090, protocol='http', host='localhost'):
+    def close(self):
         """
-        Connect to the OmniSci Core instance. 
+        Close all pooled connections
         """
-        self._conn = pymapd.connect(user=omnisciuser, password=omniscipass, host=host, dbname=dbname, port=port, protocol=protocol)
-        return True
+        self._flush_manifest()
+        return PooledConnectionMixin.close(self)
 
     def readfile(self, filepath):
         """
@@ -192,28 +390,52 @@ class LibraryImport(object):
         """
         content = None
         if obj.__class__.__name__ == 's3.ObjectSummary':
-            content = obj.get()['Body'].read().decode()
+            if self.cache is not None:
+                content = self.cache.read(obj).decode()
+            else:
+                content = obj.get()['Body'].read().decode()
         return content
 
+    def _prefetch(self, paths_or_objs):
+        """
+        Iterate over ``(path_or_obj, content)`` pairs, contents are fetched concurrently ahead of the consumer
+        """
+        return PrefetchReader(self._get_file_or_obj_content, paths_or_objs, window=self.prefetch_window)
+
     def _get_file_or_obj_content(self, path_or_obj):
         """
         Get contents of a local file or s3 object
         :param s3.ObjectSummary(or)str path_or_obj : file path or s3 object
         """
+        with self.metrics.span(PHASE_FETCH, name=self._get_relpath(path_or_obj)) as span:
+            if self.source == 's3':
+                content = self.read_s3obj(path_or_obj)
+            else:
+                content = self.readfile(path_or_obj)
+            span.size = len(content) if content else 0
+        return content
+
+    def _get_relpath(self, path_or_obj):
+        """
+        Path of a local file or s3 object relative to the library root
+        """
         if self.source == 's3':
-            return self.read_s3obj(path_or_obj)
-        else:
-            return self.readfile(path_or_obj)
+            return posixpath.relpath(path_or_obj.key, self._datalibrary_path)
+        return os.path.relpath(path_or_obj, self._path)
 
     @validate_connection
-    def _create_table(self, schemafile):
+    def _create_table(self, schemafile, content=None):
         """
         Create table from local schema file or s3 object
         :param s3.ObjectSummary(or)str schemafile : local file path or s3 object
+        :param str content: (optional) already fetched schema query
         """
         cursor = self._conn.cursor()
-        schema_qry = self._get_file_or_obj_content(schemafile)
-        cursor.execute(schema_qry)
+        schema_qry = content if content is not None else self._get_file_or_obj_content(schemafile)
+        relpath = self._get_relpath(schemafile)
+        tblname = posixpath.basename(posixpath.dirname(relpath.replace(os.sep, '/')))
+        with self.metrics.span(PHASE_CREATE_TABLE, name=relpath, table=tblname, size=len(schema_qry or '')):
+            cursor.execute(schema_qry)
 
     @validate_connection
     def create_tables(self, localpath):
@@ -221,33 +443,38 @@ class LibraryImport(object):
         Create tables from schema queries
         """
         self._initialize_localpath(localpath)
-        for tblname, tbldetails in self.datalibrary['tables'].items():
-            self._create_table(tbldetails.get('schema'))
+        schemafiles = [tbldetails.get('schema') for tbldetails in self.datalibrary['tables'].values()]
+        for schemafile, content in self._prefetch(schemafiles):
+            self._create_table(schemafile, content=content)
 
 
     @validate_connection
-    def _create_view(self, viewfile):
+    def _create_view(self, viewfile, content=None):
         """
         Create view from a local file or s3 object
         :param s3.ObjectSummary(or)str viewfile : local file path or s3 object
+        :param str content: (optional) already fetched view query
         """
         cursor = self._conn.cursor()
-        view_qry = self._get_file_or_obj_content(viewfile)
-        cursor.execute(view_qry)
+        view_qry = content if content is not None else self._get_file_or_obj_content(viewfile)
+        with self.metrics.span(PHASE_CREATE_VIEW, name=self._get_relpath(viewfile), size=len(view_qry or '')):
+            cursor.execute(view_qry)
 
     @validate_connection
     def create_views(self, localpath):
         self._initialize_localpath(localpath)
-        for view in self.datalibrary['views']:
-            self._create_view(view)
+        for view, content in self._prefetch(self.datalibrary['views']):
+            self._create_view(view, content=content)
 
     @validate_connection
-    def _import_dashboard(self, dashfile):
+    def _import_dashboard(self, dashfile, content=None):
         """
         Import dasboard from a local file or from s3 object
         :param s3.ObjectSummary(or)str dashfile : local file path or s3 object
+        :param str content: (optional) already fetched dashboard file content
         """
-        content = self._get_file_or_obj_content(dashfile)
+        if content is None:
+            content = self._get_file_or_obj_content(dashfile)
         content_lst = content.splitlines()
         if len(content_lst) != 3:
             raise ValueError('Not a valid omnisci dashboard file format')
@@ -255,19 +482,20 @@ class LibraryImport(object):
         if not is_json(dashdef):
             raise ValueError('Dashboard definition is not valid JSON')
         dashdef64 = base64.b64encode(bytes(dashdef, 'utf-8')).decode()
-        self._conn._client.create_dashboard(
-            session=self._conn._session,
-            dashboard_name=dashname,
-            dashboard_state=dashdef64,
-            image_hash='',
-            dashboard_metadata=dashmetadata,
-        )
+        with self.metrics.span(PHASE_IMPORT_DASHBOARD, name=dashname, size=len(dashdef64)):
+            self._conn._client.create_dashboard(
+                session=self._conn._session,
+                dashboard_name=dashname,
+                dashboard_state=dashdef64,
+                image_hash='',
+                dashboard_metadata=dashmetadata,
+            )
 
     @validate_connection
     def import_dashboards(self, localpath):
         self._initialize_localpath(localpath)
-        for dash in self.datalibrary['dashboards']:
-            self._import_dashboard(dash)
+        for dash, content in self._prefetch(self.datalibrary['dashboards']):
+            self._import_dashboard(dash, content=content)
         
         return True
 
@@ -307,63 +535,813 @@ class LibraryImport(object):
 
         return with_clause_args
 
-    def load_data_using_copy_from_query(self, corepath=None, from_local=False, from_s3=False, **kwargs):
+    def _get_with_clause(self, **kwargs):
         """
-        Load data using copy from query ( https://www.omnisci.com/docs/latest/6_loading_data.html#copy-from )
+        WITH clause of a COPY FROM query converted from the copy params, empty if there are none
         """
-        cursor = self._conn.cursor()
-        for tblname, datapath in self._get_each_table_data_path():
-            if not datapath: continue
-            qry = None
-            # do bulk data import from data folder
-            if from_local:
-                datapath = os.path.join(datapath, '*')
-                if corepath:
-                    datapath = datapath.replace(self._path, corepath)
-                qry = "COPY {tblname} from '{datapath}'".format(tblname=tblname, datapath=datapath)
-            elif from_s3:
-                qry = "COPY from '{datapath}'".format(datapath=datapath)
-            if qry:
-                if kwargs:
-                    withargs = self.get_withparams_from_copyparams(**kwargs)
-                    formatted_withargs = ', '.join(["{key}='{val}'".format(key=key, val=val) for key, val in withargs.items()])
-                    qry += " WITH ({})".format(formatted_withargs)
-                cursor.execute(qry)
+        withargs = self.get_withparams_from_copyparams(**kwargs)
+        if not withargs:
+            return ''
+        formatted_withargs = ', '.join(["{key}='{val}'".format(key=key, val=val) for key, val in withargs.items()])
+        return " WITH ({})".format(formatted_withargs)
+
+    def _get_bucket_region(self):
+        """
+        Region of the library bucket, looked up once, the server needs it to read s3 data
+        :return str or None if the bucket location can't be read
+        """
+        if self._bucket_region is None:
+            from botocore.exceptions import ClientError
+            try:
+                location = self._bucket.meta.client.get_bucket_location(Bucket=self._bucket_name).get('LocationConstraint')
+            except ClientError as e:
+                logger.warning('Could not look up the region of bucket %s, pass s3_region: %s', self._bucket_name, e)
+                return None
+            # buckets in us-east-1 have no location constraint
+            self._bucket_region = location or 'us-east-1'
+        return self._bucket_region
+
+    def _get_copy_from_query(self, tblname, datapath, **kwargs):
+        """
+        Build a COPY FROM query with the WITH clause converted from the copy params
+        """
+        if self.source == 's3' and not (kwargs.get('s3_region') or self._s3_region):
+            region = self._get_bucket_region()
+            if region:
+                kwargs['s3_region'] = region
+        qry = "COPY {tblname} from '{datapath}'".format(tblname=tblname, datapath=datapath)
+        return qry + self._get_with_clause(**kwargs)
+
+    @staticmethod
+    def _get_copy_result_rows(cursor):
+        """
+        Number of loaded records reported by a COPY FROM query, None if the result can't be parsed
+        """
+        try:
+            result = ' '.join(str(col) for row in cursor for col in row)
+        except TypeError:
+            return None
+        match = re.search(r'Loaded:\s*(\d+)\s*recs', result)
+        return int(match.group(1)) if match else None
+
+    def _get_s3_url(self, key):
+        """
+        s3:// url of an object key or prefix in the library bucket, as read by the server
+        """
+        return 's3://{}/{}'.format(self._bucket_name, key)
+
+    def _get_copy_source(self, datapath, corepath=None):
+        """
+        Path or url the server reads all data files of a table from with a single COPY FROM query: a wildcard path
+        below ``corepath`` for local libraries, the data prefix for s3 libraries
+        """
+        if self.source == 's3':
+            return self._get_s3_url(datapath.rstrip('/') + '/')
+        datapath = os.path.join(datapath, '*')
+        if corepath:
+            datapath = datapath.replace(self._path, corepath)
+        return datapath
+
+    def _load_file_using_copy_from_query(self, conn, tblname, path_or_obj, corepath=None, **kwargs):
+        """
+        Load a single data file using copy from query, s3 objects are fetched by the server itself
+        :return int: number of loaded rows reported by the server
+        """
+        if self.source == 's3':
+            filepath = self._get_s3_url(path_or_obj.key)
+        else:
+            filepath = path_or_obj.replace(self._path, corepath) if corepath else path_or_obj
+        cursor = conn.cursor()
+        cursor.execute(self._get_copy_from_query(tblname, filepath, **kwargs))
+        return self._get_copy_result_rows(cursor)
+
+    def _load_files_using_copy_from_query(self, conn, tblname, files, corepath=None, on_loaded=None, **kwargs):
+        """
+        Load several data files of a table. If they are all files of the table's data folder a single
+        COPY FROM query reading the whole folder or s3 prefix is used, otherwise the files are copied one after the other.
+        :param callable on_loaded: (optional) called as on_loaded(path_or_obj, rows) once a file is loaded, see ``_load_data_files``
+        """
+        datapath = self.datalibrary['tables'][tblname]['data']
+        if len(files) == len(self._list_data_files(datapath)) and datapath not in self._quarantined:
+            cursor = conn.cursor()
+            cursor.execute(self._get_copy_from_query(tblname, self._get_copy_source(datapath, corepath=corepath), **kwargs))
+            return self._get_copy_result_rows(cursor)
+        for path_or_obj in files:
+            rows = self._load_file_using_copy_from_query(conn, tblname, path_or_obj, corepath=corepath, **kwargs)
+            self._report_loaded(on_loaded, [path_or_obj], rows=rows)
+
+    def _load_table_using_copy_from_query(self, conn, tblname, datapath, corepath=None, from_local=False, from_s3=False, **kwargs):
+        """
+        Load data of a single table using copy from query. All files of the data folder, or all objects below the
+        s3 data prefix, are copied with a single query, unless a load manifest is kept, then every file is copied and
+        recorded on its own. s3 data is fetched by the server, it never passes through the client. Tables loaded
+        above a watermark are streamed file by file, their rows are filtered client side.
+        :param pymapd.connection.Connection conn: connection the query gets executed on
+        :param str tblname: table name
+        :param str datapath: local data folder or s3 data prefix of the table
+        """
+        if not (from_local or from_s3):
+            return None
+        # quarantined files are left out, so the remaining ones are copied one by one
+        if self._manifest is not None or datapath in self._quarantined or tblname in self._watermarks:
+            load_file = partial(self._load_file_using_copy_from_query, corepath=corepath, **kwargs)
+            return self._load_data_files(conn, tblname, self._list_data_files(datapath), load_file)
+        conn.cursor().execute(self._get_copy_from_query(tblname, self._get_copy_source(datapath, corepath=corepath), **kwargs))
+
+    def _get_data_file_signature(self, path_or_obj):
+        """
+        Manifest key and version attributes of a data file, size and mtime for local files, size and ETag for s3 objects
+        :return tuple: (key, dict)
+        """
+        if self.source == 's3':
+            return path_or_obj.key, {'size': path_or_obj.size, 'etag': path_or_obj.e_tag}
+        stat = os.stat(path_or_obj)
+        return os.path.relpath(path_or_obj, self._path), {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def _load_data_files(self, conn, tblname, files, load_file, load_files=None):
+        """
+        Load data files of a table. When a load manifest is kept every file gets recorded, and in
+        resume mode files already loaded successfully are skipped.
+        :param list files: local file paths or s3 objects
+        :param callable load_file: called as load_file(conn, tblname, path_or_obj), returns the number of loaded rows if known
+        :param callable load_files: (optional) called as load_files(conn, tblname, files, on_loaded=on_loaded) to load several
+            files together, also used for single files if ``load_file`` is None. Loaders which commit the files one after
+            the other call on_loaded(path_or_obj, rows) for every loaded file, the files not reported are recorded as one
+            unit when load_files returns or raises
+        """
+        pending = []
+        for path_or_obj in files:
+            signature = self._get_data_file_signature(path_or_obj) if self._manifest is not None else (None, None)
+            if self._resume:
+                if self._manifest.is_loaded(tblname, signature[0], **signature[1]):
+                    logger.info('Skipping %s, already loaded into %s', signature[0], tblname)
+                    continue
+                entry = self._manifest.get(tblname, signature[0])
+                if entry and entry.get('status') == STATUS_LOADED and tblname not in self._watermarks:
+                    logger.warning('%s changed since it was loaded into %s, loading it again may duplicate rows', signature[0], tblname)
+            pending.append((path_or_obj, signature))
+
+        if tblname in self._watermarks:
+            load_file, load_files = partial(self._watermark_loader, watermark=self._watermarks[tblname]), None
+
+        if load_files is not None and len(pending) > 1:
+            groups = [pending]
+        else:
+            groups = [[item] for item in pending]
+
+        for group in groups:
+            self._set_manifest_status(tblname, group, STATUS_LOADING)
+            phase = PHASE_LOAD_FILES if len(group) > 1 else PHASE_LOAD_FILE
+            name = self._get_relpath(group[0][0]) if len(group) == 1 else posixpath.dirname(self._get_relpath(group[0][0]).replace(os.sep, '/'))
+            size = sum(self._get_data_file_size(path_or_obj) for path_or_obj, _ in group)
+            # files of the group already committed, recorded as soon as the loader reports them
+            reported = {}
+
+            def on_loaded(path_or_obj, rows=None):
+                item = next(item for item in group if item[0] is path_or_obj)
+                reported[id(path_or_obj)] = item
+                self._set_manifest_status(tblname, [item], STATUS_LOADED, rows=rows)
+
+            try:
+                with self.metrics.span(phase, name=name, table=tblname, size=size, files=len(group)) as span:
+                    if len(group) > 1 or load_file is None:
+                        rows = load_files(conn, tblname, [path_or_obj for path_or_obj, _ in group], on_loaded=on_loaded)
+                    else:
+                        rows = load_file(conn, tblname, group[0][0])
+                    span.rows = rows
+            except Exception:
+                self._set_manifest_status(tblname, [item for item in group if id(item[0]) not in reported], STATUS_FAILED)
+                raise
+            remaining = [item for item in group if id(item[0]) not in reported]
+            self._set_manifest_status(tblname, remaining, STATUS_LOADED, rows=rows if len(group) == 1 else None)
+
+    def _set_manifest_status(self, tblname, group, status, rows=None):
+        if self._manifest is None:
+            return
+        for _, (key, signature) in group:
+            self._manifest.update(tblname, key, status, rows=rows, **signature)
+
+    def _list_data_files(self, datapath):
+        """
+        Data files of a table, listed on first use, without the files quarantined by ``validate``
+        :param str datapath: local data folder or s3 data prefix of the table
+        :return list of local file paths or s3.ObjectSummary objects
+        """
+        if datapath not in self._data_files:
+            with self.metrics.span(PHASE_LIST, name=datapath) as span:
+                if self.source == 's3':
+                    self._data_files[datapath] = self._list_s3_objects(datapath.rstrip('/') + '/', recursive=True)
+                else:
+                    self._data_files[datapath] = sorted(glob.glob(os.path.join(datapath, '*')))
+                span.attrs['files'] = len(self._data_files[datapath])
+        quarantined = self._quarantined.get(datapath)
+        if quarantined:
+            return [path_or_obj for path_or_obj in self._data_files[datapath] if self._get_relpath(path_or_obj) not in quarantined]
+        return self._data_files[datapath]
+
+    def _load_rows(self, conn, tblname, rows, null_str='\\N'):
+        """
+        Insert a batch of parsed rows into a table
+        :param list rows: list of rows, each a list of field strings
+        """
+        from mapd.ttypes import TStringRow, TStringValue
+        conn._client.load_table(
+            session=conn._session,
+            table_name=tblname,
+            rows=[
+                TStringRow(cols=[TStringValue(str_val=val, is_null=val == null_str) for val in row])
+                for row in rows
+            ],
+        )
+
+    def _stream_s3_object(self, conn, tblname, obj, batch_size=DEFAULT_BATCH_SIZE, **kwargs):
+        """
+        Stream a single s3 data object into a table using ranged GETs, on the fly decompression and bounded batches
+        :param s3.ObjectSummary obj: data object
+        :return int: number of loaded rows
+        """
+        loaded = 0
+        for batch in iter_batches(self._iter_data_file_rows([obj], open_chunks=self._open_s3_object_chunks, **kwargs), batch_size):
+            self._load_rows(conn, tblname, batch, null_str=kwargs.get('null_str', '\\N'))
+            loaded += len(batch)
+        return loaded
+
+    def _load_file_using_api(self, conn, tblname, path_or_obj, corepath=None, batch_size=DEFAULT_BATCH_SIZE, **kwargs):
+        """
+        Load a single data file, local files are imported by the server and s3 objects streamed by the client
+        :return int: number of loaded rows, None if the server imported the file
+        """
+        if self._is_splittable(path_or_obj, quoted=kwargs.get('quoted', True)):
+            return self._load_file_in_ranges(conn, tblname, path_or_obj, batch_size=batch_size, **kwargs)
+        if self.source == 's3':
+            return self._stream_s3_object(conn, tblname, path_or_obj, batch_size=batch_size, **kwargs)
+        from mapd.ttypes import TCopyParams
+        filename = path_or_obj
+        if corepath:
+            filename = filename.replace(self._path, corepath)
+        conn._client.import_table(
+            session=conn._session,
+            table_name=tblname,
+            file_name=filename,
+            copy_params=TCopyParams(**kwargs)
+        )
+
+    def _load_files_using_api(self, conn, tblname, files, corepath=None, batch_size=DEFAULT_BATCH_SIZE, on_loaded=None, **kwargs):
+        """
+        Load several data files of a table. Rows of s3 objects are streamed as one sequence, so batches
+        span file boundaries and small files share load calls. Local files are imported one after the other.
+        :param callable on_loaded: (optional) called as on_loaded(path_or_obj, rows) once all rows of a file are loaded
+        """
+        if self.source == 's3':
+            files, large = self._split_off_large_files(files, quoted=kwargs.get('quoted', True))
+            loaded = 0
+            for obj in large:
+                rows = self._load_file_in_ranges(conn, tblname, obj, batch_size=batch_size, **kwargs)
+                self._report_loaded(on_loaded, [obj], rows=rows)
+                loaded += rows
+            ended = []
+
+            def iter_rows_of_files():
+                for obj, pieces in self._iter_decompressed_files(files):
+                    yield from iter_csv_rows(pieces, **kwargs)
+                    ended.append(obj)
+
+            for batch in iter_batches(iter_rows_of_files(), batch_size):
+                self._load_rows(conn, tblname, batch, null_str=kwargs.get('null_str', '\\N'))
+                loaded += len(batch)
+                self._report_loaded(on_loaded, ended)
+            self._report_loaded(on_loaded, ended)
+            return loaded
+        for filepath in files:
+            self._load_file_using_api(conn, tblname, filepath, corepath=corepath, **kwargs)
+            self._report_loaded(on_loaded, [filepath])
+
+    @staticmethod
+    def _report_loaded(on_loaded, files, rows=None):
+        """
+        Report loaded files to the on_loaded callback of a group loader. Files are taken off the list, files streamed
+        as one sequence are listed once all of their rows were read, so they are all in the batches loaded so far.
+        """
+        while files:
+            path_or_obj = files.pop(0)
+            if on_loaded is not None:
+                on_loaded(path_or_obj, rows)
+
+    def _load_table_using_api(self, conn, tblname, datapath, corepath=None, from_local=False, from_s3=False, batch_size=DEFAULT_BATCH_SIZE, **kwargs):
+        """
+        Load data of a single table using mapdcoreconn._client api. Local files are imported by the server,
+        s3 objects are streamed by the client in batches of ``batch_size`` rows.
+        :param pymapd.connection.Connection conn: connection the data gets imported on
+        :param str tblname: table name
+        :param str datapath: local data folder or s3 data prefix of the table
+        :param int batch_size: rows sent per load_table call when streaming from s3
+        """
+        if from_local or from_s3:
+            load_file = partial(self._load_file_using_api, corepath=corepath, batch_size=batch_size, **kwargs)
+            self._load_data_files(conn, tblname, self._list_data_files(datapath), load_file)
+
+    def _open_data_file_chunks(self, path_or_obj, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Compressed chunks and compression of a data file, as read by the decompression pipeline
+        :return tuple: (iterable of chunks, compression)
+        """
+        if self.source == 's3':
+            return self._open_s3_object_chunks(path_or_obj, chunk_size=chunk_size)
+        return self._iter_local_file_chunks(path_or_obj, chunk_size=chunk_size), get_compression(path_or_obj)
+
+    def _open_s3_object_chunks(self, obj, chunk_size=DEFAULT_CHUNK_SIZE):
+        if self.cache is not None:
+            return self.cache.iter_chunks(obj, chunk_size=chunk_size), get_compression(obj.key)
+        return iter_s3_object_chunks(obj, chunk_size=chunk_size), get_compression(obj.key)
+
+    @staticmethod
+    def _iter_local_file_chunks(filepath, chunk_size=DEFAULT_CHUNK_SIZE):
+        with open(filepath, 'rb') as f:
+            yield from iter_file_chunks(f, chunk_size=chunk_size)
+
+    def _iter_decompressed_files(self, files, open_chunks=None):
+        """
+        Iterate over ``(path_or_obj, pieces)`` of data files, up to ``decompress_workers`` files are fetched and
+        decompressed ahead of the consumer. The pieces of a file have to be consumed before moving on to the next file.
+        :param callable open_chunks: (optional) overrides how a file is read, defaults to the library source
+        """
+        return DecompressionPipeline(open_chunks or self._open_data_file_chunks, files, workers=self.decompress_workers,
+                                     queue_size=self.decompress_queue_size)
+
+    def _iter_data_file_rows(self, files, open_chunks=None, **kwargs):
+        """
+        Parsed csv rows of data files as one sequence
+        """
+        for _, pieces in self._iter_decompressed_files(files, open_chunks=open_chunks):
+            yield from iter_csv_rows(pieces, **kwargs)
+
+    def _iter_arrow_inputs(self, files):
+        """
+        Iterate over ``(path_or_obj, source)`` for the arrow csv reader. Uncompressed local files are memory mapped,
+        s3 objects and compressed files are decompressed ahead by the decompression pipeline.
+        """
+        streamed = [path_or_obj for path_or_obj in files if self.source == 's3' or get_compression(path_or_obj)]
+        decompressed = iter(self._iter_decompressed_files(streamed))
+        try:
+            for path_or_obj in files:
+                if self.source == 's3' or get_compression(path_or_obj):
+                    _, pieces = next(decompressed)
+                    source = ChunkReader(pieces)
+                else:
+                    source = open_arrow_input(path_or_obj)
+                with source:
+                    yield path_or_obj, source
+        finally:
+            decompressed.close()
+
+    def _load_file_using_arrow(self, conn, tblname, path_or_obj, schema, block_size=DEFAULT_BLOCK_SIZE, **kwargs):
+        """
+        Parse a single data file into record batches and ship them with the columnar load endpoint
+        :return int: number of loaded rows
+        """
+        if self._is_splittable(path_or_obj, quoted=kwargs.get('quoted', True)):
+            return self._load_file_in_ranges(conn, tblname, path_or_obj, schema=schema, block_size=block_size, **kwargs)
+        loaded = 0
+        for _, source in self._iter_arrow_inputs([path_or_obj]):
+            for batch in iter_arrow_batches(source, schema, block_size=block_size, **kwargs):
+                loaded += load_arrow_batch(conn, tblname, batch)
+        return loaded
+
+    def _load_files_using_arrow(self, conn, tblname, files, block_size=DEFAULT_BLOCK_SIZE, on_loaded=None, **kwargs):
+        """
+        Parse several data files of a table and ship their record batches in groups of at least ``block_size``
+        bytes, so small files share load calls
+        :param callable on_loaded: (optional) called as on_loaded(path_or_obj, rows) once all rows of a file are loaded
+        """
+        schema = get_arrow_schema(conn.get_table_details(tblname))
+        files, large = self._split_off_large_files(files, quoted=kwargs.get('quoted', True))
+        ended = []
+
+        def iter_batches_of_files():
+            for path_or_obj, source in self._iter_arrow_inputs(files):
+                yield from iter_arrow_batches(source, schema, block_size=block_size, **kwargs)
+                ended.append(path_or_obj)
+
+        loaded = 0
+        for path_or_obj in large:
+            rows = self._load_file_in_ranges(conn, tblname, path_or_obj, schema=schema, block_size=block_size, **kwargs)
+            self._report_loaded(on_loaded, [path_or_obj], rows=rows)
+            loaded += rows
+        for batches in iter_coalesced_batches(iter_batches_of_files(), min_size=block_size):
+            loaded += load_arrow_batches(conn, tblname, batches)
+            self._report_loaded(on_loaded, ended)
+        self._report_loaded(on_loaded, ended)
+        return loaded
+
+    def _is_splittable(self, path_or_obj, quoted=True):
+        """
+        :param quoted: ``quoted`` copy param of the load
+        """
+        name = path_or_obj.key if self.source == 's3' else path_or_obj
+        quoted = not self.split_quoted and quoted is not False and quoted != 'false'
+        return is_splittable(name, self._get_data_file_size(path_or_obj), self.split_size, quoted=quoted)
+
+    def _split_off_large_files(self, files, quoted=True):
+        """
+        :return tuple: (files loaded as a whole, files loaded in ranges)
+        """
+        large = [path_or_obj for path_or_obj in files if self._is_splittable(path_or_obj, quoted=quoted)]
+        return [path_or_obj for path_or_obj in files if path_or_obj not in large], large
+
+    def _read_data_file_range(self, path_or_obj, offset, length):
+        if self.source == 's3':
+            return read_s3_range(path_or_obj, offset, length)
+        return read_local_range(path_or_obj, offset, length)
+
+    def _load_file_in_ranges(self, conn, tblname, path_or_obj, schema=None, batch_size=DEFAULT_BATCH_SIZE,
+                             block_size=DEFAULT_BLOCK_SIZE, **kwargs):
+        """
+        Load a large data file as record aligned byte ranges, parsed client side and loaded concurrently. Ranges are
+        loaded on the current connection and by up to ``range_workers - 1`` helpers with idle pooled connections,
+        helpers which find no idle connection leave the work to the others. A range failing after its retries stops
+        the remaining ranges.
+        :param pyarrow.Schema schema: (optional) ship Arrow record batches of this schema instead of rows
+        :return int: number of loaded rows
+        """
+        read_at = partial(self._read_data_file_range, path_or_obj)
+        ranges = get_record_ranges(read_at, self._get_data_file_size(path_or_obj), self.split_size,
+                                   line_delim=kwargs.get('line_delim', '\n'))
+        logger.info('Loading %s in %s ranges', self._get_relpath(path_or_obj), len(ranges))
+        pending = deque(enumerate(ranges))
+        load_range = partial(self._load_range, tblname=tblname, path_or_obj=path_or_obj, read_at=read_at, schema=schema,
+                             batch_size=batch_size, block_size=block_size, **kwargs)
+
+        def work(range_conn):
+            loaded = 0
+            while True:
+                try:
+                    index, byte_range = pending.popleft()
+                except IndexError:
+                    return loaded
+                try:
+                    loaded += load_range(range_conn, index, byte_range)
+                except Exception:
+                    pending.clear()
+                    raise
+
+        def assist():
+            try:
+                range_conn = self._pool.acquire(timeout=0)
+            except TimeoutError:
+                return 0
+            healthy = False
+            try:
+                loaded = work(range_conn)
+                healthy = True
+                return loaded
+            finally:
+                self._pool.release(range_conn, healthy=healthy)
+
+        helpers = min(self.range_workers, len(ranges)) - 1 if self._pool is not None else 0
+        if helpers <= 0:
+            return work(conn)
+        with ThreadPoolExecutor(max_workers=helpers) as executor:
+            futures = [executor.submit(assist) for _ in range(helpers)]
+            loaded = work(conn)
+            return loaded + sum(future.result() for future in futures)
+
+    def _load_range(self, conn, index, byte_range, tblname, path_or_obj, read_at, schema=None, batch_size=DEFAULT_BATCH_SIZE,
+                    block_size=DEFAULT_BLOCK_SIZE, has_header=True, **kwargs):
+        """
+        Load a byte range of a data file, retried from the first row not loaded yet
+        :param tuple byte_range: (start, end) offsets
+        :return int: number of loaded rows
+        """
+        start, end = byte_range
+        name = '{}@{}-{}'.format(self._get_relpath(path_or_obj), start, end)
+        # only the first range starts with the header
+        has_header = has_header if start == 0 else False
+        progress = [0]
+        with self.metrics.span(PHASE_LOAD_RANGE, name=name, table=tblname, size=end - start, range=index) as span:
+            for attempt in range(self.range_retries + 1):
+                try:
+                    chunks = iter_range_chunks(read_at, start, end)
+                    self._load_range_rows(conn, tblname, chunks, progress, schema=schema, batch_size=batch_size,
+                                          block_size=block_size, has_header=has_header, **kwargs)
+                    break
+                except Exception as e:
+                    if attempt == self.range_retries:
+                        raise
+                    span.retries += 1
+                    logger.warning('Retrying %s after %s rows: %s', name, progress[0], e)
+                    time.sleep(RETRY_BACKOFF * (attempt + 1))
+                finally:
+                    span.rows = progress[0]
+        return progress[0]
+
+    def _load_range_rows(self, conn, tblname, chunks, progress, schema=None, batch_size=DEFAULT_BATCH_SIZE,
+                         block_size=DEFAULT_BLOCK_SIZE, **kwargs):
+        """
+        Parse and load the rows of a range, skipping the ``progress[0]`` rows loaded by previous attempts
+        :param list progress: number of loaded rows, updated after every load call
+        """
+        skip = progress[0]
+        if schema is None:
+            for batch in iter_batches(islice(iter_csv_rows(chunks, **kwargs), skip, None), batch_size):
+                self._load_rows(conn, tblname, batch, null_str=kwargs.get('null_str', '\\N'))
+                progress[0] += len(batch)
+            return
+        with ChunkReader(chunks) as source:
+            for batch in iter_arrow_batches(source, schema, block_size=block_size, **kwargs):
+                if skip >= batch.num_rows:
+                    skip -= batch.num_rows
+                    continue
+                progress[0] += load_arrow_batch(conn, tblname, batch.slice(skip))
+                skip = 0
+
+    def _load_table_using_arrow(self, conn, tblname, datapath, corepath=None, from_local=False, from_s3=False, block_size=DEFAULT_BLOCK_SIZE, **kwargs):
+        """
+        Load data of a single table by parsing the data files client side into Arrow record batches.
+        The server does not need access to the data files, so ``corepath`` is not used.
+        :param int block_size: approximate bytes of csv parsed into each record batch
+        """
+        schema = get_arrow_schema(conn.get_table_details(tblname))
+        load_file = partial(self._load_file_using_arrow, schema=schema, block_size=block_size, **kwargs)
+        self._load_data_files(conn, tblname, self._list_data_files(datapath), load_file)
+
+    def _open_manifest(self, resume=False, manifest_path=None):
+        """
+        Open the load manifest used to record loaded data files
+        :param bool resume: skip data files the manifest records as loaded
+        :param str manifest_path: (optional) manifest location, defaults to a file under ~/.odlt/manifests derived
+            from the library path and target database. Without ``resume`` a manifest is only kept when a path is passed.
+        """
+        self._flush_manifest()
+        self._resume = resume
+        if not resume and not manifest_path:
+            self._manifest = None
+            return None
+        if not manifest_path:
+            params = self._connection_params or {}
+            manifest_path = get_default_manifest_path(self._path, params.get('host'), params.get('port'), params.get('dbname'))
+        self._manifest = LoadManifest(manifest_path)
+        return self._manifest
+
+    def _flush_manifest(self):
+        """
+        Write the file updates buffered by the load manifest, called when a load is done
+        """
+        if self._manifest is not None:
+            self._manifest.flush()
+
+    def _get_file_loaders(self, use_copy_from_qry=False, use_arrow=False, corepath=None,
+                          batch_size=DEFAULT_BATCH_SIZE, block_size=DEFAULT_BLOCK_SIZE, **kwargs):
+        """
+        Per file and per file group loaders of the chosen load path, as used by ``_load_data_files``
+        :return tuple: (load_file or None, load_files)
+        """
+        if use_arrow:
+            return None, partial(self._load_files_using_arrow, block_size=block_size, **kwargs)
+        if use_copy_from_qry:
+            return (
+                partial(self._load_file_using_copy_from_query, corepath=corepath, **kwargs),
+                partial(self._load_files_using_copy_from_query, corepath=corepath, **kwargs),
+            )
+        return (
+            partial(self._load_file_using_api, corepath=corepath, batch_size=batch_size, **kwargs),
+            partial(self._load_files_using_api, corepath=corepath, batch_size=batch_size, **kwargs),
+        )
+
+    def _get_data_file_size(self, path_or_obj):
+        if self.source == 's3':
+            return path_or_obj.size
+        return os.path.getsize(path_or_obj)
+
+    def _get_load_plan(self, workers=1, tables=None):
+        """
+        :param list tables: (optional) names of the tables planned, all tables with data by default
+        """
+        table_files = {
+            tblname: [(path_or_obj, self._get_data_file_size(path_or_obj)) for path_or_obj in self._list_data_files(datapath)]
+            for tblname, datapath in self._get_each_table_data_path() if datapath and (tables is None or tblname in tables)
+        }
+        return self.load_planner.plan(table_files, workers=workers)
+
+    def plan_load(self, localpath, max_workers=4):
+        """
+        Plan the data load of a library without loading anything. Small files of a table are coalesced
+        into one task and tasks are assigned longest first to the least loaded worker, see ``load_planner``.
+        :param int max_workers: number of workers the plan is made for
+        :return odlt.planner.LoadPlan
+        """
+        self._initialize_localpath(localpath)
+        return self._get_load_plan(workers=max_workers)
+
+    @contextmanager
+    def _load_slot(self, controller, task):
+        """
+        Wait until an adaptive controller lets the enclosed load task run
+        :return int: threads copy param of the task, None if not controlled
+        """
+        if controller is None:
+            yield None
+            return
+        with controller.slot(size=task.size) as threads:
+            yield threads
+
+    def _run_load_task(self, conn, load_file, load_files, task, threads=None, queued_at=None):
+        """
+        Load the files of a plan task
+        :param int threads: (optional) threads copy param passed to the loaders
+        """
+        with self.metrics.span(PHASE_LOAD_TASK, table=task.table, size=task.size, queued_at=queued_at, files=len(task.files)) as span:
+            if threads is not None:
+                span.attrs['threads'] = threads
+                load_file = partial(load_file, threads=threads) if load_file is not None else None
+                load_files = partial(load_files, threads=threads)
+            self._load_data_files(conn, task.table, task.files, load_file, load_files=load_files)
+
+    def _run_load_task_in_worker(self, load_file, load_files, task, controller=None, queued_at=None):
+        """
+        Worker entrypoint for parallel load plans, every worker borrows its own connection
+        :param odlt.adaptive.AdaptiveController controller: (optional) the connection is borrowed once the controller lets the task run
+        :param float queued_at: (optional) time.perf_counter() of the submission, recorded as queue wait
+        """
+        with self._load_slot(controller, task) as threads:
+            with self._pool.connection() as conn:
+                self._run_load_task(conn, load_file, load_files, task, threads=threads, queued_at=queued_at)
+
+    def _run_load_plan(self, plan, load_file, load_files, max_workers=None, controller=None):
+        """
+        Run the tasks of a load plan in order, longest first
+        :param int max_workers: (optional) number of tasks run at the same time, each on its own pooled connection.
+            Failures of a task are collected into ``errors`` instead of aborting the remaining tasks.
+        :param odlt.adaptive.AdaptiveController controller: (optional) adjusts the tasks in flight, up to ``max_workers``,
+            and their threads copy param
+        """
+        if not max_workers:
+            for task in plan.tasks:
+                with self._load_slot(controller, task) as threads:
+                    self._run_load_task(self._conn, load_file, load_files, task, threads=threads)
+            return True
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._run_load_task_in_worker, load_file, load_files, task, controller=controller,
+                                queued_at=time.perf_counter()): task
+                for task in plan.tasks
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    self._record_error('load_data', futures[future].table, e)
 
         return True
 
-    def load_data_using_api(self, corepath=None, from_local=False, from_s3=False, **kwargs):
+    def _run_adaptive_load(self, adaptive, load_file, load_files, max_workers=None, threads=None, tables=None):
+        """
+        Load every data file as planned by ``load_planner``, the tasks in flight and their threads copy param are
+        adjusted by an adaptive controller
+        :param adaptive: True, or an odlt.adaptive.AdaptiveController to reuse, e.g. tuned by a previous load
+        :param int max_workers: (optional) maximum number of tasks in flight, tasks run one after the other if not passed
+        :param int threads: (optional) maximum threads copy param of a load, not controlled if not passed
+        :param list tables: (optional) names of the tables loaded, all tables with data by default
+        """
+        max_workers = self._get_worker_count(max_workers)
+        if isinstance(adaptive, AdaptiveController):
+            controller = adaptive
+        else:
+            controller = AdaptiveController(initial_limit=min(2, max_workers or 1), max_limit=max_workers or 1, max_threads=threads)
+        load_plan = self._get_load_plan(workers=max_workers or 1, tables=tables)
+        logger.info('Load plan:\n%s', load_plan.describe())
+        return self._run_load_plan(load_plan, load_file, load_files, max_workers=max_workers, controller=controller)
+
+    def _load_table_in_worker(self, load_table, tblname, datapath, queued_at=None, **kwargs):
+        """
+        Worker entrypoint for parallel loads, every worker borrows its own connection
+        :param float queued_at: (optional) time.perf_counter() of the submission, recorded as queue wait
+        """
+        with self._pool.connection() as conn:
+            with self.metrics.span(PHASE_LOAD_TABLE, table=tblname, queued_at=queued_at):
+                load_table(conn, tblname, datapath, **kwargs)
+
+    @validate_connection
+    def _load_table_data(self, tblname, datapath, corepath=None, use_copy_from_qry=False, use_arrow=False,
+                         batch_size=DEFAULT_BATCH_SIZE, block_size=DEFAULT_BLOCK_SIZE, **kwargs):
+        """
+        Load the data of a single table on the current connection
+        """
+        from_local, from_s3 = self._source == 'local', self._source == 's3'
+        if use_arrow:
+            load_table = partial(self._load_table_using_arrow, block_size=block_size)
+        elif use_copy_from_qry:
+            load_table = self._load_table_using_copy_from_query
+        else:
+            load_table = partial(self._load_table_using_api, batch_size=batch_size)
+        load_table(self._conn, tblname, datapath, corepath=corepath, from_local=from_local, from_s3=from_s3, **kwargs)
+
+    def _load_tables(self, load_table, max_workers=None, **kwargs):
+        """
+        Run ``load_table`` for every table which has a data folder
+        :param callable load_table: per table loader, called as load_table(conn, tblname, datapath, **kwargs)
+        :param int max_workers: (optional) number of tables loaded at the same time, each on its own connection.
+            Failures of a single table are collected into ``errors`` instead of aborting the remaining loads.
+            If this is not passed tables are loaded one after the other on the current connection.
+        """
+        tables = [(tblname, datapath) for tblname, datapath in self._get_each_table_data_path() if datapath]
+        max_workers = self._get_worker_count(max_workers)
+        if not max_workers:
+            for tblname, datapath in tables:
+                load_table(self._conn, tblname, datapath, **kwargs)
+            return True
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._load_table_in_worker, load_table, tblname, datapath, queued_at=time.perf_counter(), **kwargs): tblname
+                for tblname, datapath in tables
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    self._record_error('load_data', futures[future], e)
+
+        return True
+
+    @validate_connection
+    def load_data_using_copy_from_query(self, corepath=None, from_local=False, from_s3=False, max_workers=None, adaptive=None, **kwargs):
+        """
+        Load data using copy from query ( https://www.omnisci.com/docs/latest/6_loading_data.html#copy-from )
+        :param int max_workers: (optional) number of tables loaded in parallel
+        :param adaptive: (optional) True or an odlt.adaptive.AdaptiveController, copy data files with adaptive concurrency
+            and threads, see ``load_data``
+        """
+        if adaptive and (from_local or from_s3):
+            load_file, load_files = self._get_file_loaders(use_copy_from_qry=True, corepath=corepath, **kwargs)
+            return self._run_adaptive_load(adaptive, load_file, load_files, max_workers=max_workers, threads=kwargs.get('threads'))
+        return self._load_tables(
+            self._load_table_using_copy_from_query, max_workers=max_workers,
+            corepath=corepath, from_local=from_local, from_s3=from_s3, **kwargs
+        )
+
+    @validate_connection
+    def load_data_using_api(self, corepath=None, from_local=False, from_s3=False, max_workers=None, batch_size=DEFAULT_BATCH_SIZE,
+                            adaptive=None, **kwargs):
         """
         Load data using mapdcoreconn._client api
         :param bool from_local: True if the files are imported from local
-        :param bool from_s3: True if the files are imported from S3
-        """
-        for tblname, datapath in self._get_each_table_data_path():
-            if not datapath: continue
-            if from_local:
-                for df in glob.glob(os.path.join(datapath, '*')):
-                    filename = df
-                    if corepath:
-                        filename = filename.replace(self._path, corepath)
-                    self._conn._client.import_table(
-                        session=self._conn._session,
-                        table_name=tblname,
-                        file_name=filename,
-                        copy_params=TCopyParams(**kwargs)
-                    )
-
-            elif from_s3:
-                pass
-                # TODO: Add support for s3 data import
-        
-        return True
+        :param bool from_s3: True if the files are imported from S3, objects get streamed through the client
+        :param int max_workers: (optional) number of tables loaded in parallel
+        :param int batch_size: rows sent per load_table call when streaming from s3
+        :param adaptive: (optional) True or an odlt.adaptive.AdaptiveController, load data files with adaptive concurrency
+            and threads, see ``load_data``
+        """
+        if adaptive and (from_local or from_s3):
+            load_file, load_files = self._get_file_loaders(corepath=corepath, batch_size=batch_size, **kwargs)
+            return self._run_adaptive_load(adaptive, load_file, load_files, max_workers=max_workers, threads=kwargs.get('threads'))
+        return self._load_tables(
+            self._load_table_using_api, max_workers=max_workers,
+            corepath=corepath, from_local=from_local, from_s3=from_s3, batch_size=batch_size, **kwargs
+        )
+
+    @validate_connection
+    def load_data_using_arrow(self, corepath=None, from_local=False, from_s3=False, max_workers=None, block_size=DEFAULT_BLOCK_SIZE, **kwargs):
+        """
+        Load data by parsing csv files client side into Arrow record batches and shipping them with the
+        columnar load endpoint, no filesystem shared with the server is required
+        :param int max_workers: (optional) number of tables loaded in parallel
+        :param int block_size: approximate bytes of csv parsed into each record batch
+        """
+        return self._load_tables(
+            self._load_table_using_arrow, max_workers=max_workers,
+            corepath=corepath, from_local=from_local, from_s3=from_s3, block_size=block_size, **kwargs
+        )
 
     @validate_connection
-    def load_data(self, localpath, corepath=None, use_copy_from_qry=False, **kwargs):
+    def load_data(self, localpath, corepath=None, use_copy_from_qry=False, use_arrow=False, parallel=False, max_workers=4,
+                  batch_size=DEFAULT_BATCH_SIZE, block_size=DEFAULT_BLOCK_SIZE, resume=False, manifest_path=None, plan=False,
+                  incremental=False, watermarks=None, adaptive=None, validate=None, **kwargs):
         """
         Load data into the created tables.
         :param str corepath: (optional) The path to the root of the folder structure containing the data library, absolute or relative to the OmniSci Core server. If this is not passed then ``localpath`` is used.
-        :param bool use_copy_from_qry: loads data using COPY FROM query
+        :param bool use_copy_from_qry: loads data using COPY FROM query. s3 data is fetched by the server itself with the
+            s3 credentials and region of the importer, or the ones passed as copy params
+        :param bool use_arrow: parse the data files client side and load them as Arrow record batches, ``corepath`` is not needed
+        :param bool parallel: load several tables at the same time, each on its own connection. Errors are collected per table into ``errors``
+        :param int max_workers: maximum number of tables loaded at the same time when ``parallel`` is set (default `4`)
+        :param int batch_size: rows per batch when data objects are streamed from S3 by the client (default `10000`)
+        :param int block_size: approximate bytes of csv per record batch when ``use_arrow`` is set (default 16MB)
+        :param bool resume: skip data files already loaded successfully by a previous run, as recorded in the load manifest
+        :param str manifest_path: (optional) location of the load manifest recording size, mtime or ETag, row count and status of every data file
+        :param bool plan: schedule the load with ``load_planner``: small files of a table are loaded together and tasks
+            run longest first across the workers, the planned schedule is logged. See ``plan_load``
+        :param bool incremental: refresh tables with the files added since the last load only, as recorded in the load manifest.
+            Files changed since they were loaded are loaded again, use ``watermarks`` to avoid duplicate rows
+        :param dict watermarks: (optional) table name -> watermark column. Rows of these tables are only loaded if their
+            value in the column is above the largest value on the server before the load. The rows are filtered client side,
+            so these tables are streamed with load_table, or as Arrow record batches if ``use_arrow`` is set
+        :param validate: (optional) True, or 'full' to check whole files instead of a sample at their start. Data files
+            are checked against the table schema with the copy params before anything is loaded, files with errors
+            are quarantined: they are left out of the load and recorded in ``errors``. See ``validate``
+        :param adaptive: (optional) True, or an odlt.adaptive.AdaptiveController to reuse. Data files are loaded as planned
+            by ``load_planner`` and the loads in flight, up to ``max_workers``, and their ``threads`` copy param, up to the
+            one passed, are adjusted AIMD style to the measured load latency and errors
 
         :**kwargs: Optional keyword arguments to pass to the OmniSci Core load_table endpoint:
         :param str array_delim: A single-character string for the delimiter between input values contained within an array (default `,`)
@@ -388,6 +1366,32 @@ class LibraryImport(object):
         TODO: Validation that each folder has a valid schema.sql file, skip if it does not
         """
         self._initialize_localpath(localpath)
+        if validate:
+            self.validate(localpath, sample_size=None if validate == 'full' else DEFAULT_VALIDATE_SAMPLE_SIZE,
+                          max_workers=max_workers if parallel else None, quarantine=True, **kwargs)
+        self._open_manifest(resume=resume or incremental, manifest_path=manifest_path)
+        self._prepare_watermarks(watermarks, use_arrow=use_arrow, batch_size=batch_size, block_size=block_size, **kwargs)
+        errors, started = len(self._errors), time.perf_counter()
+        try:
+            self._load_data(corepath=corepath, use_copy_from_qry=use_copy_from_qry, use_arrow=use_arrow, parallel=parallel,
+                            max_workers=max_workers, batch_size=batch_size, block_size=block_size, plan=plan, adaptive=adaptive, **kwargs)
+            self._record_watermarks()
+        finally:
+            self._watermarks = {}
+            self._flush_manifest()
+        # partial and failed loads would skew the throughput explain predicts durations from
+        if not (resume or incremental) and len(self._errors) == errors:
+            self._record_throughput(get_load_path(self.source, use_copy_from_qry=use_copy_from_qry, use_arrow=use_arrow),
+                                    self._get_explain_workers(parallel, max_workers), time.perf_counter() - started)
+        self.metrics.flush()
+        return True
+
+    def _load_data(self, corepath=None, use_copy_from_qry=False, use_arrow=False, parallel=False, max_workers=4,
+                   batch_size=DEFAULT_BATCH_SIZE, block_size=DEFAULT_BLOCK_SIZE, plan=False, adaptive=None, tables=None, **kwargs):
+        """
+        Load data into the created tables using the chosen load path, see ``load_data``
+        :param list tables: (optional) names of the tables loaded with ``plan`` or ``adaptive``, all tables with data by default
+        """
         from_local = False
         from_s3 = False
         if self._source == 'local':
@@ -395,18 +1399,430 @@ class LibraryImport(object):
         elif self._source == 's3':
             from_s3 = True
 
-        if use_copy_from_qry:
-            self.load_data_using_copy_from_query(corepath=corepath, from_local=from_local, from_s3=from_s3, **kwargs)
+        if not parallel:
+            max_workers = None
+
+        if plan or adaptive:
+            load_file, load_files = self._get_file_loaders(
+                use_copy_from_qry=use_copy_from_qry, use_arrow=use_arrow, corepath=corepath,
+                batch_size=batch_size, block_size=block_size, **kwargs
+            )
+            if adaptive:
+                return self._run_adaptive_load(adaptive, load_file, load_files, max_workers=max_workers, threads=kwargs.get('threads'),
+                                               tables=tables)
+            max_workers = self._get_worker_count(max_workers)
+            load_plan = self._get_load_plan(workers=max_workers or 1, tables=tables)
+            logger.info('Load plan:\n%s', load_plan.describe())
+            self._run_load_plan(load_plan, load_file, load_files, max_workers=max_workers)
+        elif use_arrow:
+            self.load_data_using_arrow(from_local=from_local, from_s3=from_s3, max_workers=max_workers, block_size=block_size, **kwargs)
+        elif use_copy_from_qry:
+            self.load_data_using_copy_from_query(corepath=corepath, from_local=from_local, from_s3=from_s3, max_workers=max_workers, **kwargs)
         else:
-            self.load_data_using_api(corepath=corepath, from_local=from_local, from_s3=from_s3, **kwargs)
-        
+            self.load_data_using_api(corepath=corepath, from_local=from_local, from_s3=from_s3, max_workers=max_workers, batch_size=batch_size, **kwargs)
         return True
 
+    def _prepare_watermarks(self, watermarks, use_arrow=False, batch_size=DEFAULT_BATCH_SIZE, block_size=DEFAULT_BLOCK_SIZE, **kwargs):
+        """
+        Read the watermark of every table with a watermark column before any data gets loaded, so every load of
+        a table filters against the same value
+        :param dict watermarks: table name -> watermark column, tables whose watermark is read later with ``_read_watermark``
+            may be left out
+        """
+        self._watermarks = {}
+        self._watermark_loader = partial(
+            self._load_file_above_watermark, use_arrow=use_arrow, batch_size=batch_size, block_size=block_size, **kwargs
+        )
+        for tblname, column in (watermarks or {}).items():
+            self._read_watermark(tblname, column)
+
+    @validate_connection
+    def _read_watermark(self, tblname, column):
+        self._watermarks[tblname] = (column, get_watermark(self._conn, tblname, column))
+        logger.info('Loading rows of %s with %s above %s', tblname, column, self._watermarks[tblname][1])
+
+    @validate_connection
+    def _record_watermarks(self):
+        """
+        Record the watermarks reached by the load in the manifest
+        """
+        if self._manifest is None:
+            return
+        for tblname, (column, _) in self._watermarks.items():
+            self._manifest.set_watermark(tblname, column, get_watermark(self._conn, tblname, column))
+
+    def _load_file_above_watermark(self, conn, tblname, path_or_obj, watermark, use_arrow=False, batch_size=DEFAULT_BATCH_SIZE,
+                                   block_size=DEFAULT_BLOCK_SIZE, **kwargs):
+        """
+        Load the rows of a data file whose watermark column is above the watermark
+        :param tuple watermark: (column, value)
+        :return int: number of loaded rows
+        """
+        column, value = watermark
+        details = conn.get_table_details(tblname)
+        loaded = 0
+        if use_arrow:
+            schema = get_arrow_schema(details)
+            for _, source in self._iter_arrow_inputs([path_or_obj]):
+                for batch in iter_arrow_batches(source, schema, block_size=block_size, **kwargs):
+                    batch = filter_arrow_batch(batch, column, value)
+                    if batch.num_rows:
+                        loaded += load_arrow_batch(conn, tblname, batch)
+            return loaded
+
+        null_str = kwargs.get('null_str', '\\N')
+        column_index = [col.name for col in details].index(column)
+        rows = iter_rows_above_watermark(self._iter_data_file_rows([path_or_obj], **kwargs), column_index, value, null_str=null_str)
+        for batch in iter_batches(rows, batch_size):
+            self._load_rows(conn, tblname, batch, null_str=null_str)
+            loaded += len(batch)
+        return loaded
+
+    def _get_throughput_history(self):
+        if self.throughput_history_path:
+            return ThroughputHistory(self.throughput_history_path)
+        params = self._connection_params or {}
+        return ThroughputHistory(get_default_throughput_path(params.get('host'), params.get('port'), params.get('dbname')))
+
+    def _get_explain_workers(self, parallel, max_workers):
+        """
+        Number of load workers ``load_data`` uses with these options
+        """
+        if not parallel:
+            return 1
+        if self._pool is None:
+            return max_workers or 1
+        return self._get_worker_count(max_workers) or 1
+
+    def _record_throughput(self, load_path, workers, seconds):
+        """
+        Record the throughput of a finished load, the bytes of the busiest worker of the planned schedule per second
+        """
+        try:
+            history = self._get_throughput_history()
+            history.record(load_path, self._get_load_plan(workers=workers).makespan, seconds)
+            history.save()
+        except (OSError, ValueError) as e:
+            logger.warning('Could not record the load throughput: %s', e)
+
+    def _sample_rows_per_byte(self, path_or_obj, sample_size=DEFAULT_SAMPLE_SIZE, **kwargs):
+        chunks, compression = self._open_data_file_chunks(path_or_obj, chunk_size=sample_size)
+        return sample_rows_per_byte(chunks, compression, sample_size=sample_size, **kwargs)
+
+    def explain(self, localpath, use_copy_from_qry=False, use_arrow=False, parallel=False, max_workers=4,
+                sample_size=DEFAULT_SAMPLE_SIZE, **kwargs):
+        """
+        Dry run of ``load_data`` with the same options, nothing is loaded and no connection is needed. Reports the
+        files, bytes and estimated rows of every table, the load path and the predicted duration, calibrated with
+        the throughput of previous loads recorded in ``throughput_history_path``
+        :param int sample_size: decompressed bytes read from a data file of each table to estimate its rows, rows are
+            not estimated if 0
+        :**kwargs: copy params, ``has_header`` and ``line_delim`` are used for the row estimate
+        :return odlt.explain.LoadExplanation
+        """
+        self._initialize_localpath(localpath)
+        plan = self._get_load_plan(workers=self._get_explain_workers(parallel, max_workers))
+        table_files = {}
+        for task in plan.tasks:
+            table_files.setdefault(task.table, []).extend(zip(task.files, task.sizes))
+        ratios = {}
+        if sample_size and table_files:
+            with ThreadPoolExecutor(max_workers=min(S3_LISTING_WORKERS, len(table_files))) as executor:
+                futures = {
+                    tblname: executor.submit(self._sample_rows_per_byte, files[0][0], sample_size=sample_size, **kwargs)
+                    for tblname, files in table_files.items()
+                }
+                ratios = {tblname: future.result() for tblname, future in futures.items()}
+        tables = []
+        for tblname in self.datalibrary['tables']:
+            if tblname not in table_files:
+                continue
+            size = sum(size for _, size in table_files[tblname])
+            ratio = ratios.get(tblname)
+            tables.append(TableEstimate(tblname, len(table_files[tblname]), size, rows=int(round(ratio * size)) if ratio is not None else None))
+        load_path = get_load_path(self.source, use_copy_from_qry=use_copy_from_qry, use_arrow=use_arrow)
+        return LoadExplanation(tables, load_path, plan, rate=self._get_throughput_history().rate(load_path))
+
+    def _get_validation_source(self, path_or_obj):
+        """
+        Picklable description of a data file, read by the validation processes
+        """
+        if self.source == 's3':
+            params = {'aws_access_key_id': self._s3_access_key, 'aws_secret_access_key': self._s3_secret_key}
+            return ('s3', self._bucket_name, path_or_obj.key, path_or_obj.size, params)
+        return ('local', path_or_obj)
+
+    def validate(self, localpath, sample_size=DEFAULT_VALIDATE_SAMPLE_SIZE, max_workers=None, max_errors=DEFAULT_MAX_ERRORS,
+                 quarantine=False, executor=None, **kwargs):
+        """
+        Pre-flight check of the data files against the schema of their table, no connection is needed. Every file is
+        parsed in a process pool with the copy params of the load, and checked for the number of fields of every row,
+        its header and whether the values can be cast to the column types.
+        :param int sample_size: decompressed bytes checked from the start of every file, None checks whole files
+        :param int max_workers: (optional) number of processes, defaults to the number of CPUs
+        :param int max_errors: errors reported per file
+        :param bool quarantine: leave files with errors out of the following loads of this library, they are recorded in ``errors``
+        :param concurrent.futures.Executor executor: (optional) used instead of a new process pool
+        :**kwargs: copy params, see ``load_data``
+        :return odlt.validate.ValidationReport
+        """
+        self._initialize_localpath(localpath)
+        tables = [(tblname, tbldetails) for tblname, tbldetails in self.datalibrary['tables'].items()
+                  if tbldetails.get('data') and tbldetails.get('schema')]
+        schemas = [content for _, content in self._prefetch([tbldetails['schema'] for _, tbldetails in tables])]
+        jobs = []
+        for (tblname, tbldetails), schema in zip(tables, schemas):
+            try:
+                columns = parse_schema(schema or '')
+            except ValueError as e:
+                logger.warning('Not validating the data files of %s: %s', tblname, e)
+                continue
+            for path_or_obj in self._list_data_files(tbldetails['data']):
+                jobs.append((tblname, self._get_relpath(path_or_obj), self._get_validation_source(path_or_obj), columns))
+        with self.metrics.span(PHASE_VALIDATE, name=self._path, files=len(jobs)) as span:
+            report = validate_files(jobs, max_workers=max_workers, executor=executor, sample_size=sample_size,
+                                    max_errors=max_errors, **kwargs)
+            span.attrs['failed'] = len(report.failed)
+        for file_report in report.failed:
+            error = ValueError('; '.join('row {}: {}'.format(issue['row'], issue['error']) for issue in file_report.errors))
+            if quarantine:
+                datapath = self.datalibrary['tables'][file_report.table]['data']
+                self._quarantined.setdefault(datapath, set()).add(file_report.name)
+                self._record_error(PHASE_VALIDATE, file_report.name, error)
+            else:
+                logger.error('Validation failed for %s: %s', file_report.name, error)
+        return report
+
+    def _get_object_name(self, path_or_obj):
+        """
+        File name without extension of a local file or s3 object
+        """
+        key = path_or_obj.key if self.source == 's3' else path_or_obj
+        return os.path.splitext(os.path.basename(key))[0]
+
+    def _get_library_object_files(self):
+        """
+        Schema, view and dashboard files of the datalibrary, tables first, then views, then dashboards
+        :return list: (kind, table name or None, path_or_obj)
+        """
+        files = [(OBJECT_TABLE, tblname, tbldetails.get('schema')) for tblname, tbldetails in self.datalibrary['tables'].items()]
+        files.extend((OBJECT_VIEW, None, viewfile) for viewfile in self.datalibrary['views'])
+        files.extend((OBJECT_DASHBOARD, None, dashfile) for dashfile in self.datalibrary['dashboards'])
+        return files
+
+    def _get_library_objects(self, files, contents):
+        """
+        Name the objects defined by the fetched library files
+        :param list files: as returned by ``_get_library_object_files``
+        :param list contents: content of every file, in the same order
+        :return list: (kind, name, path_or_obj, content)
+        """
+        objects = []
+        for (kind, tblname, path_or_obj), content in zip(files, contents):
+            if kind == OBJECT_TABLE:
+                name = tblname
+            elif kind == OBJECT_VIEW:
+                name = get_view_name(content) or self._get_object_name(path_or_obj)
+            else:
+                name = content.splitlines()[0] if content and content.strip() else self._get_object_name(path_or_obj)
+            objects.append((kind, name, path_or_obj, content))
+        return objects
+
+    def _read_library_objects(self):
+        """
+        Fetch every schema, view and dashboard file of the datalibrary concurrently and name the objects they define
+        :return list: (kind, name, path_or_obj, content) of the tables, views and dashboards, in this order
+        """
+        files = self._get_library_object_files()
+        contents = [content for _, content in self._prefetch([path_or_obj for _, _, path_or_obj in files])]
+        return self._get_library_objects(files, contents)
+
+    def _get_sync_state_path(self):
+        params = self._connection_params or {}
+        return get_default_sync_state_path(params.get('host'), params.get('port'), params.get('dbname'))
+
     @validate_connection
-    def import_all(self, localpath, corepath=None, **kwargs):
-        self.create_tables(localpath)
-        self.create_views(localpath)
-        self.import_dashboards(localpath)
-        self.load_data(localpath, corepath=corepath, **kwargs)
+    def plan_sync(self, localpath, state_path=None, replace_tables=False, replace_unknown=False, objects=None):
+        """
+        Compare the datalibrary with the server catalog, fetched once, and the content hashes recorded by previous syncs
+        :param str state_path: (optional) location of the sync state, defaults to a file under ~/.odlt/sync derived from the target database
+        :param bool replace_tables: drop and create tables whose schema changed, their data is loaded again
+        :param bool replace_unknown: replace existing objects which have no recorded content hash, by default they are assumed to match
+        :return odlt.sync.SyncPlan
+        """
+        self._initialize_localpath(localpath)
+        self._sync_state = SyncState(state_path or self._get_sync_state_path())
+        with self.metrics.span(PHASE_CATALOG):
+            catalog = ServerCatalog.fetch(self._conn)
+        if objects is None:
+            objects = self._read_library_objects()
+        return diff_objects(objects, catalog, self._sync_state, replace_tables=replace_tables, replace_unknown=replace_unknown)
+
+    def _drop_object(self, item):
+        """
+        Remove the server side version of a changed object
+        """
+        if item.kind == OBJECT_DASHBOARD:
+            for dashboard_id in item.dashboard_ids:
+                self._conn._client.delete_dashboard(session=self._conn._session, dashboard_id=dashboard_id)
+        else:
+            self._conn.cursor().execute('DROP {} IF EXISTS {}'.format('TABLE' if item.kind == OBJECT_TABLE else 'VIEW', item.name))
+
+    @validate_connection
+    def _apply_sync_item(self, item, create):
+        """
+        Create or replace a single object and record its content hash
+        :param callable create: creates the object on the current connection
+        """
+        if item.action == ACTION_REPLACE:
+            logger.info('Replacing %s %s', item.kind, item.name)
+            self._drop_object(item)
+        create()
+        self._sync_state.update(item.kind, item.name, item.digest)
+
+    def _get_sync_step(self, sync_plan, kind, name, create):
+        if sync_plan is None:
+            return create
+        item = sync_plan.get(kind, name)
+        if item.action == ACTION_SKIP:
+            return partial(logger.debug, 'Skipping %s %s: %s', kind, name, item.reason)
+        return partial(self._apply_sync_item, item, create)
+
+    def _build_import_graph(self, corepath=None, sync_plan=None, objects=None, watermarks=None, load_table=None, **kwargs):
+        """
+        Build the dependency graph of the datalibrary. Every table is created before its data gets loaded,
+        views depend on the tables and views referenced in their query and dashboards on their data sources.
+        :param odlt.sync.SyncPlan sync_plan: (optional) only create or replace the objects the plan says so, data is
+            loaded into created and replaced tables only
+        :param list objects: (optional) library objects as returned by ``_read_library_objects``
+        :param dict watermarks: (optional) table name -> watermark column, read once the table exists
+        :param callable load_table: (optional) data steps call load_table(tblname) instead of loading the table data
+        :**kwargs: load options and copy params passed to ``_load_table_data``
+        :return DAGScheduler
+        """
+        dag = DAGScheduler()
+        tables = self.datalibrary['tables']
+        if objects is None:
+            # fetch every file the graph needs concurrently, views and dashboards are parsed for their dependencies
+            objects = self._read_library_objects()
+
+        ddl_nodes = {}
+        for kind, name, path_or_obj, content in objects:
+            if kind != OBJECT_DASHBOARD:
+                ddl_nodes[name.lower()] = '{}:{}'.format(kind, name)
+
+        def get_dependencies(names, node):
+            return [ddl_nodes[name.lower()] for name in names if ddl_nodes.get(name.lower(), node) != node]
+
+        for kind, name, path_or_obj, content in objects:
+            if kind == OBJECT_TABLE:
+                node = ddl_nodes[name.lower()]
+                create = partial(self._create_table, path_or_obj, content=content)
+                dag.add_node(node, self._get_sync_step(sync_plan, kind, name, create))
+                load = sync_plan is None or sync_plan.get(kind, name).action != ACTION_SKIP
+                if tables[name]['data'] and load:
+                    if load_table is not None:
+                        step = partial(load_table, name)
+                    else:
+                        step = partial(self._import_table_data, name, tables[name]['data'], corepath=corepath,
+                                       watermark_column=(watermarks or {}).get(name), **kwargs)
+                    dag.add_node('data:{}'.format(name), step, dependencies=[node])
+            elif kind == OBJECT_VIEW:
+                node = ddl_nodes[name.lower()]
+                create = partial(self._create_view, path_or_obj, content=content)
+                dependencies = get_dependencies(get_referenced_relations(content), node)
+                dag.add_node(node, self._get_sync_step(sync_plan, kind, name, create), dependencies=dependencies)
+            else:
+                node = 'dashboard:{}'.format(self._get_object_name(path_or_obj))
+                try:
+                    sources = get_dashboard_sources(content.splitlines()[2])
+                except (IndexError, ValueError):
+                    # invalid dashboard files are reported when the node runs
+                    sources = set()
+                create = partial(self._import_dashboard, path_or_obj, content=content)
+                dag.add_node(node, self._get_sync_step(sync_plan, kind, name, create), dependencies=get_dependencies(sources, node))
+
+        return dag
+
+    @validate_connection
+    def _import_table_data(self, tblname, datapath, watermark_column=None, **kwargs):
+        """
+        Data step of ``import_all``, the watermark of the table is read once the table exists
+        """
+        if watermark_column:
+            self._read_watermark(tblname, watermark_column)
+        self._load_table_data(tblname, datapath, **kwargs)
+
+    def _check_copy_params(self, copyparams):
+        """
+        Reject keyword arguments which are neither load options nor copy params, before anything gets imported
+        """
+        unknown = sorted(key for key in copyparams if key not in self.copy_with_param_mapping and key not in ('array_begin', 'array_end'))
+        if unknown:
+            raise ValueError('Unknown load options or copy params: {}'.format(', '.join(unknown)))
+
+    @validate_connection
+    def import_all(self, localpath, corepath=None, max_workers=4, resume=False, manifest_path=None, sync=False,
+                   sync_state_path=None, replace_tables=False, use_copy_from_qry=False, use_arrow=False,
+                   batch_size=DEFAULT_BATCH_SIZE, block_size=DEFAULT_BLOCK_SIZE, plan=False, incremental=False, watermarks=None,
+                   adaptive=None, validate=None, parallel=None, **kwargs):
+        """
+        Create tables, views and dashboards and load the table data. Every step runs as soon as the objects it
+        depends on exist, independent steps run concurrently on pooled connections.
+        Failed steps are collected into ``errors`` and the steps depending on them are skipped.
+        :param int max_workers: maximum number of steps running at the same time (default `4`)
+        :param bool resume: skip data files already loaded successfully, see ``load_data``
+        :param str manifest_path: (optional) location of the load manifest, see ``load_data``
+        :param bool sync: only create the objects missing on the server and replace the ones changed since the last
+            sync, data is loaded into created and replaced tables only. See ``plan_sync``
+        :param str sync_state_path: (optional) location of the sync state, see ``plan_sync``
+        :param bool replace_tables: in sync mode, drop and create tables whose schema changed
+        :param bool plan: load the data files of all created tables as planned by ``load_planner`` once the graph ran,
+            instead of a data step per table. See ``load_data``
+        :param adaptive: (optional) True or an odlt.adaptive.AdaptiveController, like ``plan`` with adaptive concurrency
+            and threads. See ``load_data``
+        :param validate: (optional) True or 'full', check and quarantine data files before anything is created, see ``load_data``
+        :param bool parallel: ignored, steps always run concurrently up to ``max_workers``
+        ``use_copy_from_qry``, ``use_arrow``, ``batch_size``, ``block_size``, ``incremental`` and ``watermarks`` are
+        the ones of ``load_data``, watermarks are read once their table exists
+        :**kwargs: copy params, see ``load_data``. Other keyword arguments raise a ValueError before anything is imported
+        """
+        self._check_copy_params(kwargs)
+        self._initialize_localpath(localpath)
+        if validate:
+            self.validate(localpath, sample_size=None if validate == 'full' else DEFAULT_VALIDATE_SAMPLE_SIZE,
+                          max_workers=max_workers, quarantine=True, **kwargs)
+        self._open_manifest(resume=resume or incremental, manifest_path=manifest_path)
+        self._prepare_watermarks(None, use_arrow=use_arrow, batch_size=batch_size, block_size=block_size, **kwargs)
+        objects, sync_plan = None, None
+        if sync:
+            objects = self._read_library_objects()
+            sync_plan = self.plan_sync(localpath, state_path=sync_state_path, replace_tables=replace_tables, objects=objects)
+            logger.info('Sync plan:\n%s', sync_plan.describe())
+        # plans and adaptive loads schedule the data files of all tables together, once the graph created the tables
+        deferred = [] if plan or adaptive else None
+        load_options = dict(use_copy_from_qry=use_copy_from_qry, use_arrow=use_arrow, batch_size=batch_size, block_size=block_size)
+        dag = self._build_import_graph(corepath=corepath, sync_plan=sync_plan, objects=objects, watermarks=watermarks,
+                                       load_table=deferred.append if deferred is not None else None, **dict(load_options, **kwargs))
+
+        def on_error(node, error):
+            self._record_error('import_all', node, error)
 
+        try:
+            result = dag.run(max_workers=self._get_worker_count(max_workers), on_error=on_error)
+            if deferred:
+                for tblname in deferred:
+                    if tblname in (watermarks or {}):
+                        self._read_watermark(tblname, watermarks[tblname])
+                self._load_data(corepath=corepath, parallel=True, max_workers=max_workers, plan=plan, adaptive=adaptive,
+                                tables=deferred, **dict(load_options, **kwargs))
+            self._record_watermarks()
+        finally:
+            self._watermarks = {}
+            self._flush_manifest()
+            if sync_plan is not None:
+                self._sync_state.save()
+        for node in result['skipped']:
+            self._record_error('import_all', node, ValueError('Skipped because a dependency failed'))
+        self.metrics.flush()
         return True
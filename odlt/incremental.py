@@ -0,0 +1,100 @@
+"""
+
+odlt.incremental
+=================================
+
+Append only refreshes of table data. Next to the load manifest, which keeps new files apart from loaded ones,
+a table can have a watermark column: rows of new or changed files are only loaded if their value in that
+column is above the largest value already on the server.
+
+Ex:
+
+watermark = get_watermark(conn, 'flights', 'dep_time')
+rows = iter_rows_above_watermark(iter_csv_rows(chunks), column_index=3, watermark=watermark)
+"""
+import datetime
+import decimal
+
+NULL_STR = '\\N'
+
+
+def get_watermark(conn, tblname, column):
+    """
+    Largest value of the watermark column on the server
+    :return value typed as returned by pymapd, None if the table is empty
+    """
+    cursor = conn.cursor()
+    cursor.execute('SELECT MAX({column}) FROM {tblname}'.format(column=column, tblname=tblname))
+    rows = list(cursor)
+    return rows[0][0] if rows else None
+
+
+def _parse_datetime(value):
+    return datetime.datetime.fromisoformat(value.strip().replace('T', ' '))
+
+
+def _parse_date(value):
+    return datetime.date.fromisoformat(value.strip()[:10])
+
+
+def _parse_time(value):
+    return datetime.time.fromisoformat(value.strip())
+
+
+def get_value_parser(watermark):
+    """
+    Function converting csv field text into the type of the watermark, so both compare the way the server does
+    """
+    # bool is an int and datetime a date, the more specific types go first
+    if isinstance(watermark, bool):
+        return lambda value: value.strip().lower() in ('true', 't', '1')
+    if isinstance(watermark, int):
+        return lambda value: int(value)
+    if isinstance(watermark, float):
+        return lambda value: float(value)
+    if isinstance(watermark, decimal.Decimal):
+        return lambda value: decimal.Decimal(value)
+    if isinstance(watermark, datetime.datetime):
+        return _parse_datetime
+    if isinstance(watermark, datetime.date):
+        return _parse_date
+    if isinstance(watermark, datetime.time):
+        return _parse_time
+    return str
+
+
+def iter_rows_above_watermark(rows, column_index, watermark, null_str=NULL_STR):
+    """
+    Rows whose watermark column is above ``watermark``. Rows with a NULL or unparsable value are dropped,
+    as they would not match ``column > watermark`` on the server either.
+    :param iterable rows: csv rows as lists of field strings
+    :param int column_index: position of the watermark column
+    """
+    if watermark is None:
+        yield from rows
+        return
+    parse = get_value_parser(watermark)
+    for row in rows:
+        value = row[column_index] if column_index < len(row) else None
+        if value is None or value == null_str or value == '':
+            continue
+        try:
+            if parse(value) > watermark:
+                yield row
+        except ValueError:
+            continue
+
+
+def filter_arrow_batch(batch, column, watermark):
+    """
+    Rows of a record batch whose watermark column is above ``watermark``
+    :param pyarrow.RecordBatch batch: parsed record batch
+    :param str column: watermark column name
+    """
+    if watermark is None:
+        return batch
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    values = batch.column(batch.schema.get_field_index(column))
+    mask = pc.fill_null(pc.greater(values, pa.scalar(watermark, type=values.type)), False)
+    return batch.filter(mask)
@@ -0,0 +1,102 @@
+"""
+
+odlt.index
+=================================
+
+Precomputed index of a data library. The index lives at the library root and lists the tables with their
+schema and data files (size and checksum), the views and the dashboards, so an import can start without
+scanning the library folder or listing the bucket.
+
+Ex:
+
+{
+    "version": 1,
+    "tables": {
+        "flights": {
+            "schema": "tables/flights/schema.sql",
+            "data": [{"path": "tables/flights/data/part-1.csv.gz", "size": 1048576, "md5": "9e107d9d372bb6826bd81d3542a419d6"}]
+        }
+    },
+    "views": ["views/late.sql"],
+    "dashboards": ["dashboards/delays.json"]
+}
+"""
+import os
+import glob
+import json
+import hashlib
+from odlt.utils import atomic_write
+
+INDEX_FILENAME = 'odlt-index.json'
+INDEX_VERSION = 1
+
+
+def compute_md5(filepath, chunk_size=1024 * 1024):
+    """
+    md5 hex digest of a local file, the same value S3 reports as ETag for objects uploaded in a single part
+    """
+    digest = hashlib.md5()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_local_index(libpath, checksums=True):
+    """
+    Scan a local data library into an index
+    :param str libpath: library root
+    :param bool checksums: compute the md5 of every data file
+    :return dict
+    """
+    def relpath(path):
+        return os.path.relpath(path, libpath).replace(os.sep, '/')
+
+    index = {'version': INDEX_VERSION, 'tables': {}, 'views': [], 'dashboards': []}
+    for schema_path in sorted(glob.glob(os.path.join(libpath, 'tables', '*', 'schema.sql'))):
+        tblname = os.path.basename(os.path.dirname(schema_path))
+        data_files = []
+        for data_path in sorted(glob.glob(os.path.join(os.path.dirname(schema_path), 'data', '*'))):
+            if not os.path.isfile(data_path):
+                continue
+            entry = {'path': relpath(data_path), 'size': os.path.getsize(data_path)}
+            if checksums:
+                entry['md5'] = compute_md5(data_path)
+            data_files.append(entry)
+        index['tables'][tblname] = {'schema': relpath(schema_path), 'data': data_files}
+    index['views'] = [relpath(path) for path in sorted(glob.glob(os.path.join(libpath, 'views', '*.sql')))]
+    index['dashboards'] = [relpath(path) for path in sorted(glob.glob(os.path.join(libpath, 'dashboards', '*.json')))]
+    return index
+
+
+def parse_index(content):
+    """
+    Parse and validate index file content
+    :param str content: index JSON
+    :return dict
+    """
+    index = json.loads(content)
+    if not isinstance(index, dict) or index.get('version') != INDEX_VERSION:
+        raise ValueError('Unsupported library index version {}'.format(index.get('version') if isinstance(index, dict) else None))
+    for key in ('tables', 'views', 'dashboards'):
+        index.setdefault(key, {} if key == 'tables' else [])
+    for tblname, tbldetails in index['tables'].items():
+        if 'schema' not in tbldetails:
+            raise ValueError('Library index entry of table {} has no schema'.format(tblname))
+        tbldetails.setdefault('data', [])
+    return index
+
+
+def dump_index(index):
+    return json.dumps(index, indent=2, sort_keys=True)
+
+
+def write_local_index(libpath, index):
+    """
+    Atomically write the index to the root of a local library
+    :return str: index file path
+    """
+    path = os.path.join(libpath, INDEX_FILENAME)
+    with atomic_write(path) as f:
+        f.write(dump_index(index))
+    return path
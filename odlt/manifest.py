@@ -0,0 +1,142 @@
+"""
+
+odlt.manifest
+=================================
+
+Durable record of the data files loaded into each table and of their watermarks, used to resume interrupted
+loads and for incremental refreshes. Loaded and failed files are written to disk right away, the markers of
+files being loaded are buffered and written in batches, a load flushes the manifest when it is done.
+
+Ex:
+
+manifest = LoadManifest('/home/myuser/.odlt/manifests/flights.json')
+if not manifest.is_loaded('flights', 'tables/flights/data/part-1.csv.gz', size=1024, mtime=1546300800.0):
+    ...
+    manifest.update('flights', 'tables/flights/data/part-1.csv.gz', status='loaded', rows=100, size=1024, mtime=1546300800.0)
+manifest.flush()
+"""
+import time
+from odlt.store import JSONStore, get_default_store_path
+
+STATUS_LOADING = 'loading'
+STATUS_LOADED = 'loaded'
+STATUS_FAILED = 'failed'
+
+# attributes identifying a version of a data file, compared before a file is skipped
+FILE_SIGNATURE = ('size', 'mtime', 'etag')
+# loading markers buffered before the manifest is written, and seconds a marker is buffered at most
+DEFAULT_FLUSH_EVERY = 100
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+
+def get_default_manifest_path(*identifiers):
+    """
+    Manifest location in the user's home directory derived from the library path and target database
+    """
+    return get_default_store_path('manifests', *identifiers)
+
+
+class LoadManifest(JSONStore):
+    """
+    Per table, per data file record of size, mtime or S3 ETag, row count and load status
+    """
+    def __init__(self, path, flush_every=DEFAULT_FLUSH_EVERY, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        """
+        :param int flush_every: loading markers buffered before the manifest is written to disk
+        :param float flush_interval: seconds after the last write the next loading marker writes the manifest
+        """
+        JSONStore.__init__(self, path)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._pending = 0
+        self._saved_at = time.monotonic()
+
+    def save(self):
+        with self._lock:
+            JSONStore.save(self)
+            self._pending = 0
+            self._saved_at = time.monotonic()
+
+    def flush(self):
+        """
+        Write buffered file updates to disk
+        """
+        with self._lock:
+            if self._pending:
+                self.save()
+
+    def tables(self):
+        with self._lock:
+            return dict(self._data.get('tables', {}))
+
+    def files(self, tblname):
+        """
+        :return dict: data file key -> entry
+        """
+        with self._lock:
+            return dict(self._data.get('tables', {}).get(tblname, {}))
+
+    def get(self, tblname, key):
+        with self._lock:
+            entry = self._data.get('tables', {}).get(tblname, {}).get(key)
+            return dict(entry) if entry else None
+
+    def is_loaded(self, tblname, key, **signature):
+        """
+        True if the file was loaded successfully and has not changed since
+        :**signature: current size, mtime and/or etag of the file
+        """
+        entry = self.get(tblname, key)
+        if not entry or entry.get('status') != STATUS_LOADED:
+            return False
+        return all(entry.get(attr) == signature[attr] for attr in FILE_SIGNATURE if attr in signature)
+
+    def update(self, tblname, key, status, rows=None, **signature):
+        """
+        Record the load status of a data file. Loaded and failed files are written to disk right away, so a
+        killed load never forgets a file already committed to the server. Loading markers only tell a resume
+        what to load again, which a missing entry does as well, they are written every ``flush_every``
+        updates or ``flush_interval`` seconds, see ``flush``
+        """
+        with self._lock:
+            entry = {attr: val for attr, val in signature.items() if attr in FILE_SIGNATURE}
+            entry.update({'status': status, 'rows': rows, 'updated': time.time()})
+            self._data.setdefault('tables', {}).setdefault(tblname, {})[key] = entry
+            self._pending += 1
+            if status != STATUS_LOADING or self._pending >= self.flush_every or \
+                    time.monotonic() - self._saved_at >= self.flush_interval:
+                self.save()
+
+    def watermark(self, tblname):
+        """
+        Watermark column and largest value recorded after the last load of a table
+        :return dict or None
+        """
+        with self._lock:
+            entry = self._data.get('watermarks', {}).get(tblname)
+            return dict(entry) if entry else None
+
+    def set_watermark(self, tblname, column, value):
+        """
+        Record the largest value of the watermark column on the server and flush the manifest to disk
+        """
+        with self._lock:
+            self._data.setdefault('watermarks', {})[tblname] = {
+                'column': column,
+                'value': None if value is None else str(value),
+                'updated': time.time(),
+            }
+            self.save()
+
+    def reset(self, tblname=None):
+        """
+        Forget the recorded files of one table, or of all tables
+        """
+        with self._lock:
+            if tblname is None:
+                self._data['tables'] = {}
+                self._data['watermarks'] = {}
+            else:
+                self._data.get('tables', {}).pop(tblname, None)
+                self._data.get('watermarks', {}).pop(tblname, None)
+            self.save()
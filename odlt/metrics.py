@@ -0,0 +1,270 @@
+"""
+
+odlt.metrics
+=================================
+
+Instrumentation of the import phases. Every discovery, content fetch, DDL statement, dashboard upload and
+data file load is recorded as a span with its duration, bytes, rows, retries and queue wait time. Finished
+spans are handed to the sinks as event dicts, a sink is any callable taking the event.
+
+Ex:
+
+metrics = Metrics(sinks=[JSONLinesSink('/tmp/odlt-events.jsonl'), PrometheusTextfileSink('/var/lib/node_exporter/odlt.prom')])
+imp = LibraryImport(metrics=metrics)
+...
+with metrics.span('load_file', table='flights', name='tables/flights/data/part-1.csv.gz', size=1024) as span:
+    span.rows = load(...)
+"""
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from odlt.utils import atomic_write
+
+logger = logging.getLogger('odlt')
+
+PHASE_DISCOVERY = 'discovery'
+PHASE_CATALOG = 'fetch_catalog'
+PHASE_LIST = 'list_data_files'
+PHASE_FETCH = 'fetch'
+PHASE_CREATE_TABLE = 'create_table'
+PHASE_CREATE_VIEW = 'create_view'
+PHASE_IMPORT_DASHBOARD = 'import_dashboard'
+PHASE_LOAD_FILE = 'load_file'
+PHASE_LOAD_FILES = 'load_files'
+PHASE_LOAD_TASK = 'load_task'
+PHASE_LOAD_TABLE = 'load_table'
+PHASE_LOAD_RANGE = 'load_range'
+PHASE_VALIDATE = 'validate'
+PHASE_EXPORT_SCHEMA = 'export_schema'
+PHASE_EXPORT_VIEW = 'export_view'
+PHASE_EXPORT_DASHBOARD = 'export_dashboard'
+PHASE_EXPORT_PART = 'export_part'
+PHASE_EXPORT_TABLE = 'export_table'
+
+# totals kept per phase, and per phase and table by the prometheus sink
+TOTALS = ('events', 'errors', 'seconds', 'bytes', 'rows', 'retries', 'queue_wait')
+
+
+class Span(object):
+    """
+    A single timed operation. ``rows`` and ``retries`` are filled in by the instrumented code while the span is open.
+    """
+    def __init__(self, phase, name=None, table=None, size=0, rows=None, queue_wait=0.0, **attrs):
+        self.phase = phase
+        self.name = name
+        self.table = table
+        self.size = size
+        self.rows = rows
+        self.retries = 0
+        self.queue_wait = queue_wait
+        self.attrs = attrs
+        self.error = None
+        self.started = time.time()
+        self.duration = None
+
+    def to_dict(self):
+        event = {
+            'phase': self.phase,
+            'name': self.name,
+            'table': self.table,
+            'started': self.started,
+            'duration': self.duration,
+            'bytes': self.size,
+            'rows': self.rows,
+            'retries': self.retries,
+            'queue_wait': self.queue_wait,
+            'error': self.error,
+            'thread': threading.current_thread().name,
+        }
+        event.update(self.attrs)
+        return event
+
+
+def _add_to_totals(totals, event):
+    totals['events'] += 1
+    totals['errors'] += 1 if event['error'] else 0
+    totals['seconds'] += event['duration'] or 0.0
+    totals['bytes'] += event['bytes'] or 0
+    totals['rows'] += event['rows'] or 0
+    totals['retries'] += event['retries'] or 0
+    totals['queue_wait'] += event['queue_wait'] or 0.0
+
+
+class Metrics(object):
+    """
+    Records spans, keeps per phase totals and forwards every finished span to the sinks.
+    A failing sink is logged and never breaks the import.
+    """
+    def __init__(self, sinks=None):
+        """
+        :param list sinks: (optional) callables called with the event dict of every finished span
+        """
+        self._sinks = list(sinks or [])
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    @property
+    def sinks(self):
+        return list(self._sinks)
+
+    def add_sink(self, sink):
+        with self._lock:
+            self._sinks.append(sink)
+
+    def remove_sink(self, sink):
+        with self._lock:
+            self._sinks.remove(sink)
+
+    @contextmanager
+    def span(self, phase, name=None, table=None, size=0, rows=None, queued_at=None, **attrs):
+        """
+        Time the enclosed block. Exceptions are recorded on the span and raised again.
+        :param str phase: import phase, one of the PHASE_* names
+        :param str name: (optional) file, object or table the span is about
+        :param int size: bytes read or sent
+        :param float queued_at: (optional) time.perf_counter() of the moment the work was queued, the time until the
+            span opens is recorded as queue wait
+        """
+        queue_wait = time.perf_counter() - queued_at if queued_at is not None else 0.0
+        span = Span(phase, name=name, table=table, size=size, rows=rows, queue_wait=queue_wait, **attrs)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = '{}: {}'.format(type(e).__name__, e)
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            self.emit(span)
+
+    def emit(self, span):
+        event = span.to_dict()
+        with self._lock:
+            totals = self._totals.setdefault(event['phase'], dict.fromkeys(TOTALS, 0))
+            _add_to_totals(totals, event)
+            sinks = list(self._sinks)
+        for sink in sinks:
+            try:
+                sink(event)
+            except Exception as e:
+                logger.warning('Metrics sink %r failed: %s', sink, e)
+
+    def summary(self):
+        """
+        Totals per phase: events, errors, seconds, bytes, rows, retries and queue_wait
+        :return dict
+        """
+        with self._lock:
+            return {phase: dict(totals) for phase, totals in self._totals.items()}
+
+    def reset(self):
+        with self._lock:
+            self._totals = {}
+
+    def flush(self):
+        for sink in self.sinks:
+            if hasattr(sink, 'flush'):
+                try:
+                    sink.flush()
+                except Exception as e:
+                    logger.warning('Metrics sink %r failed to flush: %s', sink, e)
+
+    def close(self):
+        self.flush()
+        for sink in self.sinks:
+            if hasattr(sink, 'close'):
+                sink.close()
+
+
+class JSONLinesSink(object):
+    """
+    Appends every event as a JSON line to a file
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def __call__(self, event):
+        line = json.dumps(event, sort_keys=True, default=str) + '\n'
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, 'a')
+            self._file.write(line)
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class PrometheusTextfileSink(object):
+    """
+    Keeps counters per phase and table and writes them in the Prometheus text format, for the node exporter
+    textfile collector. The file is rewritten atomically on flush, and while events come in at most every
+    ``interval`` seconds.
+    """
+    METRICS = (
+        ('events', 'events_total', 'Number of recorded operations'),
+        ('errors', 'errors_total', 'Number of failed operations'),
+        ('seconds', 'duration_seconds_total', 'Wall clock seconds spent in operations'),
+        ('bytes', 'bytes_total', 'Bytes read or sent'),
+        ('rows', 'rows_total', 'Rows loaded'),
+        ('retries', 'retries_total', 'Retried operations'),
+        ('queue_wait', 'queue_wait_seconds_total', 'Seconds operations waited for a worker or connection'),
+    )
+
+    def __init__(self, path, prefix='odlt', interval=5.0):
+        """
+        :param str path: textfile path, should end with .prom
+        :param str prefix: metric name prefix
+        :param float interval: minimum seconds between two writes while events come in
+        """
+        self.path = path
+        self.prefix = prefix
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._totals = {}
+        self._written = 0.0
+
+    def __call__(self, event):
+        with self._lock:
+            key = (event['phase'], event.get('table') or '')
+            _add_to_totals(self._totals.setdefault(key, dict.fromkeys(TOTALS, 0)), event)
+            due = time.time() - self._written >= self.interval
+        if due:
+            self.flush()
+
+    def render(self):
+        with self._lock:
+            totals = {key: dict(values) for key, values in self._totals.items()}
+        lines = []
+        for total, suffix, description in self.METRICS:
+            name = '{}_{}'.format(self.prefix, suffix)
+            lines.append('# HELP {} {}'.format(name, description))
+            lines.append('# TYPE {} counter'.format(name))
+            for (phase, table), values in sorted(totals.items()):
+                lines.append('{}{{phase="{}",table="{}"}} {}'.format(name, _escape_label(phase), _escape_label(table), values[total]))
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        content = self.render()
+        with atomic_write(self.path) as f:
+            f.write(content)
+        with self._lock:
+            self._written = time.time()
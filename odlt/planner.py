@@ -0,0 +1,159 @@
+"""
+
+odlt.planner
+=================================
+
+Size aware load planning. Small data files of a table are coalesced into a single load task, tasks are
+ordered longest first and assigned to the least loaded worker, which keeps stragglers short.
+
+Ex:
+
+planner = LoadPlanner(small_file_size=64 * 1024 * 1024)
+plan = planner.plan({'flights': [('/lib/tables/flights/data/part-1.csv', 1024), ...]}, workers=4)
+print(plan.describe())
+"""
+import heapq
+
+DEFAULT_SMALL_FILE_SIZE = 64 * 1024 * 1024
+DEFAULT_MAX_GROUP_SIZE = 256 * 1024 * 1024
+DEFAULT_MAX_GROUP_FILES = 256
+
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if abs(size) < 1024 or unit == 'TB':
+            return '{:.1f}{}'.format(size, unit) if unit != 'B' else '{}B'.format(size)
+        size /= 1024.0
+
+
+class LoadTask(object):
+    """
+    Data files of one table loaded together
+    """
+    def __init__(self, table, files, sizes, complete=False):
+        """
+        :param str table: table name
+        :param list files: local file paths or s3 objects
+        :param list sizes: size in bytes of each file
+        :param bool complete: True if the task covers every data file of the table
+        """
+        self.table = table
+        self.files = list(files)
+        self.sizes = list(sizes)
+        self.complete = complete
+        self.worker = None
+
+    @property
+    def size(self):
+        return sum(self.sizes)
+
+    @property
+    def coalesced(self):
+        return len(self.files) > 1
+
+    def __repr__(self):
+        return 'LoadTask(table={!r}, files={}, size={})'.format(self.table, len(self.files), self.size)
+
+
+class LoadPlan(object):
+    """
+    Load tasks in execution order, longest first, with the worker each task is expected to run on
+    """
+    def __init__(self, tasks, workers):
+        self.tasks = tasks
+        self.workers = workers
+
+    @property
+    def total_size(self):
+        return sum(task.size for task in self.tasks)
+
+    @property
+    def worker_sizes(self):
+        """
+        Bytes assigned to each worker
+        """
+        sizes = [0] * self.workers
+        for task in self.tasks:
+            sizes[task.worker] += task.size
+        return sizes
+
+    @property
+    def makespan(self):
+        """
+        Bytes loaded by the busiest worker, the predicted wall clock time is proportional to it
+        """
+        return max(self.worker_sizes) if self.tasks else 0
+
+    def to_dict(self):
+        return {
+            'workers': self.workers,
+            'total_size': self.total_size,
+            'makespan': self.makespan,
+            'tasks': [
+                {'table': task.table, 'files': len(task.files), 'size': task.size, 'worker': task.worker, 'complete': task.complete}
+                for task in self.tasks
+            ],
+        }
+
+    def describe(self):
+        """
+        Human readable schedule
+        """
+        lines = ['{} load tasks, {} total, {} workers, busiest worker {}'.format(
+            len(self.tasks), format_size(self.total_size), self.workers, format_size(self.makespan))]
+        for task in self.tasks:
+            lines.append('  worker {:>2}  {:<30} {:>5} file(s) {:>10}'.format(
+                task.worker, task.table, len(task.files), format_size(task.size)))
+        return '\n'.join(lines)
+
+
+class LoadPlanner(object):
+    """
+    Builds a load plan from the data files of each table and their sizes
+    """
+    def __init__(self, small_file_size=DEFAULT_SMALL_FILE_SIZE, max_group_size=DEFAULT_MAX_GROUP_SIZE,
+                 max_group_files=DEFAULT_MAX_GROUP_FILES):
+        """
+        :param int small_file_size: files smaller than this are coalesced with other small files of the same table
+        :param int max_group_size: maximum bytes of a coalesced task
+        :param int max_group_files: maximum number of files of a coalesced task
+        """
+        self.small_file_size = small_file_size
+        self.max_group_size = max_group_size
+        self.max_group_files = max_group_files
+
+    def _get_table_tasks(self, table, files):
+        tasks, group = [], []
+        for path_or_obj, size in files:
+            if size >= self.small_file_size:
+                tasks.append(LoadTask(table, [path_or_obj], [size]))
+                continue
+            if group and (len(group) >= self.max_group_files or sum(s for _, s in group) + size > self.max_group_size):
+                tasks.append(LoadTask(table, *zip(*group)))
+                group = []
+            group.append((path_or_obj, size))
+        if group:
+            tasks.append(LoadTask(table, *zip(*group)))
+        if len(tasks) == 1:
+            tasks[0].complete = True
+        return tasks
+
+    def plan(self, table_files, workers=1):
+        """
+        :param dict table_files: table name -> list of (path_or_obj, size)
+        :param int workers: number of workers loading at the same time
+        :return LoadPlan
+        """
+        workers = max(workers or 1, 1)
+        tasks = []
+        for table, files in table_files.items():
+            if files:
+                tasks.extend(self._get_table_tasks(table, files))
+        # longest processing time first, each task goes to the worker with the least bytes assigned
+        tasks.sort(key=lambda task: task.size, reverse=True)
+        loads = [(0, worker) for worker in range(workers)]
+        for task in tasks:
+            load, worker = heapq.heappop(loads)
+            task.worker = worker
+            heapq.heappush(loads, (load + task.size, worker))
+        return LoadPlan(tasks, workers)
@@ -0,0 +1,294 @@
+"""
+
+odlt.pool
+=================================
+
+Connection pool used by the importer and exporter to share OmniSci Core sessions between phases and workers,
+and the connection handling both of them inherit from ``PooledConnectionMixin``.
+
+Ex:
+
+pool = ConnectionPool(lambda: pymapd.connect(user='mapd', password='HyperInteractive', dbname='mapd'), min_size=1, max_size=8)
+with pool.connection() as conn:
+    conn.cursor().execute('SELECT 1')
+"""
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger('odlt')
+
+
+class ConnectionPool(object):
+    """
+    Thread safe pool of pymapd connections with borrow / return semantics.
+
+    Connections idle for longer than ``health_check_interval`` seconds, or returned after an error, are checked
+    with a cheap server status call before being handed out again. A connection whose session expired gets
+    re-authenticated, a connection whose transport is gone gets replaced by a new one.
+    """
+    def __init__(self, connect, min_size=1, max_size=8, health_check_interval=30, acquire_timeout=None):
+        """
+        :param callable connect: function returning a new pymapd.connection.Connection
+        :param int min_size: number of connections opened up front
+        :param int max_size: maximum number of connections open at the same time
+        :param float health_check_interval: seconds a connection may sit idle before being checked again
+        :param float acquire_timeout: (optional) default seconds to wait for a free connection, waits forever if not passed
+        """
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError('Invalid pool size, expected 0 <= min_size <= max_size and max_size >= 1')
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    @property
+    def size(self):
+        """
+        Number of open connections, idle and borrowed
+        """
+        return self._size
+
+    @property
+    def idle(self):
+        """
+        Number of connections ready to be borrowed
+        """
+        return len(self._idle)
+
+    def acquire(self, timeout=None):
+        """
+        Borrow a connection from the pool, opening a new one if none is idle and the pool is not full
+        :param float timeout: (optional) seconds to wait for a connection to be returned
+        :return pymapd.connection.Connection
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise ValueError('Connection pool is closed')
+                if self._idle:
+                    conn, checked_at = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    conn, checked_at = None, None
+                    self._size += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError('Timed out waiting for a free OmniSci connection')
+                self._cond.wait(remaining)
+
+        if conn is None:
+            return self._open_reserved()
+        if time.monotonic() - checked_at >= self.health_check_interval:
+            conn = self._ensure_healthy(conn)
+        return conn
+
+    def release(self, conn, healthy=True):
+        """
+        Return a borrowed connection to the pool
+        :param pymapd.connection.Connection conn: connection returned by acquire
+        :param bool healthy: False if the connection raised an error, it then gets checked before being reused
+        """
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic() if healthy else float('-inf')))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """
+        Borrow a connection for the duration of a with block
+        """
+        conn = self.acquire(timeout=timeout)
+        healthy = False
+        try:
+            yield conn
+            healthy = True
+        finally:
+            self.release(conn, healthy=healthy)
+
+    def close(self):
+        """
+        Close all idle connections, borrowed connections get closed when returned
+        """
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                self._close_quietly(conn)
+            self._cond.notify_all()
+
+    def _open_reserved(self):
+        """
+        Open a connection for a slot already counted in the pool size
+        """
+        try:
+            return self._connect()
+        except Exception:
+            self._discard_slot()
+            raise
+
+    def _discard_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _ensure_healthy(self, conn):
+        """
+        Check the connection, re-authenticate an expired session or replace a dead connection
+        """
+        if self._is_healthy(conn):
+            return conn
+        try:
+            self._reauthenticate(conn)
+            if self._is_healthy(conn):
+                logger.info('Re-authenticated expired OmniSci session')
+                return conn
+        except Exception as e:
+            logger.debug('Re-authentication failed: %s', e)
+        logger.info('Replacing broken OmniSci connection')
+        self._close_quietly(conn)
+        return self._open_reserved()
+
+    @staticmethod
+    def _is_healthy(conn):
+        try:
+            conn._client.get_server_status(conn._session)
+        except Exception:
+            return False
+        return True
+
+    @staticmethod
+    def _reauthenticate(conn):
+        conn._session = conn._client.connect(conn._user, conn._password, conn._dbname)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception as e:
+            logger.debug('Error closing OmniSci connection: %s', e)
+
+
+class PooledConnectionMixin(object):
+    """
+    Connection handling shared by ``LibraryImport`` and ``LibraryExport``: the connection pool opened by ``connect``,
+    the connection leased by the current thread and the errors collected per object.
+
+    public attributes:
+      - pool   : ConnectionPool : pool opened by ``connect``, None until then
+      - errors : list           : errors of single objects which failed
+    """
+    def __init__(self, conn=None):
+        """
+        :param pymapd.connection.Connection object conn: (optional) core instance connection, used until ``connect`` is called
+        """
+        self._leases = threading.local()
+        self._conn = conn
+        self._pool = None
+        self._connection_params = None
+        self._errors = []
+
+    @property
+    def _conn(self):
+        """
+        Connection leased by the current thread from the pool, or the connection passed on initialization
+        """
+        leased = getattr(self._leases, 'conn', None)
+        return leased if leased is not None else self._default_conn
+
+    @_conn.setter
+    def _conn(self, conn):
+        self._default_conn = conn
+
+    @property
+    def pool(self):
+        return self._pool
+    @property
+    def errors(self):
+        return self._errors
+
+    def connect(self, omnisciuser='mapd', omniscipass='HyperInteractive', dbname='mapd', port=9090, protocol='http', host='localhost',
+                pool_min_size=1, pool_max_size=8, pool_health_check_interval=30):
+        """
+        Connect to the OmniSci Core instance. 
+        Connections are kept in a pool, every phase borrows a connection and returns it when done.
+        :param int pool_min_size: number of connections opened right away (default `1`)
+        :param int pool_max_size: maximum number of connections open at the same time (default `8`)
+        :param float pool_health_check_interval: seconds a pooled connection may sit idle before it gets checked again (default `30`)
+        """
+        self._connection_params = {
+            'user': omnisciuser,
+            'password': omniscipass,
+            'host': host,
+            'dbname': dbname,
+            'port': port,
+            'protocol': protocol,
+        }
+        if self._pool is not None:
+            self._pool.close()
+        self._pool = ConnectionPool(
+            self._new_connection,
+            min_size=pool_min_size,
+            max_size=pool_max_size,
+            health_check_interval=pool_health_check_interval,
+        )
+        self._conn = None
+        return True
+
+    def close(self):
+        """
+        Close all pooled connections
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        self.metrics.flush()
+        return True
+
+    def _new_connection(self):
+        """
+        Open a new pymapd connection using the parameters passed to the connect method
+        """
+        if not self._connection_params:
+            raise ValueError('No OmniSci connection parameters available, please use the connect method to open additional connections')
+        import pymapd
+        return pymapd.connect(**self._connection_params)
+
+    def _record_error(self, phase, name, error):
+        """
+        Collect an error raised while processing a single object so the remaining objects can proceed
+        :param str phase: phase the error was raised in
+        :param str name: name of the table, view or dashboard
+        :param Exception error: raised exception
+        """
+        logger.error('%s failed for %s: %s', phase, name, error)
+        self._errors.append({'phase': phase, 'name': name, 'error': error})
+
+    def _get_worker_count(self, max_workers):
+        """
+        Number of workers which can run next to the calling thread, each borrowing its own pooled connection
+        :return int or None if the work has to run in the calling thread on its connection
+        """
+        if self._pool is None or not max_workers:
+            return None
+        # the calling thread keeps its own lease while the workers run
+        max_workers = min(max_workers, self._pool.max_size - 1)
+        return max_workers if max_workers > 0 else None
@@ -0,0 +1,55 @@
+"""
+
+odlt.prefetch
+=================================
+
+Read ahead of the consumer, so server calls never wait on object storage.
+
+Ex:
+
+for schemafile, content in PrefetchReader(imp._get_file_or_obj_content, schemafiles, window=8):
+    cursor.execute(content)
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PREFETCH_WINDOW = 8
+
+
+class PrefetchReader(object):
+    """
+    Iterates over ``(item, content)`` pairs in the order of ``items`` while up to ``window`` fetches run
+    concurrently ahead of the consumer. A failed fetch raises when its item is reached.
+    """
+    def __init__(self, fetch, items, window=DEFAULT_PREFETCH_WINDOW):
+        """
+        :param callable fetch: called as fetch(item), returns the content of the item
+        :param iterable items: local file paths or s3 objects
+        :param int window: maximum number of fetches in flight
+        """
+        if window < 1:
+            raise ValueError('Prefetch window must be at least 1')
+        self._fetch = fetch
+        self._items = items
+        self.window = window
+
+    def __iter__(self):
+        items = iter(self._items)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.window) as executor:
+            def submit_next():
+                for item in items:
+                    pending.append((item, executor.submit(self._fetch, item)))
+                    return
+
+            for _ in range(self.window):
+                submit_next()
+            try:
+                while pending:
+                    item, future = pending.popleft()
+                    content = future.result()
+                    submit_next()
+                    yield item, content
+            finally:
+                for _, future in pending:
+                    future.cancel()
@@ -0,0 +1,92 @@
+"""
+
+odlt.ranges
+=================================
+
+Splitting of large uncompressed data files into record aligned byte ranges, so a single huge file can be parsed and
+loaded by several workers. Range boundaries are placed right after the first line delimiter following every
+``range_size`` bytes, found with small reads around the boundary, the file is never scanned as a whole. Compressed
+files can't be read from an arbitrary offset and are not split.
+
+A quoted value containing a line delimiter would be cut at a range boundary, so files which may contain quoted
+values are not split unless the caller knows their quoted values never span lines.
+
+Ex:
+
+read_at = partial(read_local_range, '/data/flights/part-1.csv')
+for start, end in get_record_ranges(read_at, os.path.getsize('/data/flights/part-1.csv'), 128 * 1024 * 1024):
+    rows = iter_csv_rows(iter_range_chunks(read_at, start, end), has_header=start == 0)
+"""
+from odlt.streaming import DEFAULT_CHUNK_SIZE, get_compression
+
+DEFAULT_SPLIT_SIZE = 256 * 1024 * 1024
+# bytes read at a time while looking for the record boundary after a split point
+BOUNDARY_WINDOW = 64 * 1024
+# seconds waited before a failed range is retried, multiplied by the attempt
+RETRY_BACKOFF = 0.5
+
+
+def is_splittable(name, size, split_size, quoted=False):
+    """
+    Whether a data file is large enough to be split and can be read from any offset
+    :param int split_size: files above this size are split, None disables splitting
+    :param bool quoted: the file may contain quoted values spanning lines, it is not split
+    """
+    return bool(split_size) and size > split_size and not quoted and get_compression(name) is None
+
+
+def read_local_range(path, offset, length):
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return f.read(length)
+
+
+def read_s3_range(obj, offset, length):
+    if length <= 0:
+        return b''
+    body = obj.get(Range='bytes={}-{}'.format(offset, offset + length - 1))['Body']
+    try:
+        return body.read()
+    finally:
+        body.close()
+
+
+def get_record_ranges(read_at, size, range_size, line_delim='\n', window=BOUNDARY_WINDOW):
+    """
+    Byte ranges of roughly ``range_size`` bytes, each starting at the beginning of a record
+    :param callable read_at: called as read_at(offset, length), returns the bytes of the file at offset
+    :param int size: file size
+    :return list of (start, end) tuples, end exclusive
+    """
+    delim = line_delim.encode()
+    ranges = []
+    start = 0
+    while start < size:
+        offset = start + range_size - len(delim)
+        end = size
+        # the record boundary is right after the first delimiter ending at or after the split point
+        while offset < size:
+            data = read_at(offset, window)
+            if not data:
+                break
+            index = data.find(delim)
+            if index >= 0:
+                end = offset + index + len(delim)
+                break
+            offset += len(data) - len(delim) + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def iter_range_chunks(read_at, start, end, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Read a byte range in chunks of at most ``chunk_size`` bytes
+    """
+    offset = start
+    while offset < end:
+        chunk = read_at(offset, min(chunk_size, end - offset))
+        if not chunk:
+            break
+        offset += len(chunk)
+        yield chunk
@@ -0,0 +1,145 @@
+"""
+
+odlt.scheduler
+=================================
+
+Dependency aware scheduler used by ``LibraryImport.import_all``.
+
+Ex:
+
+dag = DAGScheduler()
+dag.add_node('table:flights', create_flights)
+dag.add_node('data:flights', load_flights, dependencies=['table:flights'])
+dag.add_node('view:late_flights', create_late_flights, dependencies=['table:flights'])
+result = dag.run(max_workers=4)
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger('odlt')
+
+
+class DAGScheduler(object):
+    """
+    Runs every node as soon as all of its dependencies completed, independent nodes run concurrently.
+    When a node fails all nodes depending on it, directly or transitively, are skipped.
+    """
+    def __init__(self):
+        self._nodes = {}
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, name):
+        return name in self._nodes
+
+    def add_node(self, name, func, dependencies=()):
+        """
+        :param str name: unique node name
+        :param callable func: function called without arguments when the node runs
+        :param list dependencies: names of nodes which have to complete first
+        """
+        if name in self._nodes:
+            raise ValueError('Node {} already added'.format(name))
+        self._nodes[name] = {'func': func, 'dependencies': set(dependencies)}
+
+    def dependencies(self, name):
+        return set(self._nodes[name]['dependencies'])
+
+    def func(self, name):
+        return self._nodes[name]['func']
+
+    def order(self):
+        """
+        Topological order of the nodes
+        :return list
+        """
+        indegree, dependents = self._build_edges()
+        ready = [name for name, count in indegree.items() if count == 0]
+        ordered = []
+        while ready:
+            name = ready.pop(0)
+            ordered.append(name)
+            for dependent in dependents[name]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    ready.append(dependent)
+        if len(ordered) != len(self._nodes):
+            cycle = sorted(name for name, count in indegree.items() if count)
+            raise ValueError('Dependency cycle between {}'.format(', '.join(cycle)))
+        return ordered
+
+    def _build_edges(self):
+        indegree = {name: 0 for name in self._nodes}
+        dependents = {name: [] for name in self._nodes}
+        for name, node in self._nodes.items():
+            for dependency in node['dependencies']:
+                if dependency not in self._nodes:
+                    raise ValueError('Node {} depends on unknown node {}'.format(name, dependency))
+                indegree[name] += 1
+                dependents[dependency].append(name)
+        return indegree, dependents
+
+    def run(self, max_workers=4, on_error=None):
+        """
+        Run all nodes
+        :param int max_workers: maximum number of nodes running at the same time, if not passed nodes run
+            one after the other in the calling thread
+        :param callable on_error: (optional) called as on_error(name, exception) for failed nodes
+        :return dict: node names grouped into completed, failed (name -> exception) and skipped
+        """
+        ordered = self.order()  # validates the graph before anything runs
+        indegree, dependents = self._build_edges()
+        result = {'completed': [], 'failed': {}, 'skipped': []}
+        skipped = set()
+
+        def skip_dependents(name):
+            stack = list(dependents[name])
+            while stack:
+                dependent = stack.pop()
+                if dependent not in skipped:
+                    skipped.add(dependent)
+                    result['skipped'].append(dependent)
+                    logger.warning('Skipping %s, dependency %s failed', dependent, name)
+                    stack.extend(dependents[dependent])
+
+        def run_node(name, future):
+            try:
+                if future is None:
+                    self._nodes[name]['func']()
+                else:
+                    future.result()
+            except Exception as e:
+                result['failed'][name] = e
+                if on_error:
+                    on_error(name, e)
+                skip_dependents(name)
+                return False
+            result['completed'].append(name)
+            for dependent in dependents[name]:
+                indegree[dependent] -= 1
+            return True
+
+        if not max_workers:
+            for name in ordered:
+                if name not in skipped:
+                    run_node(name, None)
+            return result
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running = {}
+
+            def submit_ready(names):
+                for name in names:
+                    if indegree[name] == 0 and name not in skipped:
+                        running[executor.submit(self._nodes[name]['func'])] = name
+
+            submit_ready(list(self._nodes))
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if run_node(name, future):
+                        submit_ready(dependents[name])
+
+        return result
@@ -0,0 +1,48 @@
+"""
+
+odlt.store
+=================================
+
+JSON documents kept in the user's home directory, the base of the load manifest, the sync state and the
+throughput history.
+
+Ex:
+
+store = JSONStore(get_default_store_path('sync', '/home/myuser/meaningfulname', 'localhost'))
+"""
+import os
+import json
+import hashlib
+import threading
+from odlt.utils import atomic_write
+
+
+def get_default_store_path(folder, *identifiers):
+    """
+    Location of a JSON store in the user's home directory, derived from the identifiers
+    :param str folder: sub folder of ~/.odlt
+    """
+    digest = hashlib.sha1('\n'.join(str(i) for i in identifiers).encode()).hexdigest()
+    return os.path.join(os.path.expanduser('~'), '.odlt', folder, '{}.json'.format(digest))
+
+
+class JSONStore(object):
+    """
+    JSON document on disk, every change is written atomically so an interrupted run never leaves a
+    truncated file behind
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._data = self._read()
+
+    def _read(self):
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                return json.load(f)
+        return {}
+
+    def save(self):
+        with self._lock:
+            with atomic_write(self.path, fsync=True) as f:
+                json.dump(self._data, f, indent=2, sort_keys=True)
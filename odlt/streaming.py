@@ -0,0 +1,210 @@
+"""
+
+odlt.streaming
+=================================
+
+Constant memory readers used to load table data client side. Objects are fetched with ranged GETs,
+decompressed on the fly, parsed into rows and grouped into bounded batches, so no file is ever fully
+materialized in memory or on disk.
+
+Ex:
+
+chunks = iter_s3_object_chunks(obj)
+rows = iter_csv_rows(iter_decompressed(chunks, get_compression(obj.key)), delimiter='|')
+for batch in iter_batches(rows, 10000):
+    load(batch)
+"""
+import io
+import bz2
+import csv
+import zlib
+import codecs
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+DEFAULT_BATCH_SIZE = 10000
+# upper bound of decompressed bytes produced from a single input chunk at a time
+MAX_DECOMPRESSED_PIECE = 1024 * 1024
+# line delimiters the csv reader ends rows on by itself
+NEWLINES = ('\n', '\r', '\r\n')
+
+COMPRESSION_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.gzip': 'gzip',
+    '.bz2': 'bzip2',
+    '.zst': 'zstd',
+    '.zstd': 'zstd',
+}
+
+
+def get_compression(filename):
+    """
+    Compression of a data file guessed from its extension, None for uncompressed files
+    """
+    lowered = filename.lower()
+    for ext, compression in COMPRESSION_EXTENSIONS.items():
+        if lowered.endswith(ext):
+            return compression
+    return None
+
+
+def iter_s3_object_chunks(obj, chunk_size=DEFAULT_CHUNK_SIZE, size=None):
+    """
+    Fetch an s3 object with consecutive ranged GETs
+    :param s3.ObjectSummary obj: s3 object, or an s3.Object if ``size`` is given
+    :param int chunk_size: bytes fetched per request
+    :param int size: (optional) size of the object, defaults to obj.size
+    """
+    size = obj.size if size is None else size
+    start = 0
+    while start < size:
+        end = min(start + chunk_size, size) - 1
+        body = obj.get(Range='bytes={}-{}'.format(start, end))['Body']
+        try:
+            chunk = body.read()
+        finally:
+            body.close()
+        if not chunk:
+            break
+        start += len(chunk)
+        yield chunk
+
+
+def iter_file_chunks(fileobj, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Read a binary file object in fixed size chunks
+    """
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _new_decompressor(compression):
+    if compression == 'gzip':
+        return zlib.decompressobj(zlib.MAX_WBITS | 16)
+    if compression == 'bzip2':
+        return bz2.BZ2Decompressor()
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError('zstd compressed data files need the zstandard package, pip install zstandard')
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError('Unsupported compression {}'.format(compression))
+
+
+def iter_decompressed(chunks, compression=None):
+    """
+    Decompress a stream of compressed chunks. Concatenated gzip members, bzip2 streams and zstd frames are supported.
+    Every yielded piece is at most ``MAX_DECOMPRESSED_PIECE`` bytes for gzip input, so highly compressed
+    input does not blow up memory.
+    :param iterable chunks: compressed bytes
+    :param str compression: gzip, bzip2, zstd or None for uncompressed input
+    """
+    if not compression:
+        yield from chunks
+        return
+
+    decompressor = _new_decompressor(compression)
+    for chunk in chunks:
+        while chunk:
+            if compression == 'gzip':
+                piece = decompressor.decompress(chunk, MAX_DECOMPRESSED_PIECE)
+                chunk = decompressor.unconsumed_tail
+            else:
+                piece = decompressor.decompress(chunk)
+                chunk = b''
+            if piece:
+                yield piece
+            if getattr(decompressor, 'eof', False):
+                # start of the next concatenated member
+                chunk = decompressor.unused_data + chunk
+                decompressor = _new_decompressor(compression)
+
+
+def iter_lines(chunks, encoding='utf-8', line_delim='\n'):
+    """
+    Split a stream of bytes into decoded lines, line delimiters are kept so quoted multi line fields
+    can be reassembled by the csv reader
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    remainder = ''
+    for chunk in chunks:
+        text = remainder + decoder.decode(chunk)
+        lines = text.split(line_delim)
+        remainder = lines.pop()
+        for line in lines:
+            yield line + line_delim
+    remainder += decoder.decode(b'', final=True)
+    if remainder:
+        yield remainder
+
+
+def iter_csv_rows(chunks, delimiter=',', quote='"', escape='"', quoted=True, has_header=True, line_delim='\n', **kwargs):
+    """
+    Parse decompressed bytes into rows using the same copy params passed to ``load_data``
+    :param iterable chunks: decompressed bytes
+    :param str line_delim: a newline or any other single character
+    :**kwargs: remaining copy params, ignored
+    """
+    reader_args = {'delimiter': delimiter, 'strict': False}
+    if quoted is not False and quoted != 'false':
+        reader_args['quotechar'] = quote
+        if escape and escape != quote:
+            reader_args['escapechar'] = escape
+            reader_args['doublequote'] = False
+    else:
+        reader_args['quoting'] = csv.QUOTE_NONE
+    lines = iter_lines(chunks, line_delim=line_delim)
+    swap = None
+    if line_delim not in NEWLINES:
+        if len(line_delim) != 1:
+            raise ValueError('Unsupported line_delim {!r}, a single character is expected'.format(line_delim))
+        # the csv reader only ends rows on newlines, swap them with the line delimiter and back in the fields
+        swap = {ord(line_delim): '\n', ord('\n'): line_delim}
+        lines = (line.translate(swap) for line in lines)
+    rows = csv.reader(lines, **reader_args)
+    if has_header is True or has_header == 'true':
+        next(rows, None)
+    for row in rows:
+        if row:
+            yield [field.translate(swap) for field in row] if swap else row
+
+
+def iter_batches(rows, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Group rows into lists of at most ``batch_size`` rows
+    """
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ChunkReader(io.RawIOBase):
+    """
+    Read only binary file object over an iterator of byte chunks, used to hand streamed data to readers
+    expecting a file
+    """
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._buffer = memoryview(chunk)
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
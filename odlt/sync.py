@@ -0,0 +1,178 @@
+"""
+
+odlt.sync
+=================================
+
+Diff based sync of tables, views and dashboards. The server catalog is fetched once, every library object is
+compared with it and with the content hash recorded when the object was last applied, and only missing or
+changed objects are created or replaced.
+
+Ex:
+
+catalog = ServerCatalog.fetch(conn)
+state = SyncState(get_default_sync_state_path('localhost', 6274, 'mapd'))
+plan = diff_objects([('view', 'late', 'views/late.sql', 'CREATE VIEW late AS ...')], catalog, state)
+print(plan.describe())
+"""
+import re
+import hashlib
+from collections import OrderedDict
+from odlt.store import JSONStore, get_default_store_path
+
+OBJECT_TABLE = 'table'
+OBJECT_VIEW = 'view'
+OBJECT_DASHBOARD = 'dashboard'
+
+ACTION_CREATE = 'create'
+ACTION_REPLACE = 'replace'
+ACTION_SKIP = 'skip'
+
+
+def get_content_hash(content):
+    """
+    sha256 of the content with whitespace normalized, so reformatting a file does not count as a change
+    """
+    return hashlib.sha256(re.sub(r'\s+', ' ', content or '').strip().encode()).hexdigest()
+
+
+def get_default_sync_state_path(*identifiers):
+    """
+    Sync state location in the user's home directory derived from the target database
+    """
+    return get_default_store_path('sync', *identifiers)
+
+
+class ServerCatalog(object):
+    """
+    Tables, views and dashboards existing on the server. Table and view names are compared case insensitive.
+    """
+    def __init__(self, tables=(), views=(), dashboards=None):
+        """
+        :param list tables: physical table names
+        :param list views: view names
+        :param dict dashboards: dashboard name -> list of dashboard ids
+        """
+        self.tables = {name.lower() for name in tables}
+        self.views = {name.lower() for name in views}
+        self.dashboards = dict(dashboards or {})
+
+    @classmethod
+    def fetch(cls, conn):
+        """
+        Read the catalog with one call per object kind
+        :param pymapd.connection.Connection conn: connection to the target database
+        """
+        dashboards = {}
+        for dashboard in conn._client.get_dashboards(session=conn._session):
+            dashboards.setdefault(dashboard.dashboard_name, []).append(dashboard.dashboard_id)
+        return cls(
+            tables=conn._client.get_physical_tables(session=conn._session),
+            views=conn._client.get_views(session=conn._session),
+            dashboards=dashboards,
+        )
+
+    def exists(self, kind, name):
+        if kind == OBJECT_TABLE:
+            return name.lower() in self.tables
+        if kind == OBJECT_VIEW:
+            return name.lower() in self.views
+        return name in self.dashboards
+
+    def dashboard_ids(self, name):
+        return list(self.dashboards.get(name, []))
+
+
+class SyncState(JSONStore):
+    """
+    Content hash of every object as last applied to a database
+    """
+    def get(self, kind, name):
+        with self._lock:
+            return self._data.get(kind, {}).get(name.lower() if kind != OBJECT_DASHBOARD else name)
+
+    def update(self, kind, name, digest):
+        """
+        Record the content hash of an applied object, written to disk on ``save``
+        """
+        with self._lock:
+            self._data.setdefault(kind, {})[name.lower() if kind != OBJECT_DASHBOARD else name] = digest
+
+
+class SyncItem(object):
+    """
+    A library object with the action needed to bring the server in line with it
+    """
+    def __init__(self, kind, name, path_or_obj, content, digest, action, reason):
+        self.kind = kind
+        self.name = name
+        self.path_or_obj = path_or_obj
+        self.content = content
+        self.digest = digest
+        self.action = action
+        self.reason = reason
+        self.dashboard_ids = []
+
+    def __repr__(self):
+        return 'SyncItem(kind={!r}, name={!r}, action={!r}, reason={!r})'.format(self.kind, self.name, self.action, self.reason)
+
+
+class SyncPlan(object):
+    """
+    Actions for every library object, in library order
+    """
+    def __init__(self, items):
+        self.items = OrderedDict(((item.kind, item.name.lower() if item.kind != OBJECT_DASHBOARD else item.name), item) for item in items)
+
+    def get(self, kind, name):
+        return self.items.get((kind, name.lower() if kind != OBJECT_DASHBOARD else name))
+
+    def actions(self, action):
+        return [item for item in self.items.values() if item.action == action]
+
+    def to_dict(self):
+        return {
+            action: [{'kind': item.kind, 'name': item.name, 'reason': item.reason} for item in self.actions(action)]
+            for action in (ACTION_CREATE, ACTION_REPLACE, ACTION_SKIP)
+        }
+
+    def describe(self):
+        """
+        Human readable list of the planned actions
+        """
+        lines = ['{} to create, {} to replace, {} unchanged or skipped'.format(
+            len(self.actions(ACTION_CREATE)), len(self.actions(ACTION_REPLACE)), len(self.actions(ACTION_SKIP)))]
+        for item in self.items.values():
+            lines.append('  {:<8} {:<10} {:<40} {}'.format(item.action, item.kind, item.name, item.reason))
+        return '\n'.join(lines)
+
+
+def diff_objects(objects, catalog, state, replace_tables=False, replace_unknown=False):
+    """
+    Decide the action for every library object
+    :param list objects: (kind, name, path_or_obj, content) of the library objects
+    :param ServerCatalog catalog: objects existing on the server
+    :param SyncState state: content hashes of previously applied objects
+    :param bool replace_tables: drop and create changed tables, their data has to be loaded again. Otherwise changed
+        tables are skipped with a warning reason
+    :param bool replace_unknown: replace existing objects without a recorded hash, instead of assuming they match
+    :return SyncPlan
+    """
+    items = []
+    for kind, name, path_or_obj, content in objects:
+        digest = get_content_hash(content)
+        recorded = state.get(kind, name) if state is not None else None
+        if not catalog.exists(kind, name):
+            action, reason = ACTION_CREATE, 'missing'
+        elif recorded == digest:
+            action, reason = ACTION_SKIP, 'unchanged'
+        elif recorded is None and not replace_unknown:
+            action, reason = ACTION_SKIP, 'exists, no recorded hash'
+        elif kind == OBJECT_TABLE and not replace_tables:
+            action, reason = ACTION_SKIP, 'changed, replacing tables is disabled'
+        else:
+            action, reason = ACTION_REPLACE, 'changed' if recorded is not None else 'exists, no recorded hash'
+        item = SyncItem(kind, name, path_or_obj, content, digest, action, reason)
+        if kind == OBJECT_DASHBOARD:
+            item.dashboard_ids = catalog.dashboard_ids(name)
+        items.append(item)
+    return SyncPlan(items)
@@ -1,5 +1,18 @@
+import os
+import re
 import json
+import tempfile
 from functools import partial
+from contextlib import contextmanager
+
+_sql_comment_rgx = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_sql_literal_rgx = re.compile(r"'(?:[^']|'')*'")
+_create_view_rgx = re.compile(r'\bcreate\s+view\s+(?:if\s+not\s+exists\s+)?"?([\w$]+)"?', re.I)
+_from_clause_rgx = re.compile(
+    r'\b(?:from|join)\s+([^\s(].*?)(?=\b(?:where|group|order|having|limit|offset|join|on|using|union|intersect|except|'
+    r'inner|left|right|full|cross|natural|window)\b|[();]|$)',
+    re.I | re.S
+)
 
 def is_json(string):
     """
@@ -11,12 +24,91 @@ def is_json(string):
         return False
     return True
 
+def strip_sql_comments_and_literals(sql):
+    """
+    Remove comments and string literals from a SQL statement so only identifiers and keywords are left
+    """
+    return _sql_literal_rgx.sub("''", _sql_comment_rgx.sub(' ', sql))
+
+def get_view_name(sql):
+    """
+    Name of the view created by a CREATE VIEW statement, None if the statement is not a view definition
+    """
+    match = _create_view_rgx.search(strip_sql_comments_and_literals(sql))
+    return match.group(1) if match else None
+
+def get_referenced_relations(sql):
+    """
+    Names of the tables and views a query selects from, parsed from its FROM and JOIN clauses
+    """
+    relations = set()
+    for clause in _from_clause_rgx.findall(strip_sql_comments_and_literals(sql)):
+        for item in clause.split(','):
+            tokens = item.split()
+            if tokens:
+                relations.add(tokens[0].strip('"').split('.')[-1].strip('"'))
+    return relations
+
+def get_dashboard_sources(dashdef):
+    """
+    Names of the tables and views an Immerse dashboard definition reads from
+    :param str dashdef: dashboard definition JSON
+    """
+    sources = set()
+    stack = [json.loads(dashdef)]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for key, val in node.items():
+                if key in ('table', 'dataSource', 'tableName') and isinstance(val, str):
+                    sources.add(val)
+                elif key == 'dataSources' and isinstance(val, dict):
+                    sources.update(k for k in val if isinstance(k, str))
+                    stack.append(val)
+                else:
+                    stack.append(val)
+        elif isinstance(node, list):
+            stack.extend(node)
+    return sources
+
+@contextmanager
+def atomic_write(path, mode='w', fsync=False, replace=os.replace):
+    """
+    Write a file through a temporary file next to it, which replaces the file once the with block completes, so an
+    interrupted write never leaves a truncated file behind
+    :param str mode: 'w' or 'wb'
+    :param bool fsync: flush the content to disk before the file is replaced
+    :param callable replace: (optional) called as replace(tmppath, path) to move the complete file into place
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmppath = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        replace(tmppath, path)
+    finally:
+        if os.path.exists(tmppath):
+            os.remove(tmppath)
+
 class validate_connection(object):
     def __init__(self, func):
         self.func = func
         self.name = func.__name__
     
     def __call__(self, instance, *args, **kwargs):
+        pool = getattr(instance, '_pool', None)
+        if pool is not None and not instance._conn:
+            # lease a pooled connection for this thread, nested calls reuse the same lease
+            with pool.connection() as conn:
+                instance._leases.conn = conn
+                try:
+                    return self.func(instance, *args, **kwargs)
+                finally:
+                    instance._leases.conn = None
         if not instance._conn:
             raise ValueError('No OmniSci connection has been made, please pass a connection object when initializing the object, or use the connect method')
         ret = self.func(instance, *args, **kwargs)
@@ -0,0 +1,405 @@
+"""
+
+odlt.validate
+=================================
+
+Pre-flight validation of data files, before any server time is spent on them. The CREATE TABLE statement of every
+table is parsed into typed column specs, and the data files are parsed in a process pool with the same copy params
+passed to ``load_data``. Every row is checked for its number of fields, which also catches a wrong delimiter, the
+header for the column names, and every value for whether it can be cast to its column type. The server parses dates
+and times in more formats than are checked here, a date or time value that does not parse is only a warning.
+
+Ex:
+
+columns = parse_schema(open('tables/flights/schema.sql').read())
+report = validate_file(('local', 'tables/flights/data/part-1.csv.gz'), columns, sample_size=1024 * 1024, delimiter='|')
+"""
+import re
+import logging
+import datetime
+from decimal import Decimal, InvalidOperation
+from odlt.streaming import (
+    DEFAULT_CHUNK_SIZE, get_compression, iter_decompressed, iter_file_chunks, iter_s3_object_chunks, iter_csv_rows,
+)
+from odlt.utils import strip_sql_comments_and_literals
+
+logger = logging.getLogger('odlt')
+
+# decompressed bytes checked from the start of every data file, None checks whole files
+DEFAULT_SAMPLE_SIZE = 4 * 1024 * 1024
+# errors kept per data file, the file fails on the first one
+DEFAULT_MAX_ERRORS = 10
+
+INT_RANGES = {
+    'TINYINT': 2 ** 7,
+    'SMALLINT': 2 ** 15,
+    'INT': 2 ** 31,
+    'BIGINT': 2 ** 63,
+}
+
+# type names of schema files, normalized to the names of pymapd's column details
+TYPE_ALIASES = {
+    'INTEGER': 'INT',
+    'REAL': 'FLOAT',
+    'NUMERIC': 'DECIMAL',
+    'BOOLEAN': 'BOOL',
+    'TEXT': 'STR',
+    'VARCHAR': 'STR',
+    'CHAR': 'STR',
+    'DATETIME': 'TIMESTAMP',
+}
+
+BOOL_VALUES = {'t', 'true', 'f', 'false', '1', '0', 'y', 'yes', 'n', 'no'}
+DATE_FORMATS = (
+    '%Y-%m-%d', '%Y%m%d', '%Y/%m/%d', '%m/%d/%Y', '%m/%d/%y', '%m-%d-%Y', '%d.%m.%Y', '%d-%b-%Y', '%d-%b-%y', '%d/%b/%Y',
+    '%d/%b/%y', '%d %b %Y', '%b %d %Y', '%b %d, %Y',
+)
+TIME_FORMATS = ('%H:%M:%S', '%H:%M', '%H%M%S', '%I:%M:%S %p', '%I:%M %p')
+# types whose values the server parses in more formats than check_value knows, a value that fails is a warning
+TEMPORAL_TYPES = ('DATE', 'TIME', 'TIMESTAMP')
+DELIMITER_CANDIDATES = (',', '|', '\t', ';')
+
+_create_table_rgx = re.compile(r'\bcreate\s+(?:temporary\s+)?table\s+(?:if\s+not\s+exists\s+)?"?([\w$]+)"?\s*\(', re.I)
+_column_rgx = re.compile(r'"?([\w$]+)"?\s+([a-z]+)\s*(?:\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\))?\s*(\[\s*\d*\s*\])?(.*)', re.I | re.S)
+_constraint_rgx = re.compile(r'(shard\s+key|shared\s+dictionary|primary\s+key|unique|foreign\s+key|constraint)\b', re.I)
+_fraction_rgx = re.compile(r'(?<=:\d{2})\.\d+')
+_timezone_rgx = re.compile(r'(?:Z|[+-]\d{2}:?\d{2})$')
+
+
+class ColumnSpec(object):
+    """
+    Name, type and constraints of a table column, as declared in its CREATE TABLE statement
+    """
+    def __init__(self, name, type, nullable=True, precision=None, scale=None, is_array=False):
+        self.name = name
+        self.type = type
+        self.nullable = nullable
+        self.precision = precision
+        self.scale = scale
+        self.is_array = is_array
+
+    def __repr__(self):
+        return 'ColumnSpec({!r}, {!r})'.format(self.name, self.type)
+
+
+def _split_top_level(body):
+    parts, depth, current = [], 0, []
+    for char in body:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and depth == 0:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append(''.join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parse_schema(sql):
+    """
+    Column specs of a CREATE TABLE statement
+    :param str sql: content of a schema.sql file
+    :return list of ColumnSpec
+    """
+    sql = strip_sql_comments_and_literals(sql)
+    match = _create_table_rgx.search(sql)
+    if not match:
+        raise ValueError('Not a CREATE TABLE statement')
+    depth, end = 1, match.end()
+    while depth and end < len(sql):
+        depth += {'(': 1, ')': -1}.get(sql[end], 0)
+        end += 1
+    columns = []
+    for definition in _split_top_level(sql[match.end():end - 1]):
+        if _constraint_rgx.match(definition):
+            continue
+        column = _column_rgx.match(definition)
+        if not column:
+            raise ValueError('Could not parse column definition {}'.format(definition))
+        name, type_name, precision, scale, array, rest = column.groups()
+        type_name = TYPE_ALIASES.get(type_name.upper(), type_name.upper())
+        columns.append(ColumnSpec(
+            name, type_name, nullable=not re.search(r'\bnot\s+null\b', rest, re.I),
+            precision=int(precision) if precision else None, scale=int(scale) if scale else None, is_array=bool(array),
+        ))
+    return columns
+
+
+def _parse_datetime(value, formats):
+    for fmt in formats:
+        try:
+            datetime.datetime.strptime(value, fmt)
+            return True
+        except ValueError:
+            continue
+    return False
+
+
+def _is_epoch(value):
+    try:
+        int(value)
+        return True
+    except ValueError:
+        return False
+
+
+def check_value(column, value):
+    """
+    Whether a non null csv value can be cast to the column type
+    :return str: error message, None if the value is valid or its type is not checked
+    """
+    if column.is_array:
+        return None
+    if column.type in INT_RANGES:
+        try:
+            number = int(value)
+        except ValueError:
+            return '{!r} is not an integer'.format(value)
+        bound = INT_RANGES[column.type]
+        if not -bound < number < bound:
+            return '{} is out of range for {}'.format(value, column.type)
+    elif column.type in ('FLOAT', 'DOUBLE'):
+        try:
+            float(value)
+        except ValueError:
+            return '{!r} is not a number'.format(value)
+    elif column.type == 'DECIMAL':
+        try:
+            number = Decimal(value)
+        except InvalidOperation:
+            return '{!r} is not a decimal'.format(value)
+        if column.precision and number.is_finite():
+            digits = len(number.as_tuple().digits) - max(-number.as_tuple().exponent, 0) + (column.scale or 0)
+            if digits > column.precision:
+                return '{} does not fit DECIMAL({},{})'.format(value, column.precision, column.scale or 0)
+    elif column.type == 'BOOL':
+        if value.lower() not in BOOL_VALUES:
+            return '{!r} is not a boolean'.format(value)
+    elif column.type == 'DATE':
+        if not (_parse_datetime(value, DATE_FORMATS) or _is_epoch(value)):
+            return '{!r} is not a date'.format(value)
+    elif column.type == 'TIME':
+        if not _parse_datetime(_fraction_rgx.sub('', value), TIME_FORMATS):
+            return '{!r} is not a time'.format(value)
+    elif column.type == 'TIMESTAMP':
+        stamp = _timezone_rgx.sub('', _fraction_rgx.sub('', value.strip()))
+        formats = DATE_FORMATS + tuple(d + sep + t for d in DATE_FORMATS for sep in (' ', 'T') for t in TIME_FORMATS)
+        if not (_parse_datetime(stamp, formats) or _is_epoch(value)):
+            return '{!r} is not a timestamp'.format(value)
+    return None
+
+
+class FileReport(object):
+    """
+    Result of the validation of a data file
+    """
+    def __init__(self, table, name, rows=0, errors=None, warnings=None, complete=True):
+        """
+        :param int rows: data rows checked
+        :param list errors: dicts with row, column and error, the file can't be loaded
+        :param list warnings: dicts with row, column and error, the file loads but may not be what was intended
+        :param bool complete: False if only a sample at the start of the file was checked
+        """
+        self.table = table
+        self.name = name
+        self.rows = rows
+        self.errors = errors or []
+        self.warnings = warnings or []
+        self.complete = complete
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def to_dict(self):
+        return {
+            'table': self.table, 'name': self.name, 'rows': self.rows, 'complete': self.complete,
+            'errors': self.errors, 'warnings': self.warnings,
+        }
+
+
+def _guess_delimiter(field, columns):
+    for candidate in DELIMITER_CANDIDATES:
+        if field.count(candidate) == len(columns) - 1:
+            return candidate
+    return None
+
+
+def validate_rows(rows, columns, has_header=True, null_str='\\N', max_errors=DEFAULT_MAX_ERRORS):
+    """
+    Check parsed rows against the column specs of their table
+    :param iterable rows: parsed rows, including the header line if ``has_header`` is set
+    :return tuple: (number of data rows, errors, warnings)
+    """
+    errors, warnings = [], []
+    count = 0
+    rows = iter(rows)
+    if has_header is True or has_header == 'true':
+        header = next(rows, None)
+        names = [column.name.lower() for column in columns]
+        if header is not None and [field.strip().lower() for field in header] != names:
+            warnings.append({'row': 0, 'column': None, 'error': 'header {} does not match the columns {}'.format(header, names)})
+    for count, row in enumerate(rows, start=1):
+        if len(row) != len(columns):
+            error = '{} field(s) instead of {}'.format(len(row), len(columns))
+            delimiter = _guess_delimiter(row[0], columns) if len(row) == 1 and len(columns) > 1 else None
+            if delimiter:
+                error += ', the file seems to be delimited by {!r}'.format(delimiter)
+            errors.append({'row': count, 'column': None, 'error': error})
+        else:
+            for column, value in zip(columns, row):
+                if value == '' or value == null_str:
+                    if not column.nullable:
+                        errors.append({'row': count, 'column': column.name, 'error': 'null value in a NOT NULL column'})
+                    continue
+                error = check_value(column, value)
+                if error and column.type in TEMPORAL_TYPES:
+                    if len(warnings) < max_errors:
+                        warnings.append({'row': count, 'column': column.name, 'error': error})
+                elif error:
+                    errors.append({'row': count, 'column': column.name, 'error': error})
+                    break
+        if len(errors) >= max_errors:
+            break
+    return count, errors[:max_errors], warnings
+
+
+def _iter_sample(pieces, sample_size, line_delim='\n', truncated=None):
+    """
+    Decompressed pieces up to the last complete line after ``sample_size`` bytes
+    :param list truncated: (optional) set to [True] if the data was cut
+    """
+    size = 0
+    delim = line_delim.encode()
+    try:
+        for piece in pieces:
+            if size + len(piece) < sample_size:
+                size += len(piece)
+                yield piece
+                continue
+            cut = piece.rfind(delim, 0, max(sample_size - size, 0) + len(delim))
+            if cut < 0:
+                cut = piece.rfind(delim)
+            if cut >= 0:
+                yield piece[:cut + len(delim)]
+            if truncated is not None and (cut < 0 or cut + len(delim) < len(piece) or next(pieces, None) is not None):
+                truncated.append(True)
+            return
+    finally:
+        pieces.close()
+
+
+def _iter_s3_chunks(bucket, key, size, s3_params, chunk_size=DEFAULT_CHUNK_SIZE):
+    import boto3
+    from botocore.handlers import disable_signing
+    if s3_params.get('aws_access_key_id') and s3_params.get('aws_secret_access_key'):
+        s3 = boto3.Session(**s3_params).resource('s3')
+    else:
+        s3 = boto3.resource('s3')
+        s3.meta.client.meta.events.register('choose-signer.s3.*', disable_signing)
+    return iter_s3_object_chunks(s3.Object(bucket, key), chunk_size=chunk_size, size=size)
+
+
+def _iter_local_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    with open(path, 'rb') as f:
+        yield from iter_file_chunks(f, chunk_size=chunk_size)
+
+
+def _open_source(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    :param tuple source: ('local', path) or ('s3', bucket, key, size, session params), picklable for the process pool
+    :return tuple: (chunks, compression)
+    """
+    if source[0] == 's3':
+        _, bucket, key, size, s3_params = source
+        return _iter_s3_chunks(bucket, key, size, s3_params, chunk_size=chunk_size), get_compression(key)
+    return _iter_local_chunks(source[1], chunk_size=chunk_size), get_compression(source[1])
+
+
+def validate_file(source, columns, table=None, name=None, sample_size=DEFAULT_SAMPLE_SIZE, max_errors=DEFAULT_MAX_ERRORS,
+                  has_header=True, null_str='\\N', **kwargs):
+    """
+    Parse a data file, or a sample at its start, with the copy params of the load and check its rows
+    :param tuple source: ('local', path) or ('s3', bucket, key, size, session params)
+    :param list columns: ColumnSpec of the table
+    :param int sample_size: decompressed bytes checked, None checks the whole file
+    :**kwargs: remaining copy params, see ``LibraryImport.load_data``
+    :return FileReport
+    """
+    name = name or source[-1 if source[0] == 'local' else 2]
+    chunks, compression = _open_source(source, chunk_size=min(sample_size or DEFAULT_CHUNK_SIZE, DEFAULT_CHUNK_SIZE))
+    pieces = iter_decompressed(chunks, compression)
+    truncated = []
+    if sample_size:
+        pieces = _iter_sample(pieces, sample_size, line_delim=kwargs.get('line_delim', '\n'), truncated=truncated)
+    try:
+        rows, errors, warnings = validate_rows(iter_csv_rows(pieces, has_header=False, **kwargs), columns, has_header=has_header,
+                                               null_str=null_str, max_errors=max_errors)
+    except Exception as e:
+        rows, errors, warnings = 0, [{'row': None, 'column': None, 'error': 'could not be read: {}'.format(e)}], []
+    finally:
+        pieces.close()
+    return FileReport(table, name, rows=rows, errors=errors, warnings=warnings, complete=not truncated)
+
+
+class ValidationReport(object):
+    """
+    Reports of all validated data files
+    """
+    def __init__(self, files):
+        self.files = files
+
+    @property
+    def failed(self):
+        return [report for report in self.files if not report.ok]
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def to_dict(self):
+        return {'files': [report.to_dict() for report in self.files]}
+
+    def describe(self):
+        """
+        Human readable report of the files with errors or warnings
+        """
+        lines = ['{} file(s) checked, {} failed'.format(len(self.files), len(self.failed))]
+        for report in self.files:
+            if report.ok and not report.warnings:
+                continue
+            lines.append('  {} ({}): {}, {} row(s) checked{}'.format(
+                report.name, report.table, 'failed' if report.errors else 'ok', report.rows, '' if report.complete else ' of a sample'))
+            for level, issues in (('error', report.errors), ('warning', report.warnings)):
+                for issue in issues:
+                    lines.append('    {} row {}{}: {}'.format(
+                        level, issue['row'], ' column {}'.format(issue['column']) if issue['column'] else '', issue['error']))
+        return '\n'.join(lines)
+
+
+def validate_files(jobs, max_workers=None, executor=None, **kwargs):
+    """
+    Validate data files in a process pool
+    :param list jobs: (table, name, source, columns) of every data file
+    :param concurrent.futures.Executor executor: (optional) used instead of a new process pool
+    :**kwargs: passed to ``validate_file``
+    :return ValidationReport
+    """
+    if not jobs:
+        return ValidationReport([])
+    owned = executor is None
+    if owned:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [
+            executor.submit(validate_file, source, columns, table=table, name=name, **kwargs)
+            for table, name, source, columns in jobs
+        ]
+        return ValidationReport([future.result() for future in futures])
+    finally:
+        if owned:
+            executor.shutdown()
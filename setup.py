@@ -18,4 +18,7 @@ setup(name='odlt',
           'markdown',
           'boto3',
       ],
+      entry_points={
+          'console_scripts': ['odlt=odlt.cli:main'],
+      },
       zip_safe=False)
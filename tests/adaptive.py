@@ -0,0 +1,88 @@
+from odlt.adaptive import AdaptiveController, MIN_NORMALIZED_SIZE
+import threading
+import pytest
+
+
+def complete(controller, latency, size=MIN_NORMALIZED_SIZE, error=False):
+    epoch, threads = controller.acquire()
+    controller.release(epoch, latency, size=size, error=error)
+    return threads
+
+
+class TestAdaptiveController(object):
+    def test_additive_increase_after_a_window(self):
+        controller = AdaptiveController(initial_limit=2, max_limit=4, max_threads=8, threads=4)
+        complete(controller, 1.0)
+        assert (controller.limit, controller.threads) == (2, 4)
+        complete(controller, 1.0)
+        assert (controller.limit, controller.threads) == (3, 5)
+        for _ in range(3):
+            complete(controller, 1.0)
+        assert (controller.limit, controller.threads) == (4, 6)
+
+    def test_limits_are_capped(self):
+        controller = AdaptiveController(initial_limit=1, max_limit=2, max_threads=2)
+        for _ in range(10):
+            complete(controller, 1.0)
+        assert (controller.limit, controller.threads) == (2, 2)
+
+    def test_multiplicative_decrease_on_error(self):
+        controller = AdaptiveController(initial_limit=8, max_limit=8, max_threads=8)
+        complete(controller, 1.0, error=True)
+        assert (controller.limit, controller.threads) == (4, 4)
+
+    def test_slow_load_decreases_and_latency_is_normalized_by_size(self):
+        controller = AdaptiveController(initial_limit=4, max_limit=8, latency_tolerance=2.0)
+        complete(controller, 1.0)
+        # ten times the bytes in five times the time is faster, not congested
+        complete(controller, 5.0, size=10 * MIN_NORMALIZED_SIZE)
+        assert controller.limit == 4
+        complete(controller, 3.0)
+        assert controller.limit == 2
+        assert controller.threads is None
+
+    def test_loads_started_before_a_change_do_not_trigger_another(self):
+        controller = AdaptiveController(initial_limit=4, max_limit=8)
+        slots = [controller.acquire() for _ in range(3)]
+        controller.release(slots[0][0], 1.0, error=True)
+        controller.release(slots[1][0], 1.0, error=True)
+        assert controller.limit == 2
+        controller.release(slots[2][0], 1.0)
+        assert controller.in_flight == 0
+
+    def test_in_flight_loads_are_bounded(self):
+        controller = AdaptiveController(initial_limit=2, max_limit=2)
+        running, peak, lock = [0], [0], threading.Lock()
+
+        def load():
+            with controller.slot():
+                with lock:
+                    running[0] += 1
+                    peak[0] = max(peak[0], running[0])
+                with lock:
+                    running[0] -= 1
+
+        workers = [threading.Thread(target=load) for _ in range(8)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert peak[0] <= 2
+        assert controller.in_flight == 0
+
+    def test_slot_records_failures(self):
+        controller = AdaptiveController(initial_limit=4, max_limit=4)
+        with pytest.raises(ValueError):
+            with controller.slot():
+                raise ValueError('timeout')
+        assert controller.limit == 2
+
+    def test_acquire_timeout(self):
+        controller = AdaptiveController(initial_limit=1, max_limit=1)
+        controller.acquire()
+        with pytest.raises(ValueError):
+            controller.acquire(timeout=0.01)
+
+    def test_invalid_bounds(self):
+        with pytest.raises(ValueError):
+            AdaptiveController(min_limit=4, max_limit=2)
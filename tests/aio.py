@@ -0,0 +1,121 @@
+from unittest.mock import MagicMock, patch
+from odlt.aio import AsyncLibraryImport
+import asyncio
+import threading
+import time
+import pytest
+
+
+def make_library(tmpdir):
+    tables = tmpdir.mkdir('tables')
+    for tblname in ('flights', 'airports'):
+        tbldir = tables.mkdir(tblname)
+        tbldir.join('schema.sql').write('CREATE TABLE {} (id INT);'.format(tblname))
+        tbldir.mkdir('data').join('part-1.csv').write('id\n1\n')
+    tmpdir.mkdir('views').join('late.sql').write('CREATE VIEW late AS SELECT * FROM flights;')
+    tmpdir.mkdir('dashboards').join('delays.json').write('delays\n{}\n{"dashboard": {"dataSources": {"late": {}}}}\n')
+    return str(tmpdir)
+
+
+class TestAsyncLibraryImport(object):
+    @patch('pymapd.connect')
+    def test_import_all_runs_the_import_graph(self, mock_connection, tmpdir):
+        path = make_library(tmpdir)
+        imp = AsyncLibraryImport()
+        loaded = []
+        imp.library._load_table_data = lambda tblname, datapath, **kwargs: loaded.append(tblname)
+
+        async def run():
+            await imp.connect()
+            await imp.import_all(path)
+            await imp.close()
+
+        asyncio.run(run())
+        executed = [call[0][0] for call in mock_connection.return_value.cursor.return_value.execute.call_args_list]
+        assert sorted(executed[:2]) == ['CREATE TABLE airports (id INT);', 'CREATE TABLE flights (id INT);']
+        assert executed[2] == 'CREATE VIEW late AS SELECT * FROM flights;'
+        assert sorted(loaded) == ['airports', 'flights']
+        assert mock_connection.return_value._client.create_dashboard.call_args[1]['dashboard_name'] == 'delays'
+        assert imp.errors == []
+
+    @patch('pymapd.connect')
+    def test_failed_table_skips_dependents(self, mock_connection, tmpdir):
+        path = make_library(tmpdir)
+        imp = AsyncLibraryImport()
+
+        def execute(query):
+            if 'flights' in query and query.startswith('CREATE TABLE'):
+                raise ValueError('bad ddl')
+
+        mock_connection.return_value.cursor.return_value.execute.side_effect = execute
+        imp.library._load_table_data = MagicMock()
+
+        async def run():
+            await imp.connect()
+            await imp.import_all(path)
+
+        asyncio.run(run())
+        failed = sorted(error['name'] for error in imp.errors)
+        assert failed == ['dashboard:delays', 'data:flights', 'table:flights', 'view:late']
+        assert [call[0][0] for call in imp.library._load_table_data.call_args_list] == ['airports']
+
+    def test_server_calls_share_a_single_connection_one_at_a_time(self, tmpdir):
+        path = make_library(tmpdir)
+        imp = AsyncLibraryImport(conn=MagicMock(), server_concurrency=4)
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def load(tblname, datapath, **kwargs):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            # long enough for an overlapping load to start
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+
+        imp.library._load_table_data = load
+        asyncio.run(imp.load_data(path))
+        assert peak[0] == 1
+
+    @patch('pymapd.connect')
+    def test_load_data_validates_and_rejects_adaptive(self, mock_connection, tmpdir):
+        path = make_library(tmpdir)
+        tmpdir.join('tables', 'flights', 'data', 'part-1.csv').write('id\nnot a number\n')
+        imp = AsyncLibraryImport()
+        loaded = []
+        imp.library._load_table_data = lambda tblname, datapath, **kwargs: loaded.append(tblname)
+
+        async def run():
+            await imp.connect()
+            with pytest.raises(ValueError):
+                await imp.load_data(path, adaptive=True)
+            await imp.load_data(path, validate='full', max_workers=1)
+
+        asyncio.run(run())
+        assert sorted(loaded) == ['airports', 'flights']
+        assert [error['phase'] for error in imp.errors] == ['validate']
+        assert imp.library._quarantined
+
+    @patch('pymapd.connect')
+    def test_import_all_takes_the_load_options(self, mock_connection, tmpdir):
+        path = make_library(tmpdir)
+        tmpdir.join('tables', 'flights', 'data', 'part-1.csv').write('id\nnot a number\n')
+        imp = AsyncLibraryImport()
+        loaded = []
+        imp.library._load_table_data = lambda tblname, datapath, **kwargs: loaded.append((tblname, kwargs['use_arrow']))
+
+        async def run():
+            await imp.connect()
+            with pytest.raises(ValueError):
+                await imp.import_all(path, adaptive=True)
+            await imp.import_all(path, validate='full', incremental=True, plan=True, use_arrow=True,
+                                 manifest_path=str(tmpdir.join('manifest.json')))
+
+        asyncio.run(run())
+        assert sorted(loaded) == [('airports', True), ('flights', True)]
+        assert [error['phase'] for error in imp.errors] == ['validate']
+
+    def test_invalid_concurrency(self):
+        with pytest.raises(ValueError):
+            AsyncLibraryImport(io_concurrency=0)
@@ -0,0 +1,144 @@
+import os
+import time
+import pytest
+from unittest.mock import MagicMock
+from odlt.cache import ContentCache
+from odlt.importer import LibraryImport
+from odlt.index import dump_index
+
+
+class FakeObject(object):
+    def __init__(self, key, content, etag='"1"', bucket_name='bucket'):
+        self.bucket_name = bucket_name
+        self.key = key
+        self.e_tag = etag
+        self.content = content
+        self.gets = 0
+
+    @property
+    def size(self):
+        return len(self.content)
+
+    def get(self, Range=None):
+        self.gets += 1
+        content = self.content
+        if Range:
+            start, end = Range[len('bytes='):].split('-')
+            content = content[int(start):int(end) + 1]
+        return {'Body': MagicMock(read=MagicMock(return_value=content))}
+
+
+# read_s3obj only reads boto3 object summaries
+S3ObjectSummary = type('s3.ObjectSummary', (FakeObject,), {})
+
+
+class IndexedObjectSummary(FakeObject):
+    """
+    Object summary as built from a library index entry, the ETag is only known for data files
+    """
+    contents = {}
+
+    def __init__(self, bucket_name, key):
+        self.bucket_name = bucket_name
+        self.key = key
+        self.meta = MagicMock(data=None)
+        self.gets = 0
+
+    @property
+    def e_tag(self):
+        return self.meta.data.get('ETag')
+
+    @property
+    def content(self):
+        return self.contents[self.key]
+
+
+IndexedObjectSummary = type('s3.ObjectSummary', (IndexedObjectSummary,), {})
+
+
+class TestContentCache(object):
+    def test_second_read_is_served_from_disk(self, tmpdir):
+        cache = ContentCache(str(tmpdir))
+        obj = FakeObject('lib/tables/t/data/1.csv', b'a\n1\n2\n')
+        assert b''.join(cache.iter_chunks(obj, chunk_size=2)) == b'a\n1\n2\n'
+        assert obj.gets == 3
+        assert b''.join(cache.iter_chunks(obj, chunk_size=4)) == b'a\n1\n2\n'
+        assert cache.read(obj) == b'a\n1\n2\n'
+        assert obj.gets == 3
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    def test_changed_etag_is_fetched_again(self, tmpdir):
+        cache = ContentCache(str(tmpdir))
+        assert cache.read(FakeObject('lib/views/v.sql', b'old')) == b'old'
+        changed = FakeObject('lib/views/v.sql', b'new', etag='"2"')
+        assert cache.read(changed) == b'new'
+        assert changed.gets == 1
+
+    def test_partially_read_object_is_not_cached(self, tmpdir):
+        cache = ContentCache(str(tmpdir))
+        obj = FakeObject('lib/tables/t/data/1.csv', b'0123456789')
+        chunks = cache.iter_chunks(obj, chunk_size=4)
+        assert next(chunks) == b'0123'
+        chunks.close()
+        assert cache.size() == 0
+        assert not [name for _, _, names in os.walk(str(tmpdir)) for name in names if name.startswith('.tmp-')]
+
+    def test_least_recently_used_entries_are_evicted(self, tmpdir):
+        cache = ContentCache(str(tmpdir), max_size=10)
+        first, second, third = [FakeObject(key, b'x' * 4) for key in ('a', 'b', 'c')]
+        cache.read(first)
+        cache.read(second)
+        # the first entry was used last
+        past = time.time() - 3600
+        os.utime(cache._get_entry_path(*ContentCache._get_object_id(second)), (past, past))
+        cache.read(third)
+        assert cache.size() == 8
+        cache.read(first)
+        cache.read(second)
+        assert (first.gets, second.gets) == (1, 2)
+
+    def test_object_larger_than_the_cache_is_not_kept(self, tmpdir):
+        cache = ContentCache(str(tmpdir), max_size=4)
+        obj = FakeObject('a', b'0123456789')
+        assert b''.join(cache.iter_chunks(obj)) == b'0123456789'
+        assert cache.size() == 0
+
+    def test_invalid_size(self, tmpdir):
+        with pytest.raises(ValueError):
+            ContentCache(str(tmpdir), max_size=0)
+
+
+class TestImporterCache(object):
+    def test_s3_reads_go_through_the_cache(self, tmpdir):
+        imp = LibraryImport(cache=ContentCache(str(tmpdir)))
+        imp._source = 's3'
+        obj = S3ObjectSummary('lib/views/v.sql', b'CREATE VIEW v AS SELECT 1;')
+        assert imp.read_s3obj(obj) == imp.read_s3obj(obj) == 'CREATE VIEW v AS SELECT 1;'
+        data = FakeObject('lib/tables/t/data/1.csv.gz', b'zz')
+        for _ in range(2):
+            chunks, compression = imp._open_data_file_chunks(data)
+            assert (b''.join(chunks), compression) == (b'zz', 'gzip')
+        assert (obj.gets, data.gets) == (1, 1)
+
+    def test_indexed_s3_library(self, tmpdir):
+        IndexedObjectSummary.contents = {
+            'lib/tables/flights/schema.sql': b'CREATE TABLE flights (id INT);',
+            'lib/tables/flights/data/part-1.csv': b'id\n1\n',
+        }
+        index = {'version': 1, 'views': [], 'dashboards': [], 'tables': {'flights': {
+            'schema': 'tables/flights/schema.sql', 'data': [{'path': 'tables/flights/data/part-1.csv', 'size': 5, 'etag': '"1"'}],
+        }}}
+        imp = LibraryImport(cache=ContentCache(str(tmpdir)))
+        imp._source, imp._bucket_name, imp._datalibrary_path = 's3', 'bucket', 'lib'
+        imp._bucket = MagicMock()
+        imp._bucket.Object.return_value.get.return_value = {'Body': MagicMock(read=MagicMock(return_value=dump_index(index).encode()))}
+        imp._s3 = MagicMock()
+        imp._s3.ObjectSummary.side_effect = IndexedObjectSummary
+        schema = imp.datalibrary['tables']['flights']['schema']
+        assert imp._get_file_or_obj_content(schema) == imp._get_file_or_obj_content(schema) == 'CREATE TABLE flights (id INT);'
+        data = imp._list_data_files(imp.datalibrary['tables']['flights']['data'])[0]
+        for _ in range(2):
+            chunks, _ = imp._open_data_file_chunks(data)
+            assert b''.join(chunks) == b'id\n1\n'
+        assert (schema.gets, data.gets) == (2, 1)
+        assert (imp.cache.hits, imp.cache.misses) == (1, 1)
@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import subprocess
+import pytest
+from unittest.mock import patch
+import odlt
+from odlt.cli import main
+
+HEAVY_MODULES = ('boto3', 'botocore', 'pymapd', 'mapd', 'pyarrow', 'odlt.importer')
+# generous bound on the import of the command line module in a fresh interpreter, in seconds
+MAX_STARTUP = 0.5
+
+
+def make_library(tmpdir):
+    tbldir = tmpdir.mkdir('tables').mkdir('flights')
+    tbldir.join('schema.sql').write('CREATE TABLE flights (id INT, name TEXT);')
+    datadir = tbldir.mkdir('data')
+    datadir.join('part-1.csv').write('id|name\n1|a\n2|b\n')
+    tmpdir.mkdir('views')
+    return str(tmpdir)
+
+
+def run_python(code):
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(odlt.__file__))))
+    return subprocess.run([sys.executable, '-c', code], env=env, stdout=subprocess.PIPE, check=True).stdout.decode()
+
+
+class TestStartup(object):
+    def test_heavy_dependencies_are_imported_lazily(self):
+        output = run_python(
+            'import sys, time\n'
+            'started = time.perf_counter()\n'
+            'import odlt, odlt.cli\n'
+            'odlt.cli.build_parser().parse_args(["plan", "/tmp"])\n'
+            'print(time.perf_counter() - started)\n'
+            'print(",".join(m for m in {!r} if m in sys.modules))\n'.format(HEAVY_MODULES)
+        )
+        seconds, imported = output.splitlines()
+        assert imported == ''
+        assert float(seconds) < MAX_STARTUP
+
+    def test_package_exports_are_resolved_on_access(self):
+        from odlt import LibraryImport, LibraryExport
+        from odlt.importer import LibraryImport as importer_class
+        assert LibraryImport is importer_class and LibraryExport.__name__ == 'LibraryExport'
+        with pytest.raises(AttributeError):
+            odlt.NotAnAttribute
+
+
+class TestCommands(object):
+    def test_plan_needs_no_connection(self, tmpdir, capsys):
+        path = make_library(tmpdir)
+        assert main(['plan', path, '--json', '--delimiter', '|']) == 0
+        explanation = json.loads(capsys.readouterr().out)
+        assert (explanation['load_path'], explanation['files'], explanation['rows']) == ('import_table', 1, 2)
+
+    @patch('pymapd.connect')
+    def test_load(self, mock_connection, tmpdir):
+        path = make_library(tmpdir)
+        assert main(['load', path, '--host', 'omnisci', '--corepath', '/core', '--delimiter', '|', '--copy-param', 'null_str=NA']) == 0
+        assert mock_connection.call_args[1]['host'] == 'omnisci'
+        call = mock_connection.return_value._client.import_table.call_args[1]
+        assert call['file_name'] == '/core/tables/flights/data/part-1.csv'
+        assert (call['copy_params'].delimiter, call['copy_params'].null_str) == ('|', 'NA')
+
+    @patch('pymapd.connect')
+    def test_import_reports_errors(self, mock_connection, tmpdir, capsys):
+        path = make_library(tmpdir)
+        mock_connection.return_value.cursor.return_value.execute.side_effect = ValueError('exists')
+        assert main(['import', path]) == 1
+        assert 'table:flights' in capsys.readouterr().err
+
+    def test_invalid_library(self, tmpdir):
+        assert main(['plan', str(tmpdir.join('missing'))]) == 2
+
+    @pytest.mark.parametrize('options', [
+        ['--corepath', '/core'], ['--batch-size', '1'], ['--threads', '2'], ['--resume'], ['--validate', 'sample'],
+        ['--validate', 'full'], ['--copy'],
+    ])
+    @patch('pymapd.connect')
+    def test_import_with_load_option(self, mock_connection, tmpdir, capsys, options):
+        path = make_library(tmpdir.mkdir('library'))
+        argv = ['import', path, '--delimiter', '|', '--manifest', str(tmpdir.join('manifest.json'))] + options
+        assert main(argv) == 0, capsys.readouterr().err
+        executed = [call[0][0] for call in mock_connection.return_value.cursor.return_value.execute.call_args_list]
+        assert executed[0] == 'CREATE TABLE flights (id INT, name TEXT);'
+        assert mock_connection.return_value._client.import_table.called or executed[1].startswith('COPY flights')
@@ -0,0 +1,48 @@
+from collections import namedtuple
+from unittest.mock import MagicMock
+from odlt.columnar import get_arrow_schema, open_arrow_input, iter_arrow_batches, load_arrow_batch
+import gzip
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+
+ColumnDetails = namedtuple('ColumnDetails', ['name', 'type', 'nullable', 'precision', 'scale', 'comp_param', 'encoding', 'is_array'])
+
+columns = [
+    ColumnDetails('id', 'BIGINT', False, 0, 0, 0, None, False),
+    ColumnDetails('name', 'STR', True, 0, 0, 32, 'DICT', False),
+    ColumnDetails('price', 'DECIMAL', True, 10, 2, 0, None, False),
+]
+
+
+class TestColumnar(object):
+    def test_arrow_schema(self):
+        schema = get_arrow_schema(columns)
+        assert schema.names == ['id', 'name', 'price']
+        assert schema.field('id').type == pa.int64()
+        assert schema.field('price').type == pa.decimal128(10, 2)
+
+    def test_unsupported_column_type(self):
+        with pytest.raises(ValueError):
+            get_arrow_schema([ColumnDetails('loc', 'POINT', True, 0, 0, 0, None, False)])
+
+    @pytest.mark.parametrize('filename', ['part-1.csv', 'part-1.csv.gz'])
+    def test_parse_local_file_in_batches(self, tmpdir, filename):
+        content = 'id,name,price\n' + ''.join('{},name{},{}.50\n'.format(i, i, i) for i in range(1000)) + '1000,\\N,\n'
+        path = str(tmpdir.join(filename))
+        with (gzip.open(path, 'wt') if filename.endswith('.gz') else open(path, 'w')) as f:
+            f.write(content)
+        with open_arrow_input(path) as source:
+            batches = list(iter_arrow_batches(source, get_arrow_schema(columns), block_size=4096))
+        assert len(batches) > 1
+        table = pa.Table.from_batches(batches)
+        assert table.num_rows == 1001
+        assert table.column('name')[1000].as_py() is None
+        assert table.column('price')[1000].as_py() is None
+
+    def test_load_arrow_batch(self):
+        conn = MagicMock()
+        batch = pa.record_batch([pa.array([1, 2])], names=['id'])
+        assert load_arrow_batch(conn, 'footable', batch) == 2
+        payload = conn._client.load_table_binary_arrow.call_args[1]['arrow_stream']
+        assert pa.ipc.open_stream(payload).read_all().num_rows == 2
@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def throughput_history(tmpdir, monkeypatch):
+    # every successful load records its throughput, keep it out of the home directory
+    path = str(tmpdir.join('throughput.json'))
+    monkeypatch.setattr('odlt.importer.get_default_throughput_path', lambda *identifiers: path)
+    return path
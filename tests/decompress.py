@@ -0,0 +1,74 @@
+from odlt.decompress import DecompressionPipeline
+from odlt.streaming import get_compression, iter_csv_rows
+import threading
+import gzip
+import time
+import pytest
+
+
+def open_plain(item):
+    return [item.encode()], None
+
+
+class TestDecompressionPipeline(object):
+    def test_files_come_out_in_order(self):
+        def open_chunks(item):
+            # later files finish first
+            time.sleep(0.01 * (5 - item))
+            return [str(item).encode()] * 3, None
+
+        result = [(item, b''.join(pieces)) for item, pieces in DecompressionPipeline(open_chunks, range(5), workers=3)]
+        assert result == [(i, str(i).encode() * 3) for i in range(5)]
+
+    def test_error_raised_from_failed_file(self):
+        def open_chunks(item):
+            if item == 'bad':
+                raise IOError('unreadable')
+            return open_plain(item)
+
+        pipeline = iter(DecompressionPipeline(open_chunks, ['a', 'bad', 'c'], workers=2))
+        assert b''.join(next(pipeline)[1]) == b'a'
+        with pytest.raises(IOError):
+            b''.join(next(pipeline)[1])
+
+    def test_consumer_leaving_early_stops_workers(self):
+        done = threading.Event()
+
+        def chunks():
+            try:
+                while True:
+                    yield b'x' * 1024
+            finally:
+                done.set()
+
+        pipeline = iter(DecompressionPipeline(lambda item: (chunks(), None), ['endless'], workers=1, queue_size=2))
+        _, pieces = next(pipeline)
+        next(pieces)
+        pipeline.close()
+        assert done.wait(5)
+
+    def test_gzip_round_trip(self, tmpdir):
+        paths = []
+        for i in range(4):
+            path = str(tmpdir.join('part-{}.csv.gz'.format(i)))
+            with gzip.open(path, 'wb') as f:
+                f.write(''.join('{},{}\n'.format(i, j) for j in range(1000)).encode())
+            paths.append(path)
+
+        def open_chunks(path):
+            with open(path, 'rb') as f:
+                return [f.read()], get_compression(path)
+
+        rows = [row for _, pieces in DecompressionPipeline(open_chunks, paths, workers=2) for row in iter_csv_rows(pieces, has_header=False)]
+        assert len(rows) == 4000
+        assert rows[0] == ['0', '0'] and rows[-1] == ['3', '999']
+
+    def test_zstd(self):
+        zstandard = pytest.importorskip('zstandard')
+        data = b'1,a\n2,b\n'
+        pipeline = DecompressionPipeline(lambda item: ([zstandard.ZstdCompressor().compress(data)], 'zstd'), ['x.csv.zst'])
+        assert [b''.join(pieces) for _, pieces in pipeline] == [data]
+
+    def test_invalid_settings(self):
+        with pytest.raises(ValueError):
+            DecompressionPipeline(open_plain, [], workers=0)
@@ -0,0 +1,88 @@
+import gzip
+import json
+from odlt.importer import LibraryImport
+from odlt.planner import LoadPlanner
+from odlt.explain import (
+    LOAD_PATH_ARROW, LOAD_PATH_COPY, LOAD_PATH_COPY_S3, LOAD_PATH_IMPORT_TABLE, LOAD_PATH_LOAD_TABLE,
+    ThroughputHistory, TableEstimate, LoadExplanation, get_load_path, sample_rows_per_byte,
+)
+
+
+def make_library(tmpdir):
+    tbldir = tmpdir.mkdir('tables').mkdir('flights')
+    tbldir.join('schema.sql').write('CREATE TABLE flights (id INT, name TEXT);')
+    datadir = tbldir.mkdir('data')
+    datadir.join('part-1.csv').write('id,name\n' + '1,a\n' * 100)
+    datadir.join('part-2.csv.gz').write(gzip.compress(b'id,name\n' + b'2,b\n' * 300), mode='wb')
+    tmpdir.mkdir('views')
+    return str(tmpdir)
+
+
+class TestSampleRowsPerByte(object):
+    def test_plain_file_is_exact(self):
+        data = b'id,name\n' + b'1,a\n' * 10
+        assert sample_rows_per_byte([data[:7], data[7:]]) == 10 / float(len(data))
+
+    def test_compressed_rows_are_counted_per_stored_byte(self):
+        data = gzip.compress(b'1,a\n' * 1000)
+        assert sample_rows_per_byte([data], 'gzip', has_header=False) == 1000 / float(len(data))
+
+    def test_stops_after_the_sample(self):
+        read = []
+
+        def chunks():
+            for i in range(100):
+                read.append(i)
+                yield b'1,a\n' * 4
+        assert sample_rows_per_byte(chunks(), sample_size=32, has_header=False) == 0.25
+        assert len(read) == 2
+
+    def test_empty_file(self):
+        assert sample_rows_per_byte([]) is None
+
+
+class TestThroughputHistory(object):
+    def test_moving_average_is_persisted(self, tmpdir):
+        path = str(tmpdir.join('throughput.json'))
+        history = ThroughputHistory(path)
+        assert history.rate(LOAD_PATH_ARROW) is None
+        history.record(LOAD_PATH_ARROW, 1000, 1.0)
+        history.record(LOAD_PATH_ARROW, 2000, 1.0, weight=0.5)
+        history.record(LOAD_PATH_ARROW, 0, 1.0)
+        history.save()
+        assert ThroughputHistory(path).rate(LOAD_PATH_ARROW) == 1500
+        with open(path) as f:
+            assert json.load(f)[LOAD_PATH_ARROW]['loads'] == 2
+
+
+class TestLoadExplanation(object):
+    def test_load_paths(self):
+        assert get_load_path('local') == LOAD_PATH_IMPORT_TABLE
+        assert get_load_path('s3') == LOAD_PATH_LOAD_TABLE
+        assert get_load_path('local', use_copy_from_qry=True) == LOAD_PATH_COPY
+        assert get_load_path('s3', use_copy_from_qry=True) == LOAD_PATH_COPY_S3
+        assert get_load_path('s3', use_arrow=True) == LOAD_PATH_ARROW
+
+    def test_duration_is_the_busiest_worker_over_the_rate(self):
+        plan = LoadPlanner(small_file_size=0).plan({'a': [('1', 300), ('2', 100)], 'b': [('3', 200)]}, workers=2)
+        explanation = LoadExplanation([TableEstimate('a', 2, 400, rows=40), TableEstimate('b', 1, 200)], LOAD_PATH_ARROW, plan, rate=100.0)
+        assert explanation.seconds == 3.0
+        assert explanation.rows is None
+        assert explanation.to_dict()['files'] == 3
+        assert 'Estimated duration: 3s' in explanation.describe()
+        assert LoadExplanation([], LOAD_PATH_ARROW, plan).seconds is None
+
+
+class TestExplain(object):
+    def test_explain_needs_no_connection(self, tmpdir, throughput_history):
+        path = make_library(tmpdir)
+        history = ThroughputHistory(throughput_history)
+        history.record(LOAD_PATH_IMPORT_TABLE, 10, 1.0)
+        history.save()
+        explanation = LibraryImport().explain(path)
+        table, = explanation.tables
+        assert (table.table, table.files, table.size) == ('flights', 2, explanation.plan.makespan)
+        # the rows per byte of the first file are applied to the table
+        assert table.rows > 0
+        assert explanation.load_path == LOAD_PATH_IMPORT_TABLE
+        assert explanation.seconds == table.size / 10.0
@@ -0,0 +1,70 @@
+from unittest.mock import MagicMock
+from odlt.exporter import LibraryExport, CSVPartWriter, LocalTarget, format_csv_value
+import base64
+import gzip
+import os
+
+
+class TestCSVPartWriter(object):
+    def test_rows_are_split_into_parts(self, tmpdir):
+        writer = CSVPartWriter(LocalTarget(str(tmpdir)), 'tables/flights/data', ['id', 'name'], part_size=1)
+        writer.write_rows([(1, 'a'), (2, None), (3, 'c,d')])
+        parts = writer.close()
+        assert parts == ['tables/flights/data/part-{:05d}.csv.gz'.format(i) for i in range(3)]
+        with gzip.open(str(tmpdir.join(parts[1])), 'rt') as f:
+            assert f.read() == 'id,name\n2,\\N\n'
+        with gzip.open(str(tmpdir.join(parts[2])), 'rt') as f:
+            assert f.read() == 'id,name\n3,"c,d"\n'
+        assert writer.rows == 3
+
+    def test_no_parts_for_empty_table(self, tmpdir):
+        writer = CSVPartWriter(LocalTarget(str(tmpdir)), 'tables/flights/data', ['id'], compression=None)
+        writer.write_rows([])
+        assert writer.close() == []
+
+    def test_abort_leaves_no_partial_files(self, tmpdir):
+        writer = CSVPartWriter(LocalTarget(str(tmpdir)), 'data', ['id'])
+        writer.write_rows([(1,)])
+        writer.abort(ValueError('connection lost'))
+        assert os.listdir(str(tmpdir.join('data'))) == []
+
+    def test_format_csv_value(self):
+        assert format_csv_value(True) == 'true'
+        assert format_csv_value([1, None]) == '{1,\\N}'
+
+
+class TestLibraryExport(object):
+    @staticmethod
+    def mock_connection():
+        conn = MagicMock()
+        conn._client.get_physical_tables.return_value = ['flights']
+        conn._client.get_views.return_value = ['late']
+        conn._client.get_table_details.return_value = MagicMock(view_sql='SELECT * FROM flights WHERE delay > 10')
+        column = MagicMock()
+        column.name = 'id'
+        conn.get_table_details.return_value = [column]
+        dashboard = MagicMock(dashboard_id=1, dashboard_name='delays', dashboard_metadata='{"table": "late"}',
+                              dashboard_state=base64.b64encode(b'{"dashboard": {}}').decode())
+        conn._client.get_dashboards.return_value = [dashboard]
+        conn._client.get_dashboard.return_value = dashboard
+        results = {
+            'SHOW CREATE TABLE flights': [('CREATE TABLE flights (id INTEGER);',)],
+            'SELECT MIN(rowid), MAX(rowid) FROM flights': [(0, 4)],
+            'SELECT * FROM flights WHERE rowid >= 0 AND rowid < 3': [(1,), (2,), (3,)],
+            'SELECT * FROM flights WHERE rowid >= 3 AND rowid < 6': [(4,), (5,)],
+        }
+        cursor = conn.cursor.return_value
+        cursor.execute.side_effect = lambda qry: setattr(cursor, 'rows', results[qry])
+        cursor.__iter__ = lambda self: iter(self.rows)
+        return conn
+
+    def test_export_all_writes_library_layout(self, tmpdir):
+        exp = LibraryExport(conn=self.mock_connection(), page_size=3)
+        exp.export_all(str(tmpdir))
+        assert not exp.errors
+        assert tmpdir.join('tables', 'flights', 'schema.sql').read() == 'CREATE TABLE flights (id INTEGER);\n'
+        with gzip.open(str(tmpdir.join('tables', 'flights', 'data', 'part-00000.csv.gz')), 'rt') as f:
+            assert f.read() == 'id\n1\n2\n3\n4\n5\n'
+        assert tmpdir.join('views', 'late.sql').read() == 'CREATE VIEW late AS SELECT * FROM flights WHERE delay > 10;\n'
+        assert tmpdir.join('dashboards', 'delays.json').read().splitlines() == ['delays', '{"table": "late"}', '{"dashboard": {}}']
+        assert exp.metrics.summary()['export_part']['rows'] == 5
@@ -0,0 +1,65 @@
+from unittest.mock import MagicMock, patch
+from odlt.fanout import FanoutImport
+from odlt.importer import LibraryImport
+
+
+def make_library(tmpdir):
+    tbldir = tmpdir.mkdir('tables').mkdir('flights')
+    tbldir.join('schema.sql').write('CREATE TABLE flights (id INT, name TEXT);')
+    datadir = tbldir.mkdir('data')
+    datadir.join('part-1.csv').write('id,name\n1,a\n2,b\n')
+    datadir.join('part-2.csv').write('id,name\n3,c\n')
+    tmpdir.mkdir('views').join('late.sql').write('CREATE VIEW late AS SELECT * FROM flights;')
+    return str(tmpdir)
+
+
+def connect_to(servers):
+    def connect(**params):
+        return servers.setdefault(params['host'], MagicMock())
+    return connect
+
+
+class TestFanoutImport(object):
+    def test_reads_once_and_loads_every_target(self, tmpdir):
+        path = make_library(tmpdir)
+        servers = {}
+        imp = FanoutImport([{'host': 'eu'}, {'host': 'us'}])
+        with patch('pymapd.connect', side_effect=connect_to(servers)):
+            imp.connect()
+            with patch.object(LibraryImport, 'readfile', side_effect=LibraryImport.readfile, autospec=True) as readfile, \
+                    patch.object(LibraryImport, '_iter_local_file_chunks', side_effect=LibraryImport._iter_local_file_chunks) as read_data:
+                imp.import_all(path, batch_size=2)
+        # index lookup, schema and view, each once
+        assert len(set(call[0][1] for call in readfile.call_args_list)) == readfile.call_count == 3
+        assert read_data.call_count == 2
+        for host in ('eu', 'us'):
+            executed = [call[0][0] for call in servers[host].cursor.return_value.execute.call_args_list]
+            assert executed == ['CREATE TABLE flights (id INT, name TEXT);', 'CREATE VIEW late AS SELECT * FROM flights;']
+            rows = [[value.str_val for value in row.cols] for call in servers[host]._client.load_table.call_args_list for row in call[1]['rows']]
+            assert rows == [['1', 'a'], ['2', 'b'], ['3', 'c']]
+        assert [target.progress() for target in imp.targets] == [{'rows': {'flights': 3}, 'failed_tables': [], 'errors': 0}] * 2
+
+    def test_failing_target_does_not_stop_the_others(self, tmpdir):
+        path = make_library(tmpdir)
+        servers = {'us': MagicMock()}
+        servers['us']._client.load_table.side_effect = ValueError('disk full')
+        imp = FanoutImport([{'host': 'eu'}, {'host': 'us'}], queue_size=1)
+        with patch('pymapd.connect', side_effect=connect_to(servers)):
+            imp.connect()
+            imp.import_all(path, batch_size=1)
+        eu, us = imp.targets
+        assert eu.progress() == {'rows': {'flights': 3}, 'failed_tables': [], 'errors': 0}
+        assert us.progress()['failed_tables'] == ['flights']
+        assert [(error['target'], error['name']) for error in imp.errors] == [('us:9090/mapd', 'flights')]
+
+    def test_table_failing_to_be_created_is_not_loaded(self, tmpdir):
+        path = make_library(tmpdir)
+        servers = {'us': MagicMock()}
+        servers['us'].cursor.return_value.execute.side_effect = ValueError('exists')
+        imp = FanoutImport([{'host': 'eu'}, {'host': 'us'}])
+        with patch('pymapd.connect', side_effect=connect_to(servers)):
+            imp.connect()
+            imp.import_all(path)
+        assert servers['us']._client.load_table.call_count == 0
+        assert sorted(error['name'] for error in imp.targets[1].errors) == ['table:flights', 'view:late']
+        assert imp.targets[0].progress()['rows'] == {'flights': 3}
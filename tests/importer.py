@@ -1,7 +1,11 @@
 from unittest.mock import MagicMock, patch
+from botocore.exceptions import ClientError
 from odlt import LibraryImport
+from odlt.adaptive import AdaptiveController
+from odlt.explain import ThroughputHistory
 import pymapd
 import pytest
+import hashlib
 
 datalibrary = {
     'tables': {
@@ -86,3 +90,451 @@ class TestLocalLibraryImport(object):
         real = self.__class__.initialize_libraryimport()
         real.connect()
         real._import_dashboard('/fakepath')
+
+    @patch('pymapd.connect')
+    def test_parallel_load_collects_errors_per_table(self, mock_connection):
+        real = self.__class__.initialize_libraryimport()
+        real.connect()
+        real._calculate_files_info = MagicMock(return_value={
+            'tables': {
+                'good': {'schema': '', 'data': '/fakepath/tables/good/data'},
+                'bad': {'schema': '', 'data': '/fakepath/tables/bad/data'},
+            },
+            'dashboards': [],
+            'views': []
+        })
+
+        def load_table(conn, tblname, datapath, **kwargs):
+            if tblname == 'bad':
+                raise ValueError('broken data file')
+
+        real._load_tables(load_table, max_workers=2)
+        assert [error['name'] for error in real.errors] == ['bad']
+        # workers borrow pooled connections and hand them back
+        assert mock_connection.call_count <= 2
+        assert real.pool.idle == real.pool.size
+        assert mock_connection.return_value.close.call_count == 0
+
+    @patch('pymapd.connect')
+    def test_decorated_calls_lease_from_pool(self, mock_connection):
+        real = self.__class__.initialize_libraryimport()
+        real.connect(pool_min_size=0)
+        assert real.pool.size == 0
+        real._create_table('ffg')
+        assert real.pool.size == 1
+        assert real.pool.idle == 1
+        assert real._conn is None
+
+    @patch('pymapd.connect')
+    def test_import_graph_dependencies(self, mock_connection):
+        real = self.__class__.initialize_libraryimport()
+        real.connect()
+        real._calculate_files_info = MagicMock(return_value={
+            'tables': {
+                'flights': {'schema': '/fakepath/tables/flights/schema.sql', 'data': '/fakepath/tables/flights/data'},
+                'airports': {'schema': '/fakepath/tables/airports/schema.sql', 'data': ''},
+            },
+            'dashboards': ['/fakepath/dashboards/delays.json'],
+            'views': ['/fakepath/views/late.sql', '/fakepath/views/late_by_airport.sql'],
+        })
+        contents = {
+            '/fakepath/tables/flights/schema.sql': 'CREATE TABLE flights (delay INT, origin TEXT);',
+            '/fakepath/tables/airports/schema.sql': 'CREATE TABLE airports (code TEXT);',
+            '/fakepath/views/late.sql': 'CREATE VIEW late AS SELECT * FROM flights WHERE delay > 0',
+            '/fakepath/views/late_by_airport.sql': 'CREATE VIEW late_by_airport AS SELECT * FROM late l JOIN airports a ON l.origin = a.code',
+            '/fakepath/dashboards/delays.json': 'delays\n{}\n{"dashboard": {"dataSources": {"late_by_airport": {}}}}',
+        }
+        real._get_file_or_obj_content = lambda path: contents[path]
+        dag = real._build_import_graph()
+        assert dag.dependencies('data:flights') == {'table:flights'}
+        assert 'data:airports' not in dag
+        assert dag.dependencies('view:late') == {'table:flights'}
+        assert dag.dependencies('view:late_by_airport') == {'view:late', 'table:airports'}
+        assert dag.dependencies('dashboard:delays') == {'view:late_by_airport'}
+
+    @patch('pymapd.connect')
+    def test_import_all_sync_creates_missing_objects_only(self, mock_connection, tmpdir):
+        real = self.__class__.initialize_libraryimport()
+        real.connect()
+        real._calculate_files_info = MagicMock(return_value={
+            'tables': {
+                'flights': {'schema': '/fakepath/tables/flights/schema.sql', 'data': '/fakepath/tables/flights/data'},
+                'airports': {'schema': '/fakepath/tables/airports/schema.sql', 'data': '/fakepath/tables/airports/data'},
+            },
+            'dashboards': [],
+            'views': [],
+        })
+        contents = {
+            '/fakepath/tables/flights/schema.sql': 'CREATE TABLE flights (delay INT);',
+            '/fakepath/tables/airports/schema.sql': 'CREATE TABLE airports (code TEXT);',
+        }
+        real._get_file_or_obj_content = lambda path: contents[path]
+        client = mock_connection.return_value._client
+        client.get_physical_tables.return_value = ['flights']
+        client.get_views.return_value = []
+        client.get_dashboards.return_value = []
+        real._load_table_data = MagicMock()
+        state_path = str(tmpdir.join('state.json'))
+        real.import_all('/fakepath', max_workers=None, sync=True, sync_state_path=state_path)
+        executed = [call[0][0] for call in mock_connection.return_value.cursor.return_value.execute.call_args_list]
+        assert executed == ['CREATE TABLE airports (code TEXT);']
+        assert [call[0][0] for call in real._load_table_data.call_args_list] == ['airports']
+
+        client.get_physical_tables.return_value = ['flights', 'airports']
+        assert real.plan_sync('/fakepath', state_path=state_path).get('table', 'airports').reason == 'unchanged'
+
+    @patch('pymapd.connect')
+    def test_import_all_collects_errors_and_skips_dependents(self, mock_connection):
+        real = self.__class__.initialize_libraryimport()
+        real.connect()
+        real._initialize_localpath = MagicMock(return_value=True)
+        real._build_import_graph = MagicMock()
+        graph = real._build_import_graph.return_value
+
+        def run(max_workers, on_error):
+            on_error('table:footable', ValueError('bad ddl'))
+            return {'completed': [], 'failed': {}, 'skipped': ['data:footable']}
+
+        graph.run.side_effect = run
+        assert real.import_all('/fakepath', max_workers=4) == True
+        assert graph.run.call_args[1]['max_workers'] == 4
+        assert [error['name'] for error in real.errors] == ['table:footable', 'data:footable']
+
+    @patch('pymapd.connect')
+    def test_import_all_handles_load_options(self, mock_connection, tmpdir):
+        datadir = tmpdir.mkdir('tables').mkdir('footable').mkdir('data')
+        datadir.join('1.csv').write('id\n1\n2\n')
+        real = self.__class__.initialize_libraryimport()
+        real.connect()
+        real._calculate_files_info = MagicMock(return_value={
+            'tables': {'footable': {'schema': '/fakepath/schema.sql', 'data': str(datadir)}}, 'dashboards': [], 'views': [],
+        })
+        real._get_file_or_obj_content = lambda path: 'CREATE TABLE footable (id INT);'
+        conn = mock_connection.return_value
+        conn.cursor.return_value.__iter__ = lambda self: iter([(1,)])
+        column = MagicMock()
+        column.name = 'id'
+        conn.get_table_details.return_value = [column]
+        real.import_all('/fakepath', max_workers=None, plan=True, watermarks={'footable': 'id'},
+                        manifest_path=str(tmpdir.join('manifest.json')))
+        assert real.errors == []
+        executed = [call[0][0] for call in conn.cursor.return_value.execute.call_args_list]
+        assert executed[0] == 'CREATE TABLE footable (id INT);'
+        rows = [[value.str_val for value in row.cols] for row in conn._client.load_table.call_args[1]['rows']]
+        assert rows == [['2']]
+        assert real.metrics.summary()['load_task']['events'] == 1
+        assert real.manifest.watermark('footable')['column'] == 'id'
+
+    @patch('pymapd.connect')
+    def test_import_all_rejects_unknown_options(self, mock_connection):
+        real = self.__class__.initialize_libraryimport()
+        real.connect()
+        real._build_import_graph = MagicMock()
+        with pytest.raises(ValueError):
+            real.import_all('/fakepath', use_copy_from_query=True)
+        assert not real._build_import_graph.called
+
+    @patch('pymapd.connect')
+    def test_stream_s3_object_in_batches(self, mock_connection):
+        real = self.__class__.initialize_libraryimport()
+        conn = MagicMock()
+        obj = MagicMock()
+        obj.key = 'lib/tables/footable/data/part-1.csv'
+        data = b'id\n1\n2\n\\N\n3\n4\n5\n6\n'
+        obj.size = len(data)
+        obj.get.return_value = {'Body': MagicMock(read=MagicMock(return_value=data))}
+        assert real._stream_s3_object(conn, 'footable', obj, batch_size=4) == 7
+        calls = conn._client.load_table.call_args_list
+        assert [len(call[1]['rows']) for call in calls] == [4, 3]
+        assert calls[0][1]['rows'][2].cols[0].is_null == True
+
+    def test_resume_skips_loaded_files(self, tmpdir):
+        datadir = tmpdir.mkdir('tables').mkdir('footable').mkdir('data')
+        for name in ('1.csv', '2.csv', '3.csv'):
+            datadir.join(name).write('a\n1\n')
+        real = self.__class__.initialize_libraryimport()
+        real._path = str(tmpdir)
+        real._open_manifest(manifest_path=str(tmpdir.join('manifest.json')))
+        files = real._list_data_files(str(datadir))
+
+        def fail_on_third(conn, tblname, path):
+            if path.endswith('3.csv'):
+                raise ValueError('connection lost')
+            return 1
+
+        with pytest.raises(ValueError):
+            real._load_data_files(None, 'footable', files, fail_on_third)
+        statuses = {key: entry['status'] for key, entry in real.manifest.files('footable').items()}
+        assert statuses == {'tables/footable/data/1.csv': 'loaded', 'tables/footable/data/2.csv': 'loaded', 'tables/footable/data/3.csv': 'failed'}
+
+        assert real.metrics.summary()['load_file'] == {
+            'events': 3, 'errors': 1, 'seconds': pytest.approx(real.metrics.summary()['load_file']['seconds']),
+            'bytes': 12, 'rows': 2, 'retries': 0, 'queue_wait': 0,
+        }
+
+        loaded = []
+        real._open_manifest(resume=True, manifest_path=str(tmpdir.join('manifest.json')))
+        real._load_data_files(None, 'footable', files, lambda conn, tblname, path: loaded.append(path))
+        assert loaded == [str(datadir.join('3.csv'))]
+
+
+    def test_incremental_load_filters_rows_above_watermark(self, tmpdir):
+        datadir = tmpdir.mkdir('tables').mkdir('footable').mkdir('data')
+        datadir.join('1.csv').write('id,name\n1,a\n2,b\n')
+        real = self.__class__.initialize_libraryimport()
+        real._path = str(tmpdir)
+        conn = MagicMock()
+        conn.cursor.return_value.__iter__ = lambda self: iter([(2,)])
+        columns = [MagicMock(), MagicMock()]
+        columns[0].name, columns[1].name = 'id', 'name'
+        conn.get_table_details.return_value = columns
+        real._conn = conn
+        real._open_manifest(resume=True, manifest_path=str(tmpdir.join('manifest.json')))
+        files = real._list_data_files(str(datadir))
+        real._load_data_files(conn, 'footable', files, lambda conn, tblname, path: 2)
+
+        datadir.join('2.csv').write('id,name\n2,b\n3,c\n4,\\N\n')
+        real.refresh()
+        real._prepare_watermarks({'footable': 'id'})
+        real._load_data_files(conn, 'footable', real._list_data_files(str(datadir)), None)
+        rows = [[value.str_val for value in row.cols] for row in conn._client.load_table.call_args[1]['rows']]
+        assert rows == [['3', 'c'], ['4', '\\N']]
+        assert real.manifest.get('footable', 'tables/footable/data/2.csv')['rows'] == 2
+        real._record_watermarks()
+        assert real.manifest.watermark('footable')['value'] == '2'
+
+    @patch('pymapd.connect')
+    def test_copy_load_filters_watermark_tables_client_side(self, mock_connection, tmpdir):
+        datadir = tmpdir.mkdir('tables').mkdir('footable').mkdir('data')
+        datadir.join('1.csv').write('id\n1\n2\n3\n')
+        real = self.__class__.initialize_libraryimport()
+        real.connect()
+        real._calculate_files_info = MagicMock(return_value={
+            'tables': {'footable': {'schema': '', 'data': str(datadir)}}, 'dashboards': [], 'views': [],
+        })
+        conn = mock_connection.return_value
+        conn.cursor.return_value.__iter__ = lambda self: iter([(2,)])
+        column = MagicMock()
+        column.name = 'id'
+        conn.get_table_details.return_value = [column]
+        real.load_data('/fakepath', use_copy_from_qry=True, watermarks={'footable': 'id'})
+        executed = [call[0][0] for call in conn.cursor.return_value.execute.call_args_list]
+        assert not any(query.startswith('COPY') for query in executed)
+        rows = [[value.str_val for value in row.cols] for row in conn._client.load_table.call_args[1]['rows']]
+        assert rows == [['3']]
+
+    @patch('pymapd.connect')
+    def test_resume_after_partially_loaded_group(self, mock_connection, tmpdir):
+        datadir = tmpdir.mkdir('tables').mkdir('footable').mkdir('data')
+        for name in ('1.csv', '2.csv', '3.csv'):
+            datadir.join(name).write('a\n1\n')
+        real = self.__class__.initialize_libraryimport()
+        real.connect()
+        real._path = str(tmpdir)
+        real._calculate_files_info = MagicMock(return_value={
+            'tables': {'footable': {'schema': '', 'data': str(datadir)}}, 'dashboards': [], 'views': [],
+        })
+        client = mock_connection.return_value._client
+
+        def import_table(file_name, **kwargs):
+            if file_name.endswith('3.csv'):
+                raise ValueError('connection lost')
+
+        client.import_table.side_effect = import_table
+        manifest_path = str(tmpdir.join('manifest.json'))
+        with pytest.raises(ValueError):
+            real.load_data(str(tmpdir), plan=True, manifest_path=manifest_path)
+        assert real.metrics.summary()['load_files']['events'] == 1
+        statuses = {key: entry['status'] for key, entry in real.manifest.files('footable').items()}
+        assert statuses == {'tables/footable/data/1.csv': 'loaded', 'tables/footable/data/2.csv': 'loaded', 'tables/footable/data/3.csv': 'failed'}
+
+        client.import_table.reset_mock()
+        client.import_table.side_effect = None
+        real.load_data(str(tmpdir), plan=True, resume=True, manifest_path=manifest_path)
+        assert [call[1]['file_name'] for call in client.import_table.call_args_list] == [str(datadir.join('3.csv'))]
+
+    @patch('pymapd.connect')
+    def test_adaptive_load_passes_controlled_threads(self, mock_connection, tmpdir):
+        datadir = tmpdir.mkdir('tables').mkdir('footable').mkdir('data')
+        for name in ('1.csv', '2.csv'):
+            datadir.join(name).write('a\n1\n' * 1000)
+        real = self.__class__.initialize_libraryimport()
+        real.connect()
+        real._calculate_files_info = MagicMock(return_value={
+            'tables': {'footable': {'schema': '', 'data': str(datadir)}}, 'dashboards': [], 'views': [],
+        })
+        real.load_planner.small_file_size = 0
+        controller = AdaptiveController(initial_limit=1, max_limit=1, max_threads=4)
+        real.load_data('/fakepath', parallel=True, adaptive=controller, threads=4)
+        calls = mock_connection.return_value._client.import_table.call_args_list
+        assert sorted(call[1]['file_name'] for call in calls) == [str(datadir.join('1.csv')), str(datadir.join('2.csv'))]
+        assert all(call[1]['copy_params'].threads == 4 for call in calls)
+        assert real.metrics.summary()['load_task']['events'] == 2
+
+    @patch('pymapd.connect')
+    def test_load_records_its_throughput(self, mock_connection, tmpdir, throughput_history):
+        datadir = tmpdir.mkdir('tables').mkdir('footable').mkdir('data')
+        datadir.join('1.csv').write('a\n1\n')
+        real = self.__class__.initialize_libraryimport()
+        real.connect()
+        real._calculate_files_info = MagicMock(return_value={
+            'tables': {'footable': {'schema': '', 'data': str(datadir)}}, 'dashboards': [], 'views': [],
+        })
+        mock_connection.return_value._client.import_table.side_effect = ValueError('disk full')
+        real.load_data('/fakepath', parallel=True)
+        assert real.errors
+        assert ThroughputHistory(throughput_history).rate('import_table') is None
+        mock_connection.return_value._client.import_table.side_effect = None
+        real.load_data('/fakepath')
+        assert ThroughputHistory(throughput_history).rate('import_table') > 0
+
+
+class FakeObjectSummary(object):
+    def __init__(self, bucket_name, key):
+        self.key = key
+        self.meta = MagicMock(data=None)
+
+    @property
+    def size(self):
+        return self.meta.data['Size']
+
+    @property
+    def e_tag(self):
+        return self.meta.data['ETag']
+
+
+class TestS3LibraryDiscovery(object):
+    keys = [
+        'lib/tables/flights/schema.sql',
+        'lib/tables/flights/data/part-1.csv.gz',
+        'lib/tables/flights/data/part-2.csv.gz',
+        'lib/tables/nodata/schema.sql',
+        'lib/tables/noschema/data/part-1.csv',
+        'lib/views/late.sql',
+        'lib/dashboards/delays.json',
+    ]
+
+    def paginate(self, Bucket, Prefix, Delimiter=None):
+        contents, prefixes = [], set()
+        for key in self.keys:
+            if not key.startswith(Prefix):
+                continue
+            rest = key[len(Prefix):]
+            if Delimiter and Delimiter in rest:
+                prefixes.add(Prefix + rest.split(Delimiter)[0] + Delimiter)
+            else:
+                contents.append({'Key': key, 'Size': 10, 'ETag': '"etag"'})
+        self.listed.append((Prefix, Delimiter))
+        return [{'Contents': contents, 'CommonPrefixes': [{'Prefix': p} for p in sorted(prefixes)]}]
+
+    def initialize_libraryimport(self):
+        self.listed = []
+        real = LibraryImport()
+        real._source = 's3'
+        real._bucket_name = 'bucket'
+        real._datalibrary_path = 'lib'
+        real._bucket = MagicMock()
+        real._bucket.meta.client.get_paginator.return_value.paginate.side_effect = self.paginate
+        real._bucket.Object.return_value.get.side_effect = ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+        real._s3 = MagicMock()
+        real._s3.ObjectSummary.side_effect = FakeObjectSummary
+        return real
+
+    def test_discovery_lists_top_level_only(self):
+        real = self.initialize_libraryimport()
+        data = real.datalibrary
+        assert sorted(data['tables']) == ['flights', 'nodata']
+        assert data['tables']['flights']['schema'].key == 'lib/tables/flights/schema.sql'
+        assert data['tables']['flights']['data'] == 'lib/tables/flights/data'
+        assert [obj.key for obj in data['views']] == ['lib/views/late.sql']
+        assert [obj.key for obj in data['dashboards']] == ['lib/dashboards/delays.json']
+        assert all(delimiter == '/' for _, delimiter in self.listed)
+
+    def test_data_files_listed_once_on_demand(self):
+        real = self.initialize_libraryimport()
+        datapath = real.datalibrary['tables']['flights']['data']
+        files = real._list_data_files(datapath)
+        real._list_data_files(datapath)
+        assert [obj.key for obj in files] == ['lib/tables/flights/data/part-1.csv.gz', 'lib/tables/flights/data/part-2.csv.gz']
+        assert self.listed.count(('lib/tables/flights/data/', None)) == 1
+
+    def test_index_replaces_listing(self):
+        real = self.initialize_libraryimport()
+        index = real.write_index('s3://bucket/lib')
+        assert index['tables']['flights']['data'][0] == {'path': 'tables/flights/data/part-1.csv.gz', 'size': 10, 'etag': '"etag"'}
+        body = real._bucket.put_object.call_args[1]['Body']
+        assert real._bucket.put_object.call_args[1]['Key'] == 'lib/odlt-index.json'
+
+        self.listed = []
+        real.refresh()
+        real._bucket.Object.return_value.get.side_effect = None
+        real._bucket.Object.return_value.get.return_value = {'Body': MagicMock(read=MagicMock(return_value=body))}
+        data = real.datalibrary
+        files = real._list_data_files(data['tables']['flights']['data'])
+        assert [obj.key for obj in files] == ['lib/tables/flights/data/part-1.csv.gz', 'lib/tables/flights/data/part-2.csv.gz']
+        assert files[0].meta.data == {'Key': 'lib/tables/flights/data/part-1.csv.gz', 'Size': 10, 'ETag': '"etag"'}
+        assert data['tables']['nodata']['data'] == ''
+        assert self.listed == []
+
+    def test_copy_from_s3_is_pushed_down_to_the_server(self):
+        real = self.initialize_libraryimport()
+        real._s3_access_key, real._s3_secret_key = 'key', 'secret'
+        real._bucket.meta.client.get_bucket_location.return_value = {'LocationConstraint': 'eu-west-1'}
+        conn = MagicMock()
+        real._load_table_using_copy_from_query(conn, 'flights', 'lib/tables/flights/data', from_s3=True, delimiter='|')
+        assert conn.cursor.return_value.execute.call_args[0][0] == (
+            "COPY flights from 's3://bucket/lib/tables/flights/data/' "
+            "WITH (delimiter='|', s3_region='eu-west-1', s3_access_key='key', s3_secret_key='secret')"
+        )
+
+        files = real._list_data_files('lib/tables/flights/data')
+        real._load_files_using_copy_from_query(conn, 'flights', files[1:])
+        assert conn.cursor.return_value.execute.call_args[0][0].startswith("COPY flights from 's3://bucket/lib/tables/flights/data/part-2.csv.gz'")
+        assert real._bucket.meta.client.get_bucket_location.call_count == 1
+
+
+class TestLocalLibraryIndex(object):
+    def test_local_index_is_read_and_cached(self, tmpdir):
+        tables = tmpdir.mkdir('tables')
+        flights = tables.mkdir('flights')
+        flights.join('schema.sql').write('CREATE TABLE flights (a INT);')
+        flights.mkdir('data').join('part-1.csv').write('a\n1\n')
+        tmpdir.mkdir('views').join('late.sql').write('CREATE VIEW late AS SELECT * FROM flights;')
+        real = LibraryImport()
+        index = real.write_index(str(tmpdir))
+        assert index['tables']['flights']['data'][0] == {'path': 'tables/flights/data/part-1.csv', 'size': 4, 'md5': hashlib.md5(b'a\n1\n').hexdigest()}
+        assert tmpdir.join('odlt-index.json').check()
+
+        real = LibraryImport()
+        real._initialize_localpath(str(tmpdir))
+        with patch('glob.glob') as mock_glob:
+            data = real.datalibrary
+            files = real._list_data_files(data['tables']['flights']['data'])
+            real._initialize_localpath(str(tmpdir))
+            assert real.datalibrary is data
+        assert mock_glob.call_count == 0
+        assert data['tables']['flights']['schema'] == str(flights.join('schema.sql'))
+        assert files == [str(flights.join('data', 'part-1.csv'))]
+        assert data['views'] == [str(tmpdir.join('views', 'late.sql'))]
+
+    def test_run_load_plan_loads_coalesced_tasks_together(self, tmpdir):
+        datadir = tmpdir.mkdir('tables').mkdir('footable').mkdir('data')
+        datadir.join('big.csv').write('x' * 100)
+        for name in ('1.csv', '2.csv'):
+            datadir.join(name).write('a\n')
+        real = LibraryImport()
+        real._initialize_localpath(str(tmpdir))
+        real._calculate_files_info = MagicMock(return_value={
+            'tables': {'footable': {'schema': '', 'data': str(datadir)}}, 'views': [], 'dashboards': []
+        })
+        real.load_planner.small_file_size = 10
+        plan = real.plan_load(str(tmpdir), max_workers=2)
+        assert [len(task.files) for task in plan.tasks] == [1, 2]
+        assert [task.size for task in plan.tasks] == [100, 4]
+
+        single, grouped = [], []
+        real._run_load_plan(plan, lambda conn, tblname, path: single.append(path), lambda conn, tblname, paths, on_loaded: grouped.append(paths))
+        real.load_planner.small_file_size = 1000
+        real._run_load_plan(real.plan_load(str(tmpdir)), lambda conn, tblname, path: single.append(path), lambda conn, tblname, paths, on_loaded: grouped.append(paths))
+        assert single == [str(datadir.join('big.csv'))]
+        assert grouped == [[str(datadir.join('1.csv')), str(datadir.join('2.csv'))], sorted(str(p) for p in datadir.listdir())]
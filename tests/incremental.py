@@ -0,0 +1,28 @@
+from unittest.mock import MagicMock
+from odlt.incremental import get_watermark, get_value_parser, iter_rows_above_watermark, filter_arrow_batch
+import datetime
+import pytest
+
+
+class TestIncremental(object):
+    def test_get_watermark(self):
+        conn = MagicMock()
+        conn.cursor.return_value.__iter__ = lambda self: iter([(42,)])
+        assert get_watermark(conn, 'flights', 'id') == 42
+        conn.cursor.return_value.execute.assert_called_with('SELECT MAX(id) FROM flights')
+
+    def test_value_parser_follows_watermark_type(self):
+        assert get_value_parser(1)('10') == 10
+        assert get_value_parser(1.5)('2.5') == 2.5
+        assert get_value_parser(datetime.datetime(2019, 1, 1))('2019-01-02 10:00:00') == datetime.datetime(2019, 1, 2, 10)
+        assert get_value_parser(datetime.date(2019, 1, 1))('2019-01-02') == datetime.date(2019, 1, 2)
+
+    def test_rows_above_watermark(self):
+        rows = [['1', 'a'], ['5', 'b'], ['\\N', 'c'], ['x', 'd'], ['10', 'e']]
+        assert list(iter_rows_above_watermark(rows, 0, 4)) == [['5', 'b'], ['10', 'e']]
+        assert list(iter_rows_above_watermark(rows, 0, None)) == rows
+
+    def test_filter_arrow_batch(self):
+        pa = pytest.importorskip('pyarrow')
+        batch = pa.RecordBatch.from_arrays([pa.array([1, None, 5, 10]), pa.array(['a', 'b', 'c', 'd'])], names=['id', 'name'])
+        assert filter_arrow_batch(batch, 'id', 4).column(1).to_pylist() == ['c', 'd']
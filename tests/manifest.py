@@ -0,0 +1,61 @@
+from odlt.manifest import LoadManifest, get_default_manifest_path, STATUS_LOADING, STATUS_LOADED, STATUS_FAILED
+import os
+
+
+class TestLoadManifest(object):
+    def test_persists_entries(self, tmpdir):
+        path = str(tmpdir.join('manifest.json'))
+        manifest = LoadManifest(path)
+        manifest.update('flights', 'tables/flights/data/1.csv', STATUS_LOADED, rows=10, size=100, mtime=1.0)
+        manifest.flush()
+        reopened = LoadManifest(path)
+        entry = reopened.get('flights', 'tables/flights/data/1.csv')
+        assert entry['status'] == STATUS_LOADED
+        assert entry['rows'] == 10
+        assert [name for name in os.listdir(str(tmpdir))] == ['manifest.json']
+
+    def test_loading_markers_are_written_in_batches(self, tmpdir):
+        path = str(tmpdir.join('manifest.json'))
+        manifest = LoadManifest(path, flush_every=3, flush_interval=3600)
+        manifest.update('flights', 'a.csv', STATUS_LOADING)
+        manifest.update('flights', 'b.csv', STATUS_LOADING)
+        assert not os.path.exists(path)
+        manifest.update('flights', 'c.csv', STATUS_LOADING)
+        assert sorted(LoadManifest(path).files('flights')) == ['a.csv', 'b.csv', 'c.csv']
+        manifest.update('flights', 'd.csv', STATUS_LOADING)
+        assert 'd.csv' not in LoadManifest(path).files('flights')
+        manifest.flush()
+        assert LoadManifest(path).get('flights', 'd.csv')['status'] == STATUS_LOADING
+
+    def test_finished_files_are_written_right_away(self, tmpdir):
+        path = str(tmpdir.join('manifest.json'))
+        manifest = LoadManifest(path, flush_every=100, flush_interval=3600)
+        manifest.update('flights', 'a.csv', STATUS_LOADING)
+        manifest.update('flights', 'b.csv', STATUS_LOADING)
+        assert not os.path.exists(path)
+        manifest.update('flights', 'a.csv', STATUS_LOADED, rows=10)
+        manifest.update('flights', 'b.csv', STATUS_FAILED)
+        # nothing is flushed, as after a hard kill
+        reopened = LoadManifest(path)
+        assert reopened.get('flights', 'a.csv')['status'] == STATUS_LOADED
+        assert reopened.get('flights', 'b.csv')['status'] == STATUS_FAILED
+
+    def test_is_loaded_compares_signature(self, tmpdir):
+        manifest = LoadManifest(str(tmpdir.join('manifest.json')))
+        manifest.update('flights', 'a.csv', STATUS_LOADED, size=100, etag='"abc"')
+        manifest.update('flights', 'b.csv', STATUS_FAILED, size=100, etag='"def"')
+        assert manifest.is_loaded('flights', 'a.csv', size=100, etag='"abc"')
+        assert not manifest.is_loaded('flights', 'a.csv', size=100, etag='"changed"')
+        assert not manifest.is_loaded('flights', 'b.csv', size=100, etag='"def"')
+        assert not manifest.is_loaded('flights', 'c.csv', size=100, etag='"ghi"')
+
+    def test_reset(self, tmpdir):
+        manifest = LoadManifest(str(tmpdir.join('manifest.json')))
+        manifest.update('flights', 'a.csv', STATUS_LOADED)
+        manifest.update('airports', 'b.csv', STATUS_LOADED)
+        manifest.reset('flights')
+        assert list(manifest.tables()) == ['airports']
+
+    def test_default_path(self):
+        assert get_default_manifest_path('/lib', 'localhost') == get_default_manifest_path('/lib', 'localhost')
+        assert get_default_manifest_path('/lib', 'localhost') != get_default_manifest_path('/lib', 'otherhost')
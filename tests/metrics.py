@@ -0,0 +1,65 @@
+from odlt.metrics import Metrics, JSONLinesSink, PrometheusTextfileSink
+import json
+import time
+import pytest
+
+
+class TestMetrics(object):
+    def test_span_records_duration_and_counts(self):
+        events = []
+        metrics = Metrics(sinks=[events.append])
+        with metrics.span('load_file', name='a.csv', table='flights', size=100) as span:
+            span.rows = 10
+            span.retries = 1
+        assert len(events) == 1
+        assert events[0]['phase'] == 'load_file'
+        assert events[0]['bytes'] == 100
+        assert events[0]['rows'] == 10
+        assert events[0]['duration'] >= 0
+        assert metrics.summary()['load_file']['retries'] == 1
+
+    def test_span_records_error_and_queue_wait(self):
+        events = []
+        metrics = Metrics(sinks=[events.append])
+        with pytest.raises(ValueError):
+            with metrics.span('load_task', table='flights', queued_at=time.perf_counter() - 1):
+                raise ValueError('connection lost')
+        assert events[0]['error'] == 'ValueError: connection lost'
+        assert events[0]['queue_wait'] >= 1
+        assert metrics.summary()['load_task']['errors'] == 1
+
+    def test_failing_sink_does_not_break_import(self):
+        events = []
+
+        def broken(event):
+            raise IOError('disk full')
+
+        metrics = Metrics(sinks=[broken, events.append])
+        with metrics.span('fetch'):
+            pass
+        assert len(events) == 1
+
+    def test_json_lines_sink(self, tmpdir):
+        path = str(tmpdir.join('events.jsonl'))
+        metrics = Metrics(sinks=[JSONLinesSink(path)])
+        with metrics.span('fetch', name='a.sql', size=5):
+            pass
+        with metrics.span('create_table', name='a.sql'):
+            pass
+        metrics.close()
+        with open(path) as f:
+            events = [json.loads(line) for line in f]
+        assert [event['phase'] for event in events] == ['fetch', 'create_table']
+
+    def test_prometheus_textfile_sink(self, tmpdir):
+        path = str(tmpdir.join('odlt.prom'))
+        metrics = Metrics(sinks=[PrometheusTextfileSink(path, interval=3600)])
+        for rows in (10, 20):
+            with metrics.span('load_file', table='flights', size=100) as span:
+                span.rows = rows
+        metrics.flush()
+        with open(path) as f:
+            content = f.read()
+        assert '# TYPE odlt_rows_total counter' in content
+        assert 'odlt_rows_total{phase="load_file",table="flights"} 30' in content
+        assert 'odlt_bytes_total{phase="load_file",table="flights"} 200' in content
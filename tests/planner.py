@@ -0,0 +1,39 @@
+from odlt.planner import LoadPlanner
+
+MB = 1024 * 1024
+
+
+class TestLoadPlanner(object):
+    def test_coalesces_small_files_per_table(self):
+        planner = LoadPlanner(small_file_size=10 * MB, max_group_size=25 * MB)
+        plan = planner.plan({
+            'flights': [('f1', 100 * MB), ('f2', 1 * MB), ('f3', 2 * MB), ('f4', 3 * MB)],
+            'airports': [('a1', 8 * MB), ('a2', 9 * MB), ('a3', 9 * MB)],
+        })
+        groups = sorted((task.table, task.files) for task in plan.tasks)
+        assert groups == [
+            ('airports', ['a1', 'a2']),
+            ('airports', ['a3']),
+            ('flights', ['f1']),
+            ('flights', ['f2', 'f3', 'f4']),
+        ]
+
+    def test_single_task_covers_table(self):
+        plan = LoadPlanner().plan({'flights': [('f1', 1), ('f2', 2)]})
+        assert len(plan.tasks) == 1
+        assert plan.tasks[0].complete
+        assert plan.tasks[0].coalesced
+
+    def test_longest_first_across_workers(self):
+        planner = LoadPlanner(small_file_size=1)
+        plan = planner.plan({'t': [('a', 5), ('b', 7), ('c', 3), ('d', 4), ('e', 8)]}, workers=2)
+        assert [task.size for task in plan.tasks] == [8, 7, 5, 4, 3]
+        assert sorted(plan.worker_sizes) == [12, 15]
+        assert plan.makespan == 15
+        assert plan.to_dict()['total_size'] == 27
+        assert '5 load tasks' in plan.describe()
+
+    def test_empty_tables_are_ignored(self):
+        plan = LoadPlanner().plan({'empty': []}, workers=4)
+        assert plan.tasks == []
+        assert plan.makespan == 0
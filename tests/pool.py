@@ -0,0 +1,68 @@
+from unittest.mock import MagicMock
+from odlt.pool import ConnectionPool
+import pytest
+
+
+def make_pool(**kwargs):
+    connect = MagicMock(side_effect=lambda: MagicMock())
+    return connect, ConnectionPool(connect, **kwargs)
+
+
+class TestConnectionPool(object):
+    def test_opens_min_size_connections(self):
+        connect, pool = make_pool(min_size=2, max_size=4)
+        assert connect.call_count == 2
+        assert pool.size == 2
+        assert pool.idle == 2
+
+    def test_invalid_sizes(self):
+        with pytest.raises(ValueError):
+            ConnectionPool(MagicMock(), min_size=3, max_size=2)
+
+    def test_borrowed_connection_is_reused(self):
+        connect, pool = make_pool(min_size=0, max_size=2)
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+        assert first is second
+        assert connect.call_count == 1
+
+    def test_acquire_times_out_when_exhausted(self):
+        _, pool = make_pool(min_size=1, max_size=1)
+        conn = pool.acquire()
+        with pytest.raises(TimeoutError):
+            pool.acquire(timeout=0.01)
+        pool.release(conn)
+        assert pool.acquire(timeout=0.01) is conn
+
+    def test_failed_connection_gets_reauthenticated(self):
+        _, pool = make_pool(min_size=1, max_size=1, health_check_interval=3600)
+        with pytest.raises(RuntimeError):
+            with pool.connection() as conn:
+                raise RuntimeError('session expired')
+        conn._client.get_server_status.side_effect = [Exception('invalid session'), None]
+        assert pool.acquire() is conn
+        conn._client.connect.assert_called_once_with(conn._user, conn._password, conn._dbname)
+
+    def test_dead_connection_gets_replaced(self):
+        connect, pool = make_pool(min_size=1, max_size=1, health_check_interval=0)
+        conn = pool.acquire()
+        conn._client.get_server_status.side_effect = Exception('connection refused')
+        pool.release(conn)
+        replacement = pool.acquire()
+        assert replacement is not conn
+        assert conn.close.call_count == 1
+        assert connect.call_count == 2
+        assert pool.size == 1
+
+    def test_close(self):
+        _, pool = make_pool(min_size=2, max_size=2)
+        borrowed = pool.acquire()
+        pool.close()
+        assert pool.size == 1
+        pool.release(borrowed)
+        assert pool.size == 0
+        assert borrowed.close.call_count == 1
+        with pytest.raises(ValueError):
+            pool.acquire()
@@ -0,0 +1,47 @@
+from odlt.prefetch import PrefetchReader
+import time
+import threading
+import pytest
+
+
+class TestPrefetchReader(object):
+    def test_preserves_order(self):
+        def fetch(item):
+            time.sleep(0.01 * (5 - item))
+            return item * 10
+        assert list(PrefetchReader(fetch, range(5), window=3)) == [(i, i * 10) for i in range(5)]
+
+    def test_bounded_in_flight_window(self):
+        lock = threading.Lock()
+        state = {'in_flight': 0, 'max': 0}
+
+        def fetch(item):
+            with lock:
+                state['in_flight'] += 1
+                state['max'] = max(state['max'], state['in_flight'])
+            time.sleep(0.01)
+            with lock:
+                state['in_flight'] -= 1
+            return item
+
+        assert len(list(PrefetchReader(fetch, range(20), window=4))) == 20
+        assert 1 < state['max'] <= 4
+
+    def test_fetches_run_ahead_of_consumer(self):
+        fetched = []
+        reader = iter(PrefetchReader(lambda item: fetched.append(item) or item, range(10), window=3))
+        next(reader)
+        time.sleep(0.05)
+        assert len(fetched) >= 3
+
+    def test_failed_fetch_raises_at_its_item(self):
+        def fetch(item):
+            if item == 2:
+                raise IOError('access denied')
+            return item
+
+        consumed = []
+        with pytest.raises(IOError):
+            for item, _ in PrefetchReader(fetch, range(5), window=2):
+                consumed.append(item)
+        assert consumed == [0, 1]
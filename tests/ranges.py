@@ -0,0 +1,111 @@
+import pytest
+from functools import partial
+from unittest.mock import MagicMock, patch
+from odlt.importer import LibraryImport
+from odlt.ranges import is_splittable, read_local_range, get_record_ranges, iter_range_chunks
+
+
+def write_data(tmpdir, rows=100):
+    path = tmpdir.join('data.csv')
+    path.write('id,name\n' + ''.join('{},name-{}\n'.format(i, i * 7) for i in range(rows)))
+    return str(path)
+
+
+def make_library(tmpdir, rows=100):
+    tbldir = tmpdir.mkdir('tables').mkdir('flights')
+    tbldir.join('schema.sql').write('CREATE TABLE flights (id INT, name TEXT);')
+    datadir = tbldir.mkdir('data')
+    write_data(datadir, rows=rows)
+    return str(tmpdir)
+
+
+def loaded_rows(conn):
+    return [[value.str_val for value in row.cols] for call in conn._client.load_table.call_args_list for row in call[1]['rows']]
+
+
+class TestRecordRanges(object):
+    def test_ranges_cover_the_file_at_record_boundaries(self, tmpdir):
+        path = write_data(tmpdir)
+        with open(path, 'rb') as f:
+            content = f.read()
+        read_at = partial(read_local_range, path)
+        ranges = get_record_ranges(read_at, len(content), 100, window=8)
+        assert len(ranges) > 10
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(content)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert end == start and content[start - 1:start] == b'\n'
+        assert b''.join(b''.join(iter_range_chunks(read_at, start, end, chunk_size=7)) for start, end in ranges) == content
+
+    def test_range_ending_on_a_delimiter(self):
+        content = b'aaa\nbbb\n'
+        assert get_record_ranges(lambda offset, length: content[offset:offset + length], len(content), 4) == [(0, 4), (4, 8)]
+
+    def test_only_large_uncompressed_files_are_split(self):
+        assert is_splittable('part-1.csv', 200, 100)
+        assert not is_splittable('part-1.csv', 100, 100)
+        assert not is_splittable('part-1.csv.gz', 200, 100)
+        assert not is_splittable('part-1.csv', 200, None)
+        assert not is_splittable('part-1.csv', 200, 100, quoted=True)
+
+
+class TestRangeLoads(object):
+    @patch('pymapd.connect')
+    def test_large_file_is_loaded_in_ranges(self, mock_connection, tmpdir):
+        path = make_library(tmpdir)
+        imp = LibraryImport(split_size=256, range_workers=3)
+        imp.connect(pool_max_size=4)
+        imp.load_data(path, quoted='false')
+        assert mock_connection.return_value._client.import_table.call_count == 0
+        rows = loaded_rows(mock_connection.return_value)
+        assert sorted(rows, key=lambda row: int(row[0])) == [[str(i), 'name-{}'.format(i * 7)] for i in range(100)]
+        summary = imp.metrics.summary()['load_range']
+        assert summary['events'] > 3 and summary['rows'] == 100
+
+    @patch('odlt.importer.RETRY_BACKOFF', 0)
+    @patch('pymapd.connect')
+    def test_failed_range_resumes_after_the_loaded_rows(self, mock_connection, tmpdir):
+        path = make_library(tmpdir, rows=10)
+        conn = mock_connection.return_value
+        conn._client.load_table.side_effect = [None, ValueError('timeout'), None, None, None]
+        # a single range
+        imp = LibraryImport(split_size=tmpdir.join('tables', 'flights', 'data', 'data.csv').size() - 1)
+        imp.connect()
+        imp.load_data(path, batch_size=4, quoted='false')
+        assert [int(row[0]) for row in loaded_rows(conn)] == [0, 1, 2, 3, 4, 5, 6, 7, 4, 5, 6, 7, 8, 9]
+        assert imp.metrics.summary()['load_range']['retries'] == 1
+        assert imp.metrics.summary()['load_range']['rows'] == 10
+
+    @patch('odlt.importer.RETRY_BACKOFF', 0)
+    @patch('pymapd.connect')
+    def test_range_failing_after_its_retries_fails_the_file(self, mock_connection, tmpdir):
+        path = make_library(tmpdir)
+        mock_connection.return_value._client.load_table.side_effect = ValueError('disk full')
+        imp = LibraryImport(split_size=256, range_retries=1, split_quoted=True)
+        imp.connect()
+        with pytest.raises(ValueError):
+            imp.load_data(path)
+
+    @patch('pymapd.connect')
+    def test_quoted_files_are_not_split(self, mock_connection, tmpdir):
+        path = make_library(tmpdir)
+        imp = LibraryImport(split_size=256)
+        imp.connect()
+        imp.load_data(path)
+        assert mock_connection.return_value._client.import_table.call_count == 1
+        assert mock_connection.return_value._client.load_table.call_count == 0
+
+    @patch('pymapd.connect')
+    def test_arrow_ranges(self, mock_connection, tmpdir):
+        pytest.importorskip('pyarrow')
+        path = make_library(tmpdir)
+        conn = mock_connection.return_value
+        conn.get_table_details.return_value = [MagicMock(type='INT', is_array=False, nullable=True), MagicMock(type='STR', is_array=False, nullable=True)]
+        conn.get_table_details.return_value[0].name = 'id'
+        conn.get_table_details.return_value[1].name = 'name'
+        imp = LibraryImport(split_size=512)
+        imp.connect()
+        with patch('odlt.importer.load_arrow_batch', side_effect=lambda conn, tblname, batch: batch.num_rows) as load:
+            imp.load_data(path, use_arrow=True, quoted=False)
+        ids = sorted(i for call in load.call_args_list for i in call[0][2].column('id').to_pylist())
+        assert ids == list(range(100))
+        assert load.call_count > 1
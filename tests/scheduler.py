@@ -0,0 +1,63 @@
+from odlt.scheduler import DAGScheduler
+import threading
+import pytest
+
+
+class TestDAGScheduler(object):
+    @pytest.mark.parametrize('max_workers', [None, 4])
+    def test_runs_dependencies_first(self, max_workers):
+        calls = []
+        lock = threading.Lock()
+
+        def node(name):
+            def run():
+                with lock:
+                    calls.append(name)
+            return run
+
+        dag = DAGScheduler()
+        dag.add_node('view', node('view'), dependencies=['table_a', 'table_b'])
+        dag.add_node('table_a', node('table_a'))
+        dag.add_node('table_b', node('table_b'))
+        dag.add_node('dashboard', node('dashboard'), dependencies=['view'])
+        result = dag.run(max_workers=max_workers)
+        assert sorted(result['completed']) == ['dashboard', 'table_a', 'table_b', 'view']
+        assert calls.index('view') > calls.index('table_a')
+        assert calls.index('view') > calls.index('table_b')
+        assert calls[-1] == 'dashboard'
+
+    def test_independent_nodes_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+        dag = DAGScheduler()
+        dag.add_node('a', barrier.wait)
+        dag.add_node('b', barrier.wait)
+        assert sorted(dag.run(max_workers=2)['completed']) == ['a', 'b']
+
+    @pytest.mark.parametrize('max_workers', [None, 2])
+    def test_failed_node_skips_dependents(self, max_workers):
+        errors = []
+
+        def fail():
+            raise ValueError('boom')
+
+        dag = DAGScheduler()
+        dag.add_node('table', fail)
+        dag.add_node('data', lambda: None, dependencies=['table'])
+        dag.add_node('view', lambda: None, dependencies=['data'])
+        dag.add_node('other', lambda: None)
+        result = dag.run(max_workers=max_workers, on_error=lambda name, e: errors.append(name))
+        assert result['completed'] == ['other']
+        assert list(result['failed']) == ['table']
+        assert sorted(result['skipped']) == ['data', 'view']
+        assert errors == ['table']
+
+    def test_cycle_and_unknown_dependency(self):
+        dag = DAGScheduler()
+        dag.add_node('a', lambda: None, dependencies=['b'])
+        dag.add_node('b', lambda: None, dependencies=['a'])
+        with pytest.raises(ValueError):
+            dag.run()
+        dag = DAGScheduler()
+        dag.add_node('a', lambda: None, dependencies=['missing'])
+        with pytest.raises(ValueError):
+            dag.order()
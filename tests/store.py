@@ -0,0 +1,26 @@
+from odlt.store import JSONStore
+import os
+import json
+import pytest
+
+
+class TestJSONStore(object):
+    def test_save_replaces_the_file(self, tmpdir):
+        path = str(tmpdir.join('store', 'state.json'))
+        store = JSONStore(path)
+        store._data['a'] = 1
+        store.save()
+        assert JSONStore(path)._data == {'a': 1}
+        assert os.listdir(str(tmpdir.join('store'))) == ['state.json']
+
+    def test_interrupted_save_keeps_the_previous_content(self, tmpdir):
+        path = str(tmpdir.join('state.json'))
+        store = JSONStore(path)
+        store._data['a'] = 1
+        store.save()
+        store._data['b'] = object()
+        with pytest.raises(TypeError):
+            store.save()
+        with open(path) as f:
+            assert json.load(f) == {'a': 1}
+        assert os.listdir(str(tmpdir)) == ['state.json']
@@ -0,0 +1,73 @@
+from odlt.streaming import (
+    ChunkReader, get_compression, iter_s3_object_chunks, iter_decompressed, iter_csv_rows, iter_batches, MAX_DECOMPRESSED_PIECE
+)
+import io
+import bz2
+import gzip
+
+
+class FakeS3Object(object):
+    def __init__(self, key, data):
+        self.key = key
+        self.size = len(data)
+        self._data = data
+        self.ranges = []
+
+    def get(self, Range):
+        start, end = (int(pos) for pos in Range.split('=')[1].split('-'))
+        self.ranges.append((start, end))
+        return {'Body': io.BytesIO(self._data[start:end + 1])}
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestStreaming(object):
+    def test_get_compression(self):
+        assert get_compression('data/part-1.csv.gz') == 'gzip'
+        assert get_compression('data/part-1.CSV.BZ2') == 'bzip2'
+        assert get_compression('data/part-1.csv') is None
+
+    def test_ranged_gets(self):
+        obj = FakeS3Object('data/a.csv', b'x' * 25)
+        assert b''.join(iter_s3_object_chunks(obj, chunk_size=10)) == b'x' * 25
+        assert obj.ranges == [(0, 9), (10, 19), (20, 24)]
+
+    def test_decompress_concatenated_gzip_members(self):
+        data = gzip.compress(b'a,1\n') + gzip.compress(b'b,2\n')
+        assert b''.join(iter_decompressed(split(data, 7), 'gzip')) == b'a,1\nb,2\n'
+
+    def test_decompress_bzip2(self):
+        data = bz2.compress(b'a,1\n' * 100)
+        assert b''.join(iter_decompressed(split(data, 5), 'bzip2')) == b'a,1\n' * 100
+
+    def test_decompressed_pieces_are_bounded(self):
+        raw = b'0' * (MAX_DECOMPRESSED_PIECE * 3)
+        pieces = list(iter_decompressed([gzip.compress(raw)], 'gzip'))
+        assert len(pieces) >= 3
+        assert max(len(piece) for piece in pieces) <= MAX_DECOMPRESSED_PIECE
+        assert b''.join(pieces) == raw
+
+    def test_csv_rows_skip_header_and_keep_quoted_newlines(self):
+        data = b'id,name\n1,"multi\nline"\n2,plain\n'
+        assert list(iter_csv_rows(split(data, 3))) == [['1', 'multi\nline'], ['2', 'plain']]
+        assert list(iter_csv_rows([b'1|a\n'], delimiter='|', has_header=False)) == [['1', 'a']]
+
+    def test_csv_rows_with_a_custom_line_delimiter(self):
+        data = b'id,name;1,"semi;colon";2,new\nline;3,plain'
+        assert list(iter_csv_rows(split(data, 4), line_delim=';')) == [['1', 'semi;colon'], ['2', 'new\nline'], ['3', 'plain']]
+        try:
+            list(iter_csv_rows([b'1,a||2,b'], line_delim='||'))
+        except ValueError:
+            return
+        assert False
+
+    def test_batches(self):
+        assert list(iter_batches(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+    def test_chunk_reader(self):
+        reader = ChunkReader([b'ab', b'', b'cde'])
+        assert reader.read(1) == b'a'
+        assert reader.read() == b'bcde'
+        assert reader.read() == b''
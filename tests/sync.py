@@ -0,0 +1,52 @@
+from unittest.mock import MagicMock
+from odlt.sync import (
+    ServerCatalog, SyncState, diff_objects, get_content_hash, ACTION_CREATE, ACTION_REPLACE, ACTION_SKIP,
+)
+
+
+class TestSync(object):
+    objects = [
+        ('table', 'flights', 'tables/flights/schema.sql', 'CREATE TABLE flights (delay INT);'),
+        ('table', 'airports', 'tables/airports/schema.sql', 'CREATE TABLE airports (code TEXT);'),
+        ('view', 'late', 'views/late.sql', 'CREATE VIEW late AS SELECT * FROM flights WHERE delay > 0'),
+        ('dashboard', 'delays', 'dashboards/delays.json', 'delays\n{}\n{}'),
+    ]
+
+    def test_content_hash_ignores_formatting(self):
+        assert get_content_hash('CREATE TABLE a (\n  x INT\n);') == get_content_hash('CREATE TABLE a ( x INT );')
+        assert get_content_hash('CREATE TABLE a (x INT);') != get_content_hash('CREATE TABLE a (x BIGINT);')
+
+    def test_catalog_is_fetched_with_one_call_per_kind(self):
+        conn = MagicMock()
+        conn._client.get_physical_tables.return_value = ['Flights']
+        conn._client.get_views.return_value = []
+        conn._client.get_dashboards.return_value = [MagicMock(dashboard_name='delays', dashboard_id=3)]
+        catalog = ServerCatalog.fetch(conn)
+        assert catalog.exists('table', 'flights')
+        assert catalog.dashboard_ids('delays') == [3]
+        assert conn._client.get_dashboards.call_count == 1
+
+    def test_diff(self, tmpdir):
+        state = SyncState(str(tmpdir.join('state.json')))
+        state.update('view', 'late', get_content_hash('CREATE VIEW late AS SELECT * FROM flights'))
+        state.update('table', 'flights', get_content_hash(self.objects[0][3]))
+        catalog = ServerCatalog(tables=['flights'], views=['late'], dashboards={'delays': [1, 2]})
+        plan = diff_objects(self.objects, catalog, state)
+        actions = {name: item.action for (kind, name), item in plan.items.items()}
+        assert actions == {'flights': ACTION_SKIP, 'airports': ACTION_CREATE, 'late': ACTION_REPLACE, 'delays': ACTION_SKIP}
+        assert plan.get('dashboard', 'delays').dashboard_ids == [1, 2]
+        plan = diff_objects(self.objects, catalog, state, replace_unknown=True)
+        assert plan.get('dashboard', 'delays').action == ACTION_REPLACE
+
+    def test_changed_table_is_replaced_only_when_enabled(self, tmpdir):
+        state = SyncState(str(tmpdir.join('state.json')))
+        state.update('table', 'flights', get_content_hash('CREATE TABLE flights (delay BIGINT);'))
+        catalog = ServerCatalog(tables=['flights'])
+        assert diff_objects(self.objects[:1], catalog, state).get('table', 'flights').action == ACTION_SKIP
+        assert diff_objects(self.objects[:1], catalog, state, replace_tables=True).get('table', 'flights').action == ACTION_REPLACE
+
+    def test_state_persists(self, tmpdir):
+        state = SyncState(str(tmpdir.join('state.json')))
+        state.update('table', 'Flights', 'abc')
+        state.save()
+        assert SyncState(str(tmpdir.join('state.json'))).get('table', 'flights') == 'abc'
@@ -0,0 +1,152 @@
+import io
+import gzip
+from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
+from odlt.importer import LibraryImport
+from odlt.validate import ColumnSpec, parse_schema, check_value, validate_rows, validate_file, validate_files
+
+SCHEMA = '''
+CREATE TABLE flights (
+  id BIGINT NOT NULL,
+  -- carrier, code
+  carrier TEXT ENCODING DICT(32),
+  delay DECIMAL(5, 2),
+  dep_timestamp TIMESTAMP(0),
+  cancelled BOOLEAN,
+  legs INT[],
+  SHARD KEY (id)
+) WITH (FRAGMENT_SIZE=1000000, SHARD_COUNT=2);
+'''
+
+
+def make_library(tmpdir):
+    tbldir = tmpdir.mkdir('tables').mkdir('flights')
+    tbldir.join('schema.sql').write('CREATE TABLE flights (id INT NOT NULL, name TEXT);')
+    datadir = tbldir.mkdir('data')
+    datadir.join('part-1.csv').write('id,name\n1,a\n2,b\n')
+    datadir.join('part-2.csv').write('id,name\nx,c\n')
+    datadir.join('part-3.csv.gz').write(gzip.compress(b'id,name\n3,d\n'), mode='wb')
+    return str(tmpdir)
+
+
+class TestParseSchema(object):
+    def test_columns_types_and_constraints(self):
+        columns = parse_schema(SCHEMA)
+        assert [(c.name, c.type, c.nullable, c.is_array) for c in columns] == [
+            ('id', 'BIGINT', False, False), ('carrier', 'STR', True, False), ('delay', 'DECIMAL', True, False),
+            ('dep_timestamp', 'TIMESTAMP', True, False), ('cancelled', 'BOOL', True, False), ('legs', 'INT', True, True),
+        ]
+        assert (columns[2].precision, columns[2].scale) == (5, 2)
+
+    def test_not_a_table(self):
+        try:
+            parse_schema('CREATE VIEW v AS SELECT 1;')
+        except ValueError:
+            return
+        assert False
+
+
+class TestCheckValue(object):
+    def test_casts(self):
+        assert check_value(ColumnSpec('a', 'SMALLINT'), '123') is None
+        assert 'out of range' in check_value(ColumnSpec('a', 'TINYINT'), '128')
+        assert 'not an integer' in check_value(ColumnSpec('a', 'INT'), '1.5')
+        assert check_value(ColumnSpec('a', 'DOUBLE'), '-1e3') is None
+        assert check_value(ColumnSpec('a', 'DECIMAL', precision=5, scale=2), '123.45') is None
+        assert 'does not fit' in check_value(ColumnSpec('a', 'DECIMAL', precision=5, scale=2), '1234.5')
+        assert check_value(ColumnSpec('a', 'BOOL'), 'TRUE') is None
+        assert check_value(ColumnSpec('a', 'DATE'), '2019-01-31') is None
+        assert 'not a date' in check_value(ColumnSpec('a', 'DATE'), '2019-02-31')
+        assert check_value(ColumnSpec('a', 'TIMESTAMP'), '2019-01-31T10:00:00.123Z') is None
+        assert check_value(ColumnSpec('a', 'TIMESTAMP'), '1548928800') is None
+        assert check_value(ColumnSpec('a', 'TIME'), '10:00:01') is None
+        assert check_value(ColumnSpec('a', 'DATE'), '31-Jan-19') is None
+        assert check_value(ColumnSpec('a', 'TIMESTAMP'), '01/31/2019 10:00:00 PM') is None
+        assert check_value(ColumnSpec('a', 'STR'), 'anything') is None
+
+
+class TestValidateRows(object):
+    columns = [ColumnSpec('id', 'INT', nullable=False), ColumnSpec('name', 'STR')]
+
+    def test_valid_rows(self):
+        assert validate_rows([['id', 'name'], ['1', 'a'], ['2', '\\N']], self.columns) == (2, [], [])
+
+    def test_wrong_delimiter_is_detected(self):
+        rows, errors, _ = validate_rows([['1|a']], self.columns, has_header=False)
+        assert errors == [{'row': 1, 'column': None, 'error': "1 field(s) instead of 2, the file seems to be delimited by '|'"}]
+
+    def test_header_and_nulls(self):
+        _, errors, warnings = validate_rows([['ident', 'name'], ['', 'a']], self.columns)
+        assert warnings[0]['row'] == 0
+        assert errors == [{'row': 1, 'column': 'id', 'error': 'null value in a NOT NULL column'}]
+
+    def test_unrecognized_dates_are_warnings(self):
+        columns = [ColumnSpec('id', 'INT'), ColumnSpec('day', 'DATE')]
+        rows, errors, warnings = validate_rows([['1', '2019-02-31'], ['2', '2019-01-31']], columns, has_header=False)
+        assert (rows, errors) == (2, [])
+        assert warnings == [{'row': 1, 'column': 'day', 'error': "'2019-02-31' is not a date"}]
+
+    def test_errors_are_capped(self):
+        rows, errors, _ = validate_rows([['x', 'a']] * 100, self.columns, has_header=False, max_errors=3)
+        assert (rows, len(errors)) == (3, 3)
+
+
+class TestValidateFile(object):
+    def test_sample_stops_at_a_line_boundary(self, tmpdir):
+        path = tmpdir.join('data.csv.gz')
+        path.write(gzip.compress(b'id,name\n' + b'1,abc\n' * 1000 + b'x,y\n'), mode='wb')
+        columns = [ColumnSpec('id', 'INT'), ColumnSpec('name', 'STR')]
+        sample = validate_file(('local', str(path)), columns, table='t', sample_size=100)
+        assert (sample.ok, sample.complete, sample.rows) == (True, False, 15)
+        full = validate_file(('local', str(path)), columns, table='t', sample_size=None)
+        assert (full.ok, full.complete, full.rows) == (False, True, 1001)
+        assert full.errors[0]['row'] == 1001
+
+    @patch('boto3.resource')
+    def test_s3_source_uses_ranged_gets(self, mock_resource):
+        data = b'1,a\n' * 10
+        obj = mock_resource.return_value.Object.return_value
+        obj.get.side_effect = lambda Range: {'Body': io.BytesIO(data[int(Range[6:].split('-')[0]):int(Range.split('-')[1]) + 1])}
+        columns = [ColumnSpec('id', 'INT'), ColumnSpec('name', 'STR')]
+        report = validate_file(('s3', 'bucket', 'data.csv', len(data), {}), columns, table='t', sample_size=None, has_header=False)
+        assert (report.ok, report.rows, report.name) == (True, 10, 'data.csv')
+        mock_resource.return_value.Object.assert_called_once_with('bucket', 'data.csv')
+
+    def test_process_pool(self, tmpdir):
+        path = tmpdir.join('data.csv')
+        path.write('1;a\n')
+        columns = [ColumnSpec('id', 'INT'), ColumnSpec('name', 'STR')]
+        report = validate_files([('t', 'a.csv', ('local', str(path)), columns), ('t', 'b.csv', ('local', str(path)), columns)],
+                                max_workers=2, has_header=False, delimiter=';')
+        assert report.ok and [r.name for r in report.files] == ['a.csv', 'b.csv']
+
+
+class TestImporterValidation(object):
+    def test_report(self, tmpdir):
+        path = make_library(tmpdir)
+        report = LibraryImport().validate(path, executor=ThreadPoolExecutor(2))
+        assert [(r.name, r.ok) for r in report.files] == [
+            ('tables/flights/data/part-1.csv', True), ('tables/flights/data/part-2.csv', False), ('tables/flights/data/part-3.csv.gz', True),
+        ]
+        assert 'part-2.csv (flights): failed' in report.describe()
+
+    @patch('pymapd.connect')
+    def test_bad_files_are_quarantined_before_the_load(self, mock_connection, tmpdir):
+        path = make_library(tmpdir)
+        imp = LibraryImport()
+        imp.connect()
+        imp.load_data(path, validate=True)
+        loaded = [call[1]['file_name'] for call in mock_connection.return_value._client.import_table.call_args_list]
+        assert loaded == [str(tmpdir.join('tables', 'flights', 'data', 'part-1.csv')), str(tmpdir.join('tables', 'flights', 'data', 'part-3.csv.gz'))]
+        assert [(e['phase'], e['name']) for e in imp.errors] == [('validate', 'tables/flights/data/part-2.csv')]
+
+    @patch('pymapd.connect')
+    def test_quarantine_splits_folder_copies(self, mock_connection, tmpdir):
+        path = make_library(tmpdir)
+        imp = LibraryImport()
+        imp.connect()
+        imp.load_data(path, use_copy_from_qry=True, validate='full', corepath='/core')
+        executed = [call[0][0] for call in mock_connection.return_value.cursor.return_value.execute.call_args_list]
+        assert executed == [
+            "COPY flights from '/core/tables/flights/data/part-1.csv'", "COPY flights from '/core/tables/flights/data/part-3.csv.gz'",
+        ]